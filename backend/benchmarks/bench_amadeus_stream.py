@@ -0,0 +1,151 @@
+"""
+Peak memory and time of normalizing Amadeus flight-offers responses
+
+Compares the previous path (response.json() on the whole body, then normalize_offers
+over the tree, raw offers kept as dicts) with the streaming one (StreamingOffersParser
+over 64 KB text chunks, raw offers kept as JSON text). Peak and retained memory are
+measured with tracemalloc and include the offer store.
+
+Usage (from backend/):
+    python -m benchmarks.bench_amadeus_stream [recorded_response.json ...]
+
+Without arguments, synthetic round-trip responses with multi-segment itineraries
+are generated.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.tools.amadeus_tool import AmadeusTool
+from src.tools.offer_store import offer_store
+
+DEFAULT_SIZES = [50, 250, 1000]
+CHUNK_SIZE = 1 << 16
+ROUNDS = 3
+AIRPORTS = ["SFO", "DEN", "ORD", "DFW", "IAH", "SEA", "ATL", "JFK"]
+CARRIERS = {"UA": "UNITED AIRLINES", "AA": "AMERICAN AIRLINES", "DL": "DELTA AIR LINES", "B6": "JETBLUE AIRWAYS"}
+
+
+def make_segment(rng, i, origin, destination):
+    carrier = rng.choice(list(CARRIERS))
+    return {
+        "departure": {"iataCode": origin, "terminal": "2", "at": "2026-10-20T08:00:00"},
+        "arrival": {"iataCode": destination, "terminal": "1", "at": "2026-10-20T11:30:00"},
+        "carrierCode": carrier,
+        "number": str(rng.randint(100, 9999)),
+        "aircraft": {"code": "32N"},
+        "operating": {"carrierCode": carrier},
+        "duration": "PT3H30M",
+        "id": str(i),
+        "numberOfStops": 0,
+        "blacklistedInEU": False,
+    }
+
+
+def make_itinerary(rng, seg_ids):
+    stops = rng.randint(0, 2)
+    path = ["SFO", *rng.sample(AIRPORTS[1:-1], stops), "JFK"]
+    return {
+        "duration": f"PT{5 + 2 * stops}H{rng.randint(0, 59)}M",
+        "segments": [make_segment(rng, next(seg_ids), a, b) for a, b in zip(path, path[1:])],
+    }
+
+
+def make_response(n, rng):
+    seg_ids = iter(range(1, 10**9))
+    data = []
+    for i in range(n):
+        itineraries = [make_itinerary(rng, seg_ids), make_itinerary(rng, seg_ids)]
+        total = f"{rng.uniform(150, 1800):.2f}"
+        data.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "source": "GDS",
+            "lastTicketingDate": "2026-10-19",
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": itineraries,
+            "price": {"currency": "USD", "total": total, "base": total, "grandTotal": total,
+                      "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}]},
+            "validatingAirlineCodes": [itineraries[0]["segments"][0]["carrierCode"]],
+            "travelerPricings": [{
+                "travelerId": "1",
+                "fareOption": "STANDARD",
+                "travelerType": "ADULT",
+                "price": {"currency": "USD", "total": total, "base": total},
+                "fareDetailsBySegment": [
+                    {"segmentId": seg["id"], "cabin": "ECONOMY", "fareBasis": "KAA0AFEN", "class": "K",
+                     "includedCheckedBags": {"quantity": 0}}
+                    for it in itineraries for seg in it["segments"]
+                ],
+            }],
+        })
+    return {
+        "meta": {"count": n},
+        "data": data,
+        "dictionaries": {"carriers": CARRIERS, "aircraft": {"32N": "AIRBUS A320NEO"}},
+    }
+
+
+def legacy(path):
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    return AmadeusTool().normalize_offers(data)
+
+
+def streaming(path):
+    with open(path, encoding="utf-8") as f:
+        return list(AmadeusTool().iter_normalized_offers(iter(lambda: f.read(CHUNK_SIZE), "")))
+
+
+def measure(fn, path):
+    # Timed without tracemalloc, which slows allocation-heavy code several times over
+    best = float("inf")
+    for _ in range(ROUNDS):
+        offer_store.clear()
+        start = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - start)
+
+    offer_store.clear()
+    tracemalloc.start()
+    offers = fn(path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return offers, best * 1000, peak / 2**20, retained / 2**20
+
+
+def main():
+    paths = sys.argv[1:]
+    tmpdir = None
+    if not paths:
+        tmpdir = tempfile.TemporaryDirectory()
+        rng = random.Random(5)
+        for n in DEFAULT_SIZES:
+            path = os.path.join(tmpdir.name, f"offers_{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_response(n, rng), f, indent=2)
+            paths.append(path)
+
+    print(f"{'response':>18} {'MB':>6} {'offers':>7} {'legacy ms':>10} {'stream ms':>10} "
+          f"{'legacy peak':>12} {'stream peak':>12} {'legacy kept':>12} {'stream kept':>12}")
+    for path in paths:
+        old, old_ms, old_peak, old_kept = measure(legacy, path)
+        new, new_ms, new_peak, new_kept = measure(streaming, path)
+        strip = {"raw_ref", "carrier_names"}
+        assert [o.model_dump(exclude=strip) for o in old] == [o.model_dump(exclude=strip) for o in new], "offers differ"
+
+        print(f"{os.path.basename(path)[-18:]:>18} {os.path.getsize(path) / 2**20:>6.1f} {len(new):>7} "
+              f"{old_ms:>10.1f} {new_ms:>10.1f} {old_peak:>10.1f}MB {new_peak:>10.1f}MB "
+              f"{old_kept:>10.1f}MB {new_kept:>10.1f}MB")
+
+    offer_store.clear()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
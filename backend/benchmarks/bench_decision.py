@@ -0,0 +1,100 @@
+"""
+Offer scoring and top-k selection benchmark for decision_agent
+
+Compares against the previous per-offer scorer (character-by-character duration
+parsing) with a full sort. Detour ratios are fixed at 1.0 so no OpenFlights data
+is needed; both sides get the same input.
+
+Usage (from backend/):
+    python -m benchmarks.bench_decision [offers per round ...]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from src.agents.decision_agent import _parse_duration_to_minutes, score_offers, top_k_indices
+from src.schemas.recommendation import NormalizedOffer
+
+TOP_K = 3
+DEFAULT_SIZES = [100, 1000, 10000]
+MIN_SECONDS = 0.5
+
+
+def legacy_parse_duration(iso_duration):
+    if not iso_duration or not iso_duration.startswith("PT"):
+        return 10**9
+    h = 0
+    m = 0
+    num = ""
+    for ch in iso_duration[2:]:
+        if ch.isdigit():
+            num += ch
+            continue
+        if ch == "H":
+            h = int(num or "0")
+            num = ""
+        elif ch == "M":
+            m = int(num or "0")
+            num = ""
+        else:
+            num = ""
+    return h * 60 + m
+
+
+def legacy_top_k(offers):
+    scored = [
+        (o, legacy_parse_duration(o.total_duration) * 1.0 + o.stops * 90.0 + o.total_price * 0.15)
+        for o in offers
+    ]
+    scored.sort(key=lambda x: x[1])
+    return [o.offer_id for o, _ in scored[:TOP_K]]
+
+
+def batch_top_k(offers):
+    scores = score_offers(offers, np.ones(len(offers)))
+    return [offers[i].offer_id for i in top_k_indices(scores, TOP_K).tolist()]
+
+
+def make_offers(n, rng):
+    return [
+        NormalizedOffer(
+            offer_id=str(i),
+            total_price=round(rng.uniform(80, 2500), 2),
+            total_duration=f"PT{rng.randint(1, 30)}H{rng.randint(0, 59)}M",
+            stops=rng.randint(0, 2),
+            route=["SFO", "ORD"],
+        )
+        for i in range(n)
+    ]
+
+
+def offers_per_second(fn, offers):
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        fn(offers)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return rounds * len(offers) / elapsed
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    rng = random.Random(7)
+
+    print(f"{'offers':>8} {'legacy offers/s':>16} {'batch offers/s':>16} {'speedup':>8}")
+    for n in sizes:
+        offers = make_offers(n, rng)
+        _parse_duration_to_minutes.cache_clear()
+        assert legacy_top_k(offers) == batch_top_k(offers), "rankings differ"
+
+        legacy = offers_per_second(legacy_top_k, offers)
+        batch = offers_per_second(batch_top_k, offers)
+        print(f"{n:>8} {legacy:>16,.0f} {batch:>16,.0f} {batch / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
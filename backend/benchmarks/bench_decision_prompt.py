@@ -0,0 +1,106 @@
+"""
+Prompt size (and optionally LLM latency) of decide_llm before and after Pareto pruning
+
+The previous prompt listed every offer as a Python repr of a dict. The current one
+sends only Pareto-optimal offers (capped) as a pipe-separated table.
+Token counts are estimated at 4 characters per token.
+
+Usage (from backend/):
+    python -m benchmarks.bench_decision_prompt [offers per round ...]
+
+With GEMINI_API_KEY set, --live also times one uncached model call per prompt.
+"""
+import os
+import random
+import sys
+import time
+
+from src.agents.decision_agent import CHARS_PER_TOKEN, _DECISION_SCHEMA, _decision_prompt, select_llm_candidates
+from src.schemas.recommendation import NormalizedOffer
+
+DEFAULT_SIZES = [10, 50, 200, 1000]
+TOP_K = 3
+SYSTEM = "You are an airline rebooking decision agent."
+HUBS = ["DEN", "ORD", "DFW", "IAH", "SEA", "PHX", "ATL"]
+
+
+def legacy_prompt(offers, triage_notes, top_k):
+    offer_summaries = [
+        {
+            "offer_id": o.offer_id,
+            "price": o.total_price,
+            "duration": o.total_duration,
+            "stops": o.stops,
+            "route": o.route,
+            "carriers": o.carriers,
+        }
+        for o in offers
+    ]
+    return f"""
+Triage notes:
+{triage_notes}
+
+Available offers:
+{offer_summaries}
+
+Choose the best {min(top_k, len(offers))} offers.
+Prefer fewer stops, shorter duration, and reliable connections.
+"""
+
+
+def make_offers(n, rng):
+    offers = []
+    for i in range(n):
+        stops = rng.randint(0, 2)
+        route = ["SFO", *rng.sample(HUBS, stops), "JFK"]
+        offers.append(NormalizedOffer(
+            offer_id=str(i + 1),
+            total_price=round(rng.uniform(150, 1800), 2),
+            total_duration=f"PT{5 + 2 * stops + rng.randint(0, 6)}H{rng.randint(0, 59)}M",
+            stops=stops,
+            route=route,
+            carriers=rng.sample(["UA", "AA", "DL", "B6", "AS"], rng.randint(1, 2)),
+        ))
+    return offers
+
+
+def time_llm(client, prompt):
+    start = time.perf_counter()
+    client.json_response(system=SYSTEM, user=prompt, schema_hint=_DECISION_SCHEMA)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--live"]
+    live = "--live" in sys.argv and bool(os.getenv("GEMINI_API_KEY"))
+    sizes = [int(a) for a in args] or DEFAULT_SIZES
+    rng = random.Random(11)
+    notes = "type=CANCEL, severity=0.95"
+
+    client = None
+    if live:
+        from src.common.llm_client import ClaudeClient
+        client = ClaudeClient(cache=None)
+
+    header = f"{'offers':>7} {'sent':>5} {'legacy tokens':>14} {'pruned tokens':>14} {'saved':>7}"
+    if live:
+        header += f" {'legacy ms':>10} {'pruned ms':>10}"
+    print(header)
+
+    for n in sizes:
+        offers = make_offers(n, rng)
+        candidates = select_llm_candidates(offers)
+        before = legacy_prompt(offers, notes, TOP_K)
+        after = _decision_prompt(candidates, notes, TOP_K)
+
+        row = (
+            f"{n:>7} {len(candidates):>5} {len(before) // CHARS_PER_TOKEN:>14,} "
+            f"{len(after) // CHARS_PER_TOKEN:>14,} {1 - len(after) / len(before):>6.0%}"
+        )
+        if live:
+            row += f" {time_llm(client, before):>10.0f} {time_llm(client, after):>10.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Load-time, memory and lookup benchmark for the OpenFlights RouteTable
+
+Compares against the previous list-of-dicts representation with linear scans.
+
+Usage (from backend/):
+    python -m benchmarks.bench_routes_data [path/to/routes.dat]
+
+Without a path, routes.dat is downloaded from OpenFlights.
+"""
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+from src.api_service.routes_data import OPENFLIGHTS_ROUTES_URL, RouteTable
+
+AIRLINES = ["AA", "LH", "BA", "FR", "ZZ"]
+AIRPORTS = ["ATL", "FRA", "LHR", "SFO", "XXX"]
+LOOKUP_ROUNDS = 200
+
+
+def load_list_of_dicts(lines):
+    routes = []
+    for line in lines:
+        parts = line.split(',')
+        if len(parts) >= 7:
+            routes.append({
+                'airline': parts[0],
+                'source': parts[2],
+                'dest': parts[4],
+                'codeshare': parts[6],
+                'stops': parts[7] if len(parts) > 7 else '0'
+            })
+    return routes
+
+
+def scan_airline(routes, airline):
+    found = set()
+    for route in routes:
+        if route['airline'] == airline:
+            origin, dest = route['source'], route['dest']
+            if origin and dest and origin != '\\N' and dest != '\\N' and route['stops'] == '0':
+                if len(origin) == 3 and len(dest) == 3 and origin[0] != dest[0]:
+                    found.add((origin, dest))
+    return found
+
+
+def scan_airport(routes, airport):
+    return {r['dest'] for r in routes if r['source'] == airport and r['dest'] and r['dest'] != '\\N'}
+
+
+def measure(label, build):
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    # Separate run for memory, tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} load {elapsed * 1000:8.1f} ms   retained {current / 1024 / 1024:7.2f} MiB")
+    return result
+
+
+def time_lookups(label, fn):
+    start = time.perf_counter()
+    for _ in range(LOOKUP_ROUNDS):
+        fn()
+    per_call = (time.perf_counter() - start) / LOOKUP_ROUNDS / (len(AIRLINES) + len(AIRPORTS))
+    print(f"{label:<16} lookup {per_call * 1e6:8.1f} us/call")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = httpx.get(OPENFLIGHTS_ROUTES_URL, timeout=30.0).text
+    lines = text.strip().split('\n')
+    print(f"{len(lines)} routes.dat lines")
+
+    routes = measure("list-of-dicts", lambda: load_list_of_dicts(lines))
+    table = measure("RouteTable", lambda: RouteTable.from_lines(lines))
+
+    for airline in AIRLINES:
+        assert scan_airline(routes, airline) == set(table.international_direct_routes(airline))
+    for airport in AIRPORTS:
+        assert scan_airport(routes, airport) == table.destinations_from(airport)
+
+    time_lookups("list-of-dicts", lambda: (
+        [scan_airline(routes, a) for a in AIRLINES],
+        [scan_airport(routes, a) for a in AIRPORTS],
+    ))
+    time_lookups("RouteTable", lambda: (
+        [table.international_direct_routes(a) for a in AIRLINES],
+        [table.destinations_from(a) for a in AIRPORTS],
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load backend/.env before any submodule reads its settings from the environment at
+# import time (LLM, cache, triage and offer store tuning). Real env vars win.
+load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import logging
+import re
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+from typing import List, Optional, Sequence
 
+import numpy as np
+
+from ..api_service.distance_matrix import detour_ratios
 from ..schemas.recommendation import NormalizedOffer, RecommendedOffer
 
+logger = logging.getLogger(__name__)
+
+# Score minutes added per unit of detour (flown distance / direct distance - 1)
+DETOUR_PENALTY_MINUTES = 300.0
+
 
 @dataclass
 class DecisionResult:
@@ -14,40 +26,59 @@ class DecisionResult:
     notes: str
 
 
+_DURATION_RE = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+
+@lru_cache(maxsize=4096)
 def _parse_duration_to_minutes(iso_duration: str) -> int:
     """
     Parse very common ISO-8601 durations like 'PT7H9M' into minutes.
-    Lightweight, no external deps.
+    Lightweight, no external deps. Offers repeat a small set of durations, so results are memoized.
     """
     if not iso_duration or not iso_duration.startswith("PT"):
         return 10**9
 
-    h = 0
-    m = 0
-    s = iso_duration[2:]  # after PT
-
-    num = ""
-    for ch in s:
-        if ch.isdigit():
-            num += ch
-            continue
-        if ch == "H":
-            h = int(num or "0")
-            num = ""
-        elif ch == "M":
-            m = int(num or "0")
-            num = ""
-        else:
-            # ignore seconds etc.
-            num = ""
-    return h * 60 + m
-
-
-def score_offer(offer: NormalizedOffer) -> float:
-    duration_min = _parse_duration_to_minutes(offer.total_duration)
-    # weights tuned for simple behavior:
-    # duration matters most, stops is big penalty, price is mild
-    return (duration_min * 1.0) + (offer.stops * 90.0) + (offer.total_price * 0.15)
+    match = _DURATION_RE.match(iso_duration)
+    hours, minutes = match.group(1), match.group(2)
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def score_offers(offers: Sequence[NormalizedOffer], detours: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Scores for many offers at once (lower is better).
+    weights tuned for simple behavior:
+    duration matters most, stops is big penalty, price is mild,
+    routings far off the great circle are penalized
+    """
+    if detours is None:
+        detours = detour_ratios([o.route for o in offers])
+
+    n = len(offers)
+    duration_min = np.fromiter((_parse_duration_to_minutes(o.total_duration) for o in offers), dtype=np.float64, count=n)
+    stops = np.fromiter((o.stops for o in offers), dtype=np.float64, count=n)
+    price = np.fromiter((o.total_price for o in offers), dtype=np.float64, count=n)
+    detour_excess = np.maximum(np.asarray(detours, dtype=np.float64) - 1.0, 0.0)
+
+    return duration_min * 1.0 + stops * 90.0 + price * 0.15 + detour_excess * DETOUR_PENALTY_MINUTES
+
+
+def score_offer(offer: NormalizedOffer, detour_ratio: float | None = None) -> float:
+    detours = None if detour_ratio is None else np.array([detour_ratio])
+    return float(score_offers([offer], detours)[0])
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k lowest scores in ascending order (ties keep input order), without a full sort"""
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.arange(n) if k == n else np.argpartition(scores, k - 1)[:k]
+    # Boundary ties may have been dropped arbitrarily: take every index scoring <= the k-th value
+    kth = scores[candidates].max()
+    candidates = np.flatnonzero(scores <= kth)
+    order = np.lexsort((candidates, scores[candidates]))
+    return candidates[order[:k]]
 
 
 def decide(
@@ -64,18 +95,16 @@ def decide(
             notes="no_offers",
         )
 
-    scored: List[Tuple[NormalizedOffer, float]] = [(o, score_offer(o)) for o in offers]
-    scored.sort(key=lambda x: x[1])  # lower score is better
+    scores = score_offers(offers)  # lower score is better
 
-    top = scored[:top_k]
     recommended: List[RecommendedOffer] = []
-    for i, (off, sc) in enumerate(top, start=1):
-        recommended.append(RecommendedOffer(rank=i, offer=off, score=round(sc, 2)))
+    for i, idx in enumerate(top_k_indices(scores, top_k).tolist(), start=1):
+        recommended.append(RecommendedOffer(rank=i, offer=offers[idx], score=round(float(scores[idx]), 2)))
 
     # basic reasoning — we’ll improve later
     best = recommended[0].offer
     reasoning = [
-        f"Chosen best overall score (duration + stops + price).",
+        f"Chosen best overall score (duration + stops + price + detour).",
         f"Best option route: {' → '.join(best.route) if best.route else 'N/A'}",
         f"Triage: {triage_notes}",
     ]
@@ -90,7 +119,7 @@ def decide(
         notes=f"offers_in={len(offers)}, recommended={len(recommended)}",
     )
 
-from ..common.llm_client import ClaudeClient
+from ..common.llm_client import get_llm_client
 from ..schemas.recommendation import RecommendedOffer
 
 
@@ -103,44 +132,117 @@ _DECISION_SCHEMA = """
 """
 
 
-def decide_llm(offers, triage_notes: str, top_k: int = 3):
-    claude = ClaudeClient()
+# Offers sent to the LLM after Pareto pruning, best rule-based scores first
+DECISION_MAX_CANDIDATES = 12
+# Rough chars-per-token ratio used for prompt size logging
+CHARS_PER_TOKEN = 4
 
-    system = (
-        "You are an airline rebooking decision agent. "
-        "Choose the best rebooking options based on risk and passenger experience."
-    )
 
-    offer_summaries = [
-        {
-            "offer_id": o.offer_id,
-            "price": o.total_price,
-            "duration": o.total_duration,
-            "stops": o.stops,
-            "route": o.route,
-            "carriers": o.carriers,
-        }
-        for o in offers
-    ]
+def pareto_front(offers: Sequence[NormalizedOffer]) -> List[int]:
+    """
+    Indices of offers not dominated on (price, duration, stops): an offer is dropped when
+    another one is no worse on all three and strictly better on at least one.
+    """
+    n = len(offers)
+    if n == 0:
+        return []
+    objectives = np.column_stack([
+        np.fromiter((o.total_price for o in offers), dtype=np.float64, count=n),
+        np.fromiter((_parse_duration_to_minutes(o.total_duration) for o in offers), dtype=np.float64, count=n),
+        np.fromiter((o.stops for o in offers), dtype=np.float64, count=n),
+    ])
+
+    # In lexicographic order no offer can be dominated by a later one,
+    # so each offer only needs checking against the front found so far
+    order = np.lexsort(objectives.T[::-1])
+    front: List[int] = []
+    for i in order.tolist():
+        if front:
+            kept = objectives[front]
+            if np.any(np.all(kept <= objectives[i], axis=1) & np.any(kept < objectives[i], axis=1)):
+                continue
+        front.append(i)
+    return sorted(front)
+
+
+def select_llm_candidates(
+    offers: Sequence[NormalizedOffer],
+    max_candidates: int = DECISION_MAX_CANDIDATES,
+    min_candidates: int = 0,
+) -> List[NormalizedOffer]:
+    """
+    Pareto-optimal offers, capped to the best max_candidates by rule-based score.
+    When the front is smaller than min_candidates (e.g. one offer dominates all the
+    others), it is backfilled with the best-scoring dominated offers.
+    """
+    front = pareto_front(offers)
+    if len(front) > max_candidates:
+        scores = score_offers([offers[i] for i in front])
+        front = sorted(front[j] for j in top_k_indices(scores, max_candidates).tolist())
+    elif len(front) < min_candidates:
+        in_front = set(front)
+        rest = [i for i in range(len(offers)) if i not in in_front]
+        scores = score_offers([offers[i] for i in rest])
+        backfill = top_k_indices(scores, min(min_candidates, max_candidates) - len(front)).tolist()
+        front = sorted(front + [rest[j] for j in backfill])
+    return [offers[i] for i in front]
 
-    user = f"""
+
+def encode_offers_table(offers: Sequence[NormalizedOffer]) -> str:
+    """One pipe-separated row per offer under a single header, instead of a repr per dict"""
+    rows = ["id|price|minutes|stops|route|carriers"]
+    for o in offers:
+        rows.append(
+            f"{o.offer_id}|{o.total_price:g}|{_parse_duration_to_minutes(o.total_duration)}|{o.stops}"
+            f"|{'-'.join(o.route)}|{','.join(o.carriers)}"
+        )
+    return "\n".join(rows)
+
+
+def _decision_prompt(offers: Sequence[NormalizedOffer], triage_notes: str, top_k: int) -> str:
+    return f"""
 Triage notes:
 {triage_notes}
 
-Available offers:
-{offer_summaries}
+Available offers (price in {offers[0].currency if offers else "USD"}, duration in minutes):
+{encode_offers_table(offers)}
 
-Choose the best {min(top_k, len(offers))} offers.
+Choose the best {min(top_k, len(offers))} offers by id.
 Prefer fewer stops, shorter duration, and reliable connections.
 """
 
+
+def decide_llm(offers, triage_notes: str, top_k: int = 3):
+    if not offers:
+        return decide(offers, triage_notes, top_k=top_k)
+
+    claude = get_llm_client()
+
+    system = (
+        "You are an airline rebooking decision agent. "
+        "Choose the best rebooking options based on risk and passenger experience."
+    )
+
+    # Dominated offers can never be the best choice; leaving them out keeps the prompt small
+    candidates = select_llm_candidates(offers, min_candidates=top_k)
+    user = _decision_prompt(candidates, triage_notes, top_k)
+
+    start = time.perf_counter()
     data = claude.json_response(
         system=system,
         user=user,
         schema_hint=_DECISION_SCHEMA,
     )
+    llm_ms = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"LLM decision: {len(candidates)}/{len(offers)} offers, prompt ~{len(user) // CHARS_PER_TOKEN} tokens "
+        f"({len(user)} chars), {llm_ms:.0f}ms"
+    )
 
-    id_map = {o.offer_id: o for o in offers}
+    # Offers merged by rebook() carry unique "<source>:<offer_id>" ids
+    id_map = {o.offer_id: o for o in candidates}
+    if len(id_map) < len(candidates):
+        logger.warning(f"LLM decision: {len(candidates) - len(id_map)} candidates share an offer_id")
     recommended = []
 
     for i, oid in enumerate(data["recommended_offer_ids"][:top_k], start=1):
@@ -152,5 +254,8 @@ Prefer fewer stops, shorter duration, and reliable connections.
         recommended=recommended,
         reasoning=data["reasoning"],
         confidence=float(data["confidence"]),
-        notes="llm_decision",
+        notes=(
+            f"llm_decision, candidates={len(candidates)}/{len(offers)}, "
+            f"prompt_chars={len(user)}, llm_ms={llm_ms:.0f}"
+        ),
     )
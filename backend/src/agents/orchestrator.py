@@ -1,50 +1,375 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 from uuid import uuid4
 
-from ..schemas.recommendation import RecommendationRequest, RecommendationResponse
-from .triage_agent import triage_llm
+from ..schemas.recommendation import (
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    BatchRecommendationResult,
+    NormalizedOffer,
+    RecommendationRequest,
+    RecommendationResponse,
+    RecommendedOffer,
+)
+from ..tools.amadeus_tool import AmadeusTool
+from ..tools.offer_store import raw_of
+from .triage_agent import TriageResult, run_triage_async, triage
 from .rebook_agent import rebook
-from .decision_agent import decide_llm
+from .decision_agent import DecisionResult, decide, decide_llm
 
 
-def run_recommendation_pipeline(req: RecommendationRequest) -> RecommendationResponse:
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _timed(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float]:
+    """Run a blocking stage in a worker thread; returns (result, elapsed ms)"""
+    start = time.perf_counter()
+    result = await asyncio.to_thread(fn, *args, **kwargs)
+    return result, _elapsed_ms(start)
+
+
+async def _timed_await(awaitable: Awaitable[Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = await awaitable
+    return result, _elapsed_ms(start)
+
+
+def present_offers(recommended: List[RecommendedOffer], mode: str) -> List[RecommendedOffer]:
+    """Apply the request's response_mode to the raw payloads of recommended offers"""
+    if mode == "full":
+        return [r.model_copy(update={"offer": r.offer.model_copy(update={"raw": raw_of(r.offer)})}) for r in recommended]
+    if mode == "lean":
+        return [r.model_copy(update={"offer": r.offer.model_copy(update={"raw": {}, "raw_ref": None})}) for r in recommended]
+    return recommended
+
+
+def _search_params(search: Dict[str, Any], passenger: Dict[str, Any]) -> Dict[str, Any]:
+    """AmadeusTool.search_offers() arguments from a request's search and passenger blocks"""
+    return {
+        "origin": search.get("origin"),
+        "destination": search.get("destination"),
+        "departure_date": search.get("departure_date") or search.get("date"),
+        "adults": int(passenger.get("adults", 1)),
+        "max_results": int(search.get("max_results", 5)),
+    }
+
+
+def _rebook_options(search: Dict[str, Any]) -> Dict[str, int]:
+    """rebook() search-widening settings from a request's search block"""
+    return {
+        "graph_candidates": int(search.get("graph_candidates", 3)),
+        "flex_days": int(search.get("flex_days", 0)),
+        "nearby_airports": int(search.get("nearby_airports", 0)),
+        "fanout_budget": int(search.get("fanout_budget", 8)),
+    }
+
+
+async def run_recommendation_pipeline(req: RecommendationRequest) -> RecommendationResponse:
     """
     Claude brain:
-      - triage_llm() generates severity + constraints
+      - run_triage_async() generates severity + constraints: rule engine first, escalating
+        to the LLM only when needed (TRIAGE_MODE); escalations from concurrent
+        requests are micro-batched into one prompt
       - decide_llm() ranks offers + produces reasoning
 
     Tools:
-      - rebook() calls AmadeusTool.search_offers() and filters offers
+      - AmadeusTool.search_offers() runs concurrently with triage, since it doesn't
+        depend on the triage output
+      - rebook() then filters the offers by the triage constraints, widening the search
+        to nearby dates/airports (search.flex_days, search.nearby_airports) and pricing
+        route-graph one-stop paths when too little is left
     """
     trace_id = str(uuid4())
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    params = _search_params(req.search, req.passenger)
+    options = _rebook_options(req.search)
+
+    tool = AmadeusTool()
 
-    # 1) LLM triage (Claude)
-    t = triage_llm(req.disruption.model_dump())
-
-    # 2) Tool rebook (Amadeus) + constraints filtering
-    origin = req.search.get("origin")
-    destination = req.search.get("destination")
-    departure_date = req.search.get("departure_date") or req.search.get("date")
-    adults = int(req.passenger.get("adults", 1))
-    max_results = int(req.search.get("max_results", 5))
-
-    r = rebook(
-        origin=origin,
-        destination=destination,
-        departure_date=departure_date,
-        adults=adults,
-        max_results=max_results,
+    # 1) Triage (rules / Claude) and Amadeus search, overlapped
+    (t, timings["triage"]), (normalized, timings["search"]) = await asyncio.gather(
+        _timed_await(run_triage_async(req.disruption.model_dump())),
+        _timed(tool.search_offers, **params),
+    )
+
+    # 2) Constraints filtering (+ route-graph fallback)
+    r, timings["rebook"] = await _timed(
+        rebook,
+        **params,
         constraints=t.constraints,
+        tool=tool,
+        **options,
+        normalized=normalized,
     )
 
     # 3) LLM decision (Claude)
-    d = decide_llm(r.offers, t.notes, top_k=3)
+    d, timings["decision"] = await _timed(decide_llm, r.offers, t.notes, top_k=3)
+
+    timings["total"] = _elapsed_ms(start)
 
     return RecommendationResponse(
         trace_id=trace_id,
         severity_score=t.severity_score,
-        recommended_offers=d.recommended,
+        recommended_offers=present_offers(d.recommended, req.response_mode),
         reasoning=d.reasoning,
         confidence=d.confidence,
+        timings_ms=timings,
+    )
+
+
+def _preliminary(
+    params: Dict[str, Any],
+    disruption: Dict[str, Any],
+    t: Optional[TriageResult],
+    tool: AmadeusTool,
+    normalized: List[NormalizedOffer],
+) -> Tuple[TriageResult, DecisionResult]:
+    """Rule-based triage (unless t is given), constraint filtering and decide() ranking"""
+    if t is None:
+        t = triage(disruption)
+    r = rebook(**params, constraints=t.constraints, tool=tool, normalized=normalized)
+    return t, decide(r.offers, t.notes, top_k=3)
+
+
+async def stream_recommendation_pipeline(req: RecommendationRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    run_recommendation_pipeline() as a sequence of events:
+      - "preliminary": rule-based decide() ranking as soon as the Amadeus search returns,
+        filtered with the final triage constraints if triage is done, else the rule-based ones
+      - "final": the full RecommendationResponse with the LLM ranking and reasoning
+      - "error": the pipeline failed; no further events follow
+    """
+    trace_id = str(uuid4())
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    params = _search_params(req.search, req.passenger)
+    options = _rebook_options(req.search)
+    disruption = req.disruption.model_dump()
+    tool = AmadeusTool()
+
+    triage_task = asyncio.create_task(_timed_await(run_triage_async(disruption)))
+    try:
+        normalized, timings["search"] = await _timed(tool.search_offers, **params)
+
+        # Preliminary ranking: no LLM and no extra Amadeus calls for route-graph legs
+        (t, d), timings["preliminary"] = await _timed(
+            _preliminary,
+            params,
+            disruption,
+            triage_task.result()[0] if triage_task.done() else None,
+            tool,
+            normalized,
+        )
+        yield {
+            "event": "preliminary",
+            "trace_id": trace_id,
+            "severity_score": t.severity_score,
+            "recommended_offers": [o.model_dump() for o in present_offers(d.recommended, req.response_mode)],
+            "reasoning": d.reasoning,
+            "confidence": d.confidence,
+            "timings_ms": {**timings, "total": _elapsed_ms(start)},
+        }
+
+        t, timings["triage"] = await triage_task
+        r, timings["rebook"] = await _timed(
+            rebook,
+            **params,
+            constraints=t.constraints,
+            tool=tool,
+            **options,
+            normalized=normalized,
+        )
+        d, timings["decision"] = await _timed(decide_llm, r.offers, t.notes, top_k=3)
+        timings["total"] = _elapsed_ms(start)
+
+        response = RecommendationResponse(
+            trace_id=trace_id,
+            severity_score=t.severity_score,
+            recommended_offers=present_offers(d.recommended, req.response_mode),
+            reasoning=d.reasoning,
+            confidence=d.confidence,
+            timings_ms=timings,
+        )
+        yield {"event": "final", **response.model_dump()}
+    except Exception as e:
+        yield {"event": "error", "trace_id": trace_id, "message": str(e)}
+    finally:
+        if not triage_task.done():
+            triage_task.cancel()
+
+
+# Upper bound on concurrent Amadeus searches / LLM decisions for one batch
+BATCH_CONCURRENCY = 8
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+async def _run_unique(
+    jobs: Dict[Hashable, Callable[[], Any]], limit: asyncio.Semaphore
+) -> Dict[Hashable, Tuple[Any, float]]:
+    """Run each blocking job once in a worker thread; returns key -> (result or exception, elapsed ms)"""
+    async def run(fn: Callable[[], Any]) -> Tuple[Any, float]:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(fn)
+            except Exception as e:
+                result = e
+            return result, _elapsed_ms(start)
+
+    results = await asyncio.gather(*(run(fn) for fn in jobs.values()))
+    return dict(zip(jobs.keys(), results))
+
+
+async def _triage_unique(disruptions: Dict[str, dict]) -> Dict[str, Tuple[Any, float]]:
+    async def run(disruption: dict) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        try:
+            result = await run_triage_async(disruption)
+        except Exception as e:
+            result = e
+        return result, _elapsed_ms(start)
+
+    results = await asyncio.gather(*(run(d) for d in disruptions.values()))
+    return dict(zip(disruptions.keys(), results))
+
+
+async def run_batch_recommendation_pipeline(req: BatchRecommendationRequest) -> BatchRecommendationResponse:
+    """
+    Recommendations for many passengers of one disruption (e.g. a cancelled flight).
+    Identical triage inputs, Amadeus searches, rebook filters and LLM decisions each
+    run once, concurrently, and the results are fanned back out per passenger.
+    """
+    trace_id = str(uuid4())
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tool = AmadeusTool()
+
+    items: List[Dict[str, Any]] = []
+    results: List[Optional[BatchRecommendationResult]] = []
+    for item in req.items:
+        search = {**req.search, **item.search}
+        params = _search_params(search, item.passenger)
+        if not params["origin"] or not params["destination"] or not params["departure_date"]:
+            results.append(BatchRecommendationResult(
+                passenger_id=item.passenger_id,
+                error="search.origin, search.destination, and search.departure_date (or search.date) are required",
+            ))
+            continue
+        disruption = (item.disruption or req.disruption).model_dump()
+        items.append({
+            "index": len(results),
+            "passenger_id": item.passenger_id,
+            "disruption": disruption,
+            "triage_key": _canonical(disruption),
+            "params": params,
+            "search_key": _canonical(params),
+            "options": _rebook_options(search),
+        })
+        results.append(None)
+
+    # 1) Unique triages and unique searches, overlapped
+    triage_inputs = {i["triage_key"]: i["disruption"] for i in items}
+    search_jobs = {
+        i["search_key"]: (lambda params=i["params"]: tool.search_offers(**params))
+        for i in items
+    }
+    stage_start = time.perf_counter()
+    triages, searches = await asyncio.gather(
+        _triage_unique(triage_inputs),
+        _run_unique(search_jobs, limit),
+    )
+    timings["triage_and_search"] = _elapsed_ms(stage_start)
+
+    # 2) Constraint filtering once per (search, constraints, widening options)
+    rebook_jobs: Dict[Hashable, Callable[[], Any]] = {}
+    for i in items:
+        t, _ = triages[i["triage_key"]]
+        normalized, _ = searches[i["search_key"]]
+        if isinstance(t, Exception) or isinstance(normalized, Exception):
+            continue
+        i["rebook_key"] = (i["search_key"], _canonical(t.constraints), _canonical(i["options"]))
+        rebook_jobs.setdefault(
+            i["rebook_key"],
+            lambda params=i["params"], t=t, normalized=normalized, options=i["options"]: rebook(
+                **params,
+                constraints=t.constraints,
+                tool=tool,
+                **options,
+                normalized=normalized,
+            ),
+        )
+    stage_start = time.perf_counter()
+    rebooks = await _run_unique(rebook_jobs, limit)
+    timings["rebook"] = _elapsed_ms(stage_start)
+
+    # 3) One LLM decision per (offers, triage notes)
+    decision_jobs: Dict[Hashable, Callable[[], Any]] = {}
+    for i in items:
+        if "rebook_key" not in i or isinstance(rebooks[i["rebook_key"]][0], Exception):
+            continue
+        t, _ = triages[i["triage_key"]]
+        r, _ = rebooks[i["rebook_key"]]
+        i["decision_key"] = (i["rebook_key"], t.notes)
+        decision_jobs.setdefault(
+            i["decision_key"],
+            lambda offers=r.offers, notes=t.notes: decide_llm(offers, notes, top_k=3),
+        )
+    stage_start = time.perf_counter()
+    decisions = await _run_unique(decision_jobs, limit)
+    timings["decision"] = _elapsed_ms(stage_start)
+
+    # 4) Fan out per passenger
+    for i in items:
+        t, triage_ms = triages[i["triage_key"]]
+        normalized, search_ms = searches[i["search_key"]]
+        stage_results = [
+            ("triage", t),
+            ("search", normalized),
+            ("rebook", rebooks[i["rebook_key"]][0] if "rebook_key" in i else None),
+            ("decision", decisions[i["decision_key"]][0] if "decision_key" in i else None),
+        ]
+        error = next((f"{stage} failed: {r}" for stage, r in stage_results if isinstance(r, Exception)), None)
+        if error:
+            results[i["index"]] = BatchRecommendationResult(passenger_id=i["passenger_id"], error=error)
+            continue
+
+        d, decision_ms = decisions[i["decision_key"]]
+        results[i["index"]] = BatchRecommendationResult(
+            passenger_id=i["passenger_id"],
+            recommendation=RecommendationResponse(
+                trace_id=f"{trace_id}:{i['index']}",
+                severity_score=t.severity_score,
+                recommended_offers=present_offers(d.recommended, req.response_mode),
+                reasoning=d.reasoning,
+                confidence=d.confidence,
+                timings_ms={
+                    "triage": triage_ms,
+                    "search": search_ms,
+                    "rebook": rebooks[i["rebook_key"]][1],
+                    "decision": decision_ms,
+                },
+            ),
+        )
+
+    timings["total"] = _elapsed_ms(start)
+
+    return BatchRecommendationResponse(
+        trace_id=trace_id,
+        results=results,
+        unique_triages=len(triage_inputs),
+        unique_searches=len(search_jobs),
+        unique_decisions=len(decision_jobs),
+        timings_ms=timings,
     )
@@ -1,10 +1,34 @@
 from __future__ import annotations
 
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from ..api_service import airports_data
+from ..api_service.amadeus_client import UPSTREAM_POOL
 from ..schemas.recommendation import NormalizedOffer
 from ..tools.amadeus_tool import AmadeusTool
+from ..tools.offer_index import OfferIndex
+from ..tools.offer_store import offer_store, raw_of
+from ..tools.route_graph import RouteCandidate, get_route_graph
+from .decision_agent import _parse_duration_to_minutes
+
+logger = logging.getLogger(__name__)
+
+# Fan-out searches: concurrent Amadeus calls per request, how far to look for alternate
+# airports, and how long (and how many) searched (origin, destination, date) are reused
+FANOUT_CONCURRENCY = 4
+FANOUT_NEARBY_RADIUS_KM = 150.0
+FANOUT_CACHE_TTL_SECONDS = 300.0
+FANOUT_CACHE_MAX_ENTRIES = 256
+
+_search_cache: "OrderedDict[Tuple, Tuple[float, List[NormalizedOffer]]]" = OrderedDict()
+_search_cache_lock = threading.Lock()
 
 
 @dataclass
@@ -35,6 +59,215 @@ def filter_offers_by_constraints(
     return filtered
 
 
+def _segment_times(offer: NormalizedOffer) -> Optional[tuple]:
+    """(first departure, last arrival) of the offer's first itinerary"""
+    itineraries = raw_of(offer).get("itineraries") or []
+    segments = (itineraries[0].get("segments") or []) if itineraries else []
+    if not segments:
+        return None
+    try:
+        dep = datetime.fromisoformat(segments[0]["departure"]["at"])
+        arr = datetime.fromisoformat(segments[-1]["arrival"]["at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return dep, arr
+
+
+def _with_raw(offers: Iterable[NormalizedOffer]) -> List[NormalizedOffer]:
+    """Offers with their raw payloads inline; ones whose payload is gone are dropped"""
+    pinned = []
+    for o in offers:
+        raw = raw_of(o)
+        if raw:
+            pinned.append(o if o.raw else o.model_copy(update={"raw": raw}))
+    return pinned
+
+
+def _iso_duration(minutes: int) -> str:
+    return f"PT{minutes // 60}H{minutes % 60}M"
+
+
+def _combine_legs(
+    first: List[NormalizedOffer], second: List[NormalizedOffer], min_layover_minutes: int
+) -> Optional[NormalizedOffer]:
+    """
+    Cheapest pairing of two separately priced legs that leaves at least the minimum layover.
+    Segment times are local to each airport, so only the layover (both times at the
+    connecting airport) is taken from them; the total adds the legs' own durations.
+    """
+    best = None
+    for a in first:
+        a_times = _segment_times(a)
+        a_minutes = _parse_duration_to_minutes(a.total_duration)
+        if not a_times or a_minutes >= 10**9:
+            continue
+        for b in second:
+            b_times = _segment_times(b)
+            b_minutes = _parse_duration_to_minutes(b.total_duration)
+            if not b_times or b_minutes >= 10**9:
+                continue
+            layover = (b_times[0] - a_times[1]).total_seconds() / 60
+            if layover < min_layover_minutes:
+                continue
+            price = a.total_price + b.total_price
+            if best is None or price < best[0]:
+                best = (price, a, b, a_minutes + int(layover) + b_minutes)
+
+    if best is None:
+        return None
+
+    price, a, b, total_minutes = best
+    return NormalizedOffer(
+        offer_id=f"{a.offer_id}+{b.offer_id}",
+        total_price=round(price, 2),
+        currency=a.currency,
+        total_duration=_iso_duration(total_minutes),
+        stops=a.stops + b.stops + 1,
+        route=a.route + b.route[1:],
+        carriers=list(dict.fromkeys(a.carriers + b.carriers)),
+        raw_ref=offer_store.put({"legs": [raw_of(a), raw_of(b)]}),
+        fingerprint=f"{a.fingerprint}|{b.fingerprint}" if a.fingerprint and b.fingerprint else None,
+    )
+
+
+def _price_graph_candidates(
+    tool: AmadeusTool,
+    candidates: List[RouteCandidate],
+    departure_date: str,
+    adults: int,
+    min_layover_minutes: int,
+) -> List[NormalizedOffer]:
+    """Search each leg of the candidate one-stop paths concurrently and combine them into offers"""
+    legs = list(dict.fromkeys((a, b) for c in candidates for a, b in zip(c.path, c.path[1:])))
+
+    results = UPSTREAM_POOL.map(
+        lambda leg: tool.search_offers(
+            origin=leg[0],
+            destination=leg[1],
+            departure_date=departure_date,
+            adults=adults,
+            max_results=5,
+        ),
+        legs,
+    )
+    # Separately ticketed legs only make sense as nonstop flights. Their segment times
+    # come from the raw payloads, so those are held inline until the legs are combined
+    # rather than re-read from the offer store, which may evict them meanwhile.
+    leg_offers = {leg: _with_raw(o for o in offers if o.stops == 0) for leg, offers in zip(legs, results)}
+
+    combined: List[NormalizedOffer] = []
+    for c in candidates:
+        offer = _combine_legs(leg_offers[(c.path[0], c.path[1])], leg_offers[(c.path[1], c.path[2])], min_layover_minutes)
+        if offer:
+            combined.append(offer)
+    return combined
+
+
+def _cached_search(tool: AmadeusTool, **params: Any) -> List[NormalizedOffer]:
+    key = tuple(sorted(params.items()))
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is not None and entry[0] > time.time():
+            _search_cache.move_to_end(key)
+            return entry[1]
+
+    offers = tool.search_offers(**params)
+    if not offers:
+        # search_offers() returns [] on upstream errors too; don't pin those for the TTL
+        return offers
+    with _search_cache_lock:
+        now = time.time()
+        for k in [k for k, (expires_at, _) in _search_cache.items() if expires_at <= now]:
+            del _search_cache[k]
+        _search_cache[key] = (now + FANOUT_CACHE_TTL_SECONDS, offers)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > FANOUT_CACHE_MAX_ENTRIES:
+            _search_cache.popitem(last=False)
+    return offers
+
+
+def _fanout_searches(
+    origin: str, destination: str, departure_date: str, flex_days: int, nearby: int, budget: int
+) -> List[Tuple[str, str, str]]:
+    """
+    Alternate (origin, destination, date) searches, closest to the original first:
+    each day of shift and each step down the nearby-airport list costs one.
+    """
+    def with_nearby(code: str) -> List[str]:
+        if nearby <= 0:
+            return [code]
+        return [code] + [a["code"] for a in airports_data.nearby_airports(code, FANOUT_NEARBY_RADIUS_KM, nearby)]
+
+    origins = with_nearby(origin)
+    destinations = with_nearby(destination)
+
+    dates = [(0, departure_date)]
+    if flex_days > 0:
+        try:
+            base = date.fromisoformat(departure_date)
+        except ValueError:
+            base = None
+        if base is not None:
+            for shift in range(1, flex_days + 1):
+                for day in (base - timedelta(days=shift), base + timedelta(days=shift)):
+                    if day >= date.today():
+                        dates.append((shift, day.isoformat()))
+
+    ranked = sorted(
+        (shift + i + j, o, d, day)
+        for shift, day in dates
+        for i, o in enumerate(origins)
+        for j, d in enumerate(destinations)
+        if (shift, i, j) != (0, 0, 0) and o != d
+    )
+    return [(o, d, day) for _, o, d, day in ranked[:budget]]
+
+
+def _fanout(
+    tool: AmadeusTool,
+    index: OfferIndex,
+    searches: List[Tuple[str, str, str]],
+    adults: int,
+    max_results: int,
+    constraints: Dict[str, Any],
+    min_offers: int,
+) -> int:
+    """
+    Run the searches on the shared upstream pool, at most FANOUT_CONCURRENCY at a time,
+    into index until at least min_offers unique offers pass the constraints; searches
+    not yet started are then dropped. Returns how many searches completed.
+    """
+    pending: Dict[Future, str] = {}
+    queue = list(searches)
+    completed = 0
+    try:
+        while queue or pending:
+            while queue and len(pending) < FANOUT_CONCURRENCY:
+                o, d, day = queue.pop(0)
+                future = UPSTREAM_POOL.submit(
+                    _cached_search, tool,
+                    origin=o, destination=d, departure_date=day, adults=adults, max_results=max_results,
+                )
+                pending[future] = f"{o}-{d}@{day}"
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                completed += 1
+                try:
+                    index.add(future.result(), source=source)
+                except Exception as e:
+                    logger.warning(f"Fan-out search {source} failed: {e}")
+
+            if len(filter_offers_by_constraints(index.offers(), constraints)) >= min_offers:
+                break
+    finally:
+        # Searches already running finish in the background and still fill the cache
+        for future in pending:
+            future.cancel()
+    return completed
+
+
 def rebook(
     *,
     origin: str,
@@ -44,17 +277,62 @@ def rebook(
     max_results: int,
     constraints: Dict[str, Any],
     tool: Optional[AmadeusTool] = None,
+    graph_candidates: int = 0,
+    flex_days: int = 0,
+    nearby_airports: int = 0,
+    fanout_budget: int = 8,
+    fanout_min_offers: int = 3,
+    normalized: Optional[List[NormalizedOffer]] = None,
 ) -> RebookResult:
+    """
+    Search Amadeus for the requested OD and filter by triage constraints.
+    Pass normalized to filter offers that were already searched (e.g. concurrently with triage).
+    With graph_candidates > 0 and nothing usable from the direct search, the local
+    OpenFlights route graph proposes one-stop paths and only those legs are priced.
+    With flex_days or nearby_airports > 0 and fewer than fanout_min_offers usable offers,
+    up to fanout_budget more searches (dates +/- flex_days, up to nearby_airports
+    alternates at each end) run concurrently, stopping once enough offers survive.
+    Offers for the same itinerary are merged into one (cheapest fare, with provenance).
+    """
     tool = tool or AmadeusTool()
 
-    normalized = tool.search_offers(
-        origin=origin,
-        destination=destination,
-        departure_date=departure_date,
-        adults=adults,
-        max_results=max_results,
-    )
+    if normalized is None:
+        normalized = tool.search_offers(
+            origin=origin,
+            destination=destination,
+            departure_date=departure_date,
+            adults=adults,
+            max_results=max_results,
+        )
+
+    index = OfferIndex()
+    index.add(normalized, source=f"{origin}-{destination}@{departure_date}")
+    filtered = filter_offers_by_constraints(index.offers(), constraints)
+    notes = f"normalized={len(normalized)}, unique={len(index)}, after_constraints={len(filtered)}"
+
+    if len(filtered) < fanout_min_offers and (flex_days > 0 or nearby_airports > 0) and fanout_budget > 0:
+        searches = _fanout_searches(origin, destination, departure_date, flex_days, nearby_airports, fanout_budget)
+        completed = _fanout(tool, index, searches, adults, max_results, constraints, fanout_min_offers)
+        filtered = filter_offers_by_constraints(index.offers(), constraints)
+        notes += f", fanout_searches={completed}/{len(searches)}, after_fanout={len(filtered)}"
+
+    if not filtered and graph_candidates > 0 and _get_int(constraints, "max_stops", 2) >= 1:
+        graph = get_route_graph()
+        candidates = [
+            c for c in (graph.candidate_paths(origin, destination, max_stops=1, limit=graph_candidates + 1) if graph else [])
+            if c.stops == 1
+        ][:graph_candidates]
+
+        if candidates:
+            combined = _price_graph_candidates(
+                tool,
+                candidates,
+                departure_date,
+                adults,
+                _get_int(constraints, "min_layover_minutes", 45),
+            )
+            index.add(combined, source="graph")
+            filtered = filter_offers_by_constraints(index.offers(), constraints)
+            notes += f", graph_candidates={len(candidates)}, graph_offers={len(filtered)}"
 
-    filtered = filter_offers_by_constraints(normalized, constraints)
-    notes = f"normalized={len(normalized)}, after_constraints={len(filtered)}"
     return RebookResult(offers=filtered, notes=notes)
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
-from ..common.llm_client import ClaudeClient
+from typing import Any, Dict, List, Optional
+from ..common.llm_client import get_llm_client
+from .triage_batcher import TriageBatcher
+
+logger = logging.getLogger(__name__)
+
+# rules | llm | tiered (rules first, LLM only for low-confidence or unknown events)
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "tiered").lower()
+TRIAGE_CONFIDENCE_THRESHOLD = float(os.getenv("TRIAGE_CONFIDENCE_THRESHOLD", "0.7"))
+# Micro-batching of LLM triage for async callers
+TRIAGE_BATCH_MAX_SIZE = int(os.getenv("TRIAGE_BATCH_MAX_SIZE", "16"))
+TRIAGE_BATCH_MAX_WAIT_MS = float(os.getenv("TRIAGE_BATCH_MAX_WAIT_MS", "20"))
 
 
 
@@ -13,6 +29,8 @@ class TriageResult:
     cause: str                            # DELAY / CANCEL / WEATHER / UNKNOWN
     constraints: Dict[str, Any]           # rules for rebooking
     notes: str                            # short explanation
+    confidence: float = 1.0               # how sure the producing tier is
+    tier: str = "rules"                   # rules / llm / rules_fallback
 
 
 def _parse_iso(dt: Optional[str]) -> Optional[datetime]:
@@ -59,6 +77,16 @@ def triage(disruption: Dict[str, Any]) -> TriageResult:
         base = 0.40
         cause = "UNKNOWN"
 
+    # Known event types are routine; the delay length settles how bad it is
+    if cause == "UNKNOWN":
+        confidence = 0.3
+    elif cause == "CANCEL":
+        confidence = 0.9
+    elif mins is not None:
+        confidence = 0.9 if mins >= 0 else 0.5  # negative delay: inconsistent timestamps
+    else:
+        confidence = 0.6
+
     # Adjust severity using delay minutes (if present)
     if mins is not None:
         if mins >= 180:
@@ -90,6 +118,7 @@ def triage(disruption: Dict[str, Any]) -> TriageResult:
         cause=cause,
         constraints=constraints,
         notes=notes,
+        confidence=confidence,
     )
 
 
@@ -108,33 +137,250 @@ _TRIAGE_SCHEMA = """
 """
 
 
-def triage_llm(disruption: dict) -> TriageResult:
-    claude = ClaudeClient()
-
-    system = (
-        "You are an airline operations disruption triage agent. "
-        "You analyze flight disruptions and produce operational constraints."
-    )
+_TRIAGE_BATCH_SCHEMA = """
+{
+  "results": [
+    {
+      "index": 0,
+      "severity_score": 0.0,
+      "cause": "DELAY|CANCEL|WEATHER|CREW|ATC|MAINTENANCE|UNKNOWN",
+      "constraints": {
+        "min_layover_minutes": 30,
+        "max_stops": 2,
+        "avoid_overnight": false
+      },
+      "notes": "string"
+    }
+  ]
+}
+"""
 
-    user = f"""
-Disruption event:
-{disruption}
+_TRIAGE_SYSTEM = (
+    "You are an airline operations disruption triage agent. "
+    "You analyze flight disruptions and produce operational constraints."
+)
 
+_TRIAGE_RULES = """
 Rules:
 - severity_score must be between 0 and 1
 - Cancellations and long delays increase severity
 - Higher severity → stricter constraints
 """
 
-    data = claude.json_response(
-        system=system,
-        user=user,
-        schema_hint=_TRIAGE_SCHEMA,
-    )
 
+def _result_from_llm(data: Dict[str, Any]) -> TriageResult:
     return TriageResult(
         severity_score=float(data["severity_score"]),
         cause=data["cause"],
         constraints=data["constraints"],
         notes=data["notes"],
+        tier="llm",
     )
+
+
+def _triage_prompt(disruption: dict) -> Dict[str, str]:
+    """json_response() arguments for one disruption; also the cache identity of its result"""
+    user = f"""
+Disruption event:
+{json.dumps(disruption, sort_keys=True, default=str)}
+{_TRIAGE_RULES}"""
+    return {"system": _TRIAGE_SYSTEM, "user": user, "schema_hint": _TRIAGE_SCHEMA}
+
+
+def triage_llm(disruption: dict) -> TriageResult:
+    claude = get_llm_client()
+
+    data = claude.json_response(**_triage_prompt(disruption))
+
+    return _result_from_llm(data)
+
+
+def cached_triage_llm(disruption: dict) -> Optional[TriageResult]:
+    """triage_llm() result for this disruption if it is cached, without calling the LLM"""
+    data = get_llm_client().cached_json_response(**_triage_prompt(disruption))
+    return _result_from_llm(data) if data is not None else None
+
+
+def triage_llm_batch(disruptions: List[dict]) -> List[TriageResult]:
+    """
+    Triage many disruptions with one prompt; results come back in input order.
+    Disruptions already triaged (singly or in an earlier batch) are answered from
+    the LLM cache, and each new result is cached under its single-event prompt.
+    Raises if the response doesn't contain exactly one result per disruption.
+    """
+    claude = get_llm_client()
+
+    prompts = [_triage_prompt(d) for d in disruptions]
+    data: List[Optional[Dict[str, Any]]] = [claude.cached_json_response(**p) for p in prompts]
+    missing = [i for i, d in enumerate(data) if d is None]
+
+    if len(missing) == 1:
+        data[missing[0]] = claude.json_response(**prompts[missing[0]])
+    elif missing:
+        events = "\n".join(
+            f"[{n}] {json.dumps(disruptions[i], sort_keys=True, default=str)}" for n, i in enumerate(missing)
+        )
+        user = f"""
+Disruption events ({len(missing)}), each prefixed with its index:
+{events}
+{_TRIAGE_RULES}- Return exactly one result per event, with its index
+"""
+
+        response = claude.json_response(
+            system=_TRIAGE_SYSTEM,
+            user=user,
+            schema_hint=_TRIAGE_BATCH_SCHEMA,
+            max_tokens=min(8192, 1024 + 256 * len(missing)),
+        )
+
+        by_index = {int(item["index"]): item for item in response["results"]}
+        if sorted(by_index) != list(range(len(missing))):
+            raise ValueError(f"batch triage returned indexes {sorted(by_index)} for {len(missing)} events")
+        for n, i in enumerate(missing):
+            item = {k: v for k, v in by_index[n].items() if k != "index"}
+            _result_from_llm(item)  # validate before caching
+            claude.store_json_response(item, **prompts[i])
+            data[i] = item
+
+    return [_result_from_llm(d) for d in data]
+
+
+class _TriageStats:
+    """Per-tier counts and latency for the tiered triage"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalations = 0
+        self.tiers: Dict[str, Dict[str, float]] = {}
+
+    def record(self, tier: str, elapsed_ms: float) -> None:
+        with self._lock:
+            t = self.tiers.setdefault(tier, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            t["count"] += 1
+            t["total_ms"] += elapsed_ms
+            t["max_ms"] = max(t["max_ms"], elapsed_ms)
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def count_escalation(self) -> None:
+        with self._lock:
+            self.escalations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": TRIAGE_MODE,
+                "requests": self.requests,
+                "escalations": self.escalations,
+                "escalation_rate": round(self.escalations / self.requests, 4) if self.requests else 0.0,
+                "tiers": {
+                    name: {
+                        "count": int(t["count"]),
+                        "avg_ms": round(t["total_ms"] / t["count"], 3) if t["count"] else 0.0,
+                        "max_ms": round(t["max_ms"], 3),
+                    }
+                    for name, t in self.tiers.items()
+                },
+            }
+
+
+_stats = _TriageStats()
+
+
+def triage_stats() -> Dict[str, Any]:
+    return {**_stats.snapshot(), "batching": triage_batcher.stats()}
+
+
+def _timed_tier(tier: str, fn, disruption: dict) -> TriageResult:
+    start = time.perf_counter()
+    try:
+        return fn(disruption)
+    finally:
+        _stats.record(tier, (time.perf_counter() - start) * 1000)
+
+
+def _needs_escalation(result: TriageResult, confidence_threshold: float) -> bool:
+    return result.cause == "UNKNOWN" or result.confidence < confidence_threshold
+
+
+def _rules_fallback(result: TriageResult, error: Exception) -> TriageResult:
+    logger.warning(f"LLM triage failed, using rule-based triage: {error}")
+    result.tier = "rules_fallback"
+    return result
+
+
+def triage_tiered(disruption: dict, *, confidence_threshold: float = TRIAGE_CONFIDENCE_THRESHOLD) -> TriageResult:
+    """
+    Rule engine first; escalate to triage_llm() only for unknown event types or
+    when the rules aren't confident enough. If the LLM fails, the rule result is used.
+    """
+    _stats.count_request()
+    result = _timed_tier("rules", triage, disruption)
+    if not _needs_escalation(result, confidence_threshold):
+        return result
+
+    _stats.count_escalation()
+    try:
+        llm_result = _timed_tier("llm", triage_llm, disruption)
+    except Exception as e:
+        return _rules_fallback(result, e)
+
+    llm_result.tier = "llm"
+    return llm_result
+
+
+def run_triage(disruption: dict) -> TriageResult:
+    """Triage according to TRIAGE_MODE"""
+    if TRIAGE_MODE == "rules":
+        _stats.count_request()
+        return _timed_tier("rules", triage, disruption)
+    if TRIAGE_MODE == "llm":
+        _stats.count_request()
+        result = _timed_tier("llm", triage_llm, disruption)
+        result.tier = "llm"
+        return result
+    return triage_tiered(disruption)
+
+
+triage_batcher = TriageBatcher(
+    triage_llm_batch,
+    triage_llm,
+    max_batch_size=TRIAGE_BATCH_MAX_SIZE,
+    max_wait_ms=TRIAGE_BATCH_MAX_WAIT_MS,
+)
+
+
+async def _batched_llm(disruption: dict) -> TriageResult:
+    start = time.perf_counter()
+    try:
+        # Cache hits don't wait for a batch to fill
+        result = await asyncio.to_thread(cached_triage_llm, disruption)
+        if result is None:
+            result = await triage_batcher.triage(disruption)
+    finally:
+        _stats.record("llm", (time.perf_counter() - start) * 1000)
+    result.tier = "llm"
+    return result
+
+
+async def run_triage_async(disruption: dict) -> TriageResult:
+    """run_triage() for async callers; LLM calls are micro-batched with other concurrent requests"""
+    if TRIAGE_MODE == "rules":
+        return run_triage(disruption)
+
+    _stats.count_request()
+    if TRIAGE_MODE == "llm":
+        return await _batched_llm(disruption)
+
+    result = _timed_tier("rules", triage, disruption)
+    if not _needs_escalation(result, TRIAGE_CONFIDENCE_THRESHOLD):
+        return result
+
+    _stats.count_escalation()
+    try:
+        return await _batched_llm(disruption)
+    except Exception as e:
+        return _rules_fallback(result, e)
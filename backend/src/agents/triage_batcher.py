@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TriageBatcher:
+    """
+    Micro-batches concurrent triage requests into one LLM call.
+
+    Requests arriving within max_wait_ms of each other (up to max_batch_size) are
+    deduplicated and sent through batch_fn as a single prompt; each waiting caller
+    gets its own result back. If the batch call or its parsing fails, every item is
+    retried through single_fn.
+
+    Pending requests and the flush timer belong to the event loop that created
+    them; when triage() is first awaited on a different loop (e.g. a new app
+    lifespan or a fresh asyncio.run), that state is dropped and rebound.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[dict]], List[Any]],
+        single_fn: Callable[[dict], Any],
+        *,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0,
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "llm_calls": 0, "fallbacks": 0, "largest_batch": 0}
+
+    async def triage(self, disruption: dict) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        future = loop.create_future()
+        self._pending.append((disruption, future))
+        self._count("requests")
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Anything left from a previous loop can never be flushed or awaited again
+        if self._pending:
+            logger.warning(f"Dropping {len(self._pending)} triage requests left on a previous event loop")
+        self._loop = loop
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        # Identical disruptions share one slot in the prompt
+        groups: Dict[str, List[asyncio.Future]] = {}
+        items: List[dict] = []
+        for disruption, future in batch:
+            key = json.dumps(disruption, sort_keys=True, default=str)
+            if key not in groups:
+                groups[key] = []
+                items.append(disruption)
+            groups[key].append(future)
+
+        self._count("batches")
+        with self._stats_lock:
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
+
+        results: List[Any] = []
+        if len(items) > 1:
+            try:
+                self._count("llm_calls")
+                results = await asyncio.to_thread(self.batch_fn, items)
+                if len(results) != len(items):
+                    raise ValueError(f"expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                logger.warning(f"Batched triage of {len(items)} disruptions failed, falling back to single calls: {e}")
+                self._count("fallbacks")
+                results = []
+
+        if not results:
+            self._count("llm_calls", len(items))
+            results = await asyncio.gather(
+                *(asyncio.to_thread(self.single_fn, item) for item in items),
+                return_exceptions=True,
+            )
+
+        for futures, result in zip(groups.values(), results):
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    # Callers adjust their result (e.g. tier), so each gets a copy
+                    future.set_result(copy.deepcopy(result))
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[stat] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_batch"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,96 @@
+"""
+Persistent store of resolved airport coordinates
+Airports looked up through Amadeus are kept in a JSON file, loaded once at
+startup, so a restarted service doesn't pay for the same lookups again.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_AIRPORTS: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+# code -> when to ask Amadeus again; codes it answered without a usable airport
+_MISSES: Dict[str, float] = {}
+_loaded = False
+
+
+def _store_path() -> Path:
+    return Path(settings.airport_store_path)
+
+
+def load():
+    """Read the store from disk (once); a missing or unreadable file starts empty"""
+    global _loaded
+
+    with _LOCK:
+        if _loaded:
+            return
+        path = _store_path()
+        try:
+            _AIRPORTS.update(json.loads(path.read_text(encoding="utf-8")))
+            logger.info(f"Loaded {len(_AIRPORTS)} airports from {path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable airport store {path}: {e}")
+        _loaded = True
+
+
+def get(code: str) -> Optional[Dict[str, Any]]:
+    if not _loaded:
+        load()
+    return _AIRPORTS.get(code)
+
+
+def put_many(airports: Dict[str, Dict[str, Any]]):
+    """Add airports and rewrite the store file (temp file + atomic rename)"""
+    if not airports:
+        return
+    if not _loaded:
+        load()
+
+    with _LOCK:
+        _AIRPORTS.update(airports)
+        path = _store_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            tmp_path.write_text(json.dumps(_AIRPORTS, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Still served from memory; persisted with the next successful write
+            logger.warning(f"Could not persist airport store {path}: {e}")
+
+
+def known(codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    if not _loaded:
+        load()
+    return {code: _AIRPORTS[code] for code in codes if code in _AIRPORTS}
+
+
+def remember_missing(codes: Iterable[str]):
+    """Negative-cache codes Amadeus has no coordinates for, for AIRPORT_MISS_TTL_SECONDS"""
+    expires_at = time.monotonic() + settings.airport_miss_ttl_seconds
+    with _LOCK:
+        for code in codes:
+            _MISSES[code] = expires_at
+
+
+def recently_missing(codes: Iterable[str]) -> Set[str]:
+    now = time.monotonic()
+    with _LOCK:
+        for code in [code for code, expires_at in _MISSES.items() if expires_at <= now]:
+            del _MISSES[code]
+        return {code for code in codes if code in _MISSES}
+
+
+def size() -> int:
+    return len(_AIRPORTS)
@@ -0,0 +1,201 @@
+"""
+Airport coordinates from OpenFlights.org with a spatial grid index
+Answers "airports within 150 km of ORD" and "airports inside this map viewport"
+without any upstream calls.
+"""
+import csv
+import io
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import openflights_cache
+from .trajectory import great_circle_distance_km
+
+logger = logging.getLogger(__name__)
+
+OPENFLIGHTS_AIRPORTS_URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data/airports.dat"
+MISSING = "\\N"
+
+# 1-degree cells: 180 x 360 grid
+CELL_DEGREES = 1.0
+GRID_ROWS = int(180 / CELL_DEGREES)
+GRID_COLS = int(360 / CELL_DEGREES)
+KM_PER_DEGREE_LAT = 111.2
+
+
+def _cell_rows(lat: np.ndarray) -> np.ndarray:
+    return np.clip(((np.asarray(lat) + 90.0) // CELL_DEGREES).astype(np.int64), 0, GRID_ROWS - 1)
+
+
+def _cell_cols(lon: np.ndarray) -> np.ndarray:
+    return (((np.asarray(lon) + 180.0) // CELL_DEGREES).astype(np.int64)) % GRID_COLS
+
+
+class AirportTable:
+    """IATA airports as parallel arrays, bucketed into a lat/lon grid"""
+
+    def __init__(self, codes: List[str], names: List[str], lat: np.ndarray, lon: np.ndarray):
+        self.codes = codes
+        self.names = names
+        self.lat = lat
+        self.lon = lon
+        self.ids: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+
+        cells = _cell_rows(lat) * GRID_COLS + _cell_cols(lon)
+        self._order = np.argsort(cells, kind="stable")
+        self._offsets = np.zeros(GRID_ROWS * GRID_COLS + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=GRID_ROWS * GRID_COLS), out=self._offsets[1:])
+
+    @classmethod
+    def from_text(cls, text: str) -> "AirportTable":
+        """
+        Parse OpenFlights airports.dat
+        Format: ID,Name,City,Country,IATA,ICAO,Latitude,Longitude,Altitude,Timezone,DST,Tz,Type,Source
+        """
+        codes, names, lats, lons = [], [], [], []
+        seen = set()
+        for parts in csv.reader(io.StringIO(text)):
+            if len(parts) < 8:
+                continue
+            code = parts[4]
+            if len(code) != 3 or code == MISSING or code in seen:
+                continue
+            try:
+                lat, lon = float(parts[6]), float(parts[7])
+            except ValueError:
+                continue
+            seen.add(code)
+            codes.append(code)
+            names.append(parts[1])
+            lats.append(lat)
+            lons.append(lon)
+
+        return cls(codes, names, np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64))
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> "AirportTable":
+        return cls(list(meta["codes"]), list(meta["names"]), arrays["lat"], arrays["lon"])
+
+    def to_cache(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        return {"lat": self.lat, "lon": self.lon}, {"codes": self.codes, "names": self.names}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def airport(self, code: str) -> Optional[Dict[str, Any]]:
+        i = self.ids.get(code)
+        if i is None:
+            return None
+        return {"lat": float(self.lat[i]), "lon": float(self.lon[i]), "name": self.names[i]}
+
+    def _rows_in_cells(self, cell_rows: np.ndarray, cell_cols: np.ndarray) -> np.ndarray:
+        cells = (cell_rows[:, None] * GRID_COLS + cell_cols[None, :]).ravel()
+        starts = self._offsets[cells]
+        lengths = self._offsets[cells + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self._order[positions]
+
+    def _to_dicts(self, rows: np.ndarray, distances: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        result = []
+        for k, i in enumerate(rows.tolist()):
+            item = {"code": self.codes[i], "name": self.names[i], "lat": float(self.lat[i]), "lon": float(self.lon[i])}
+            if distances is not None:
+                item["distanceKm"] = round(float(distances[k]), 1)
+            result.append(item)
+        return result
+
+    def nearest(self, lat: float, lon: float, radius_km: float = 150.0, limit: int = 10) -> List[Dict[str, Any]]:
+        """Airports within radius_km of a point, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        cell_rows = np.arange(_cell_rows(lat_lo), _cell_rows(lat_hi) + 1)
+
+        max_abs_lat = max(abs(lat_lo), abs(lat_hi))
+        if max_abs_lat >= 89.0:
+            cell_cols = np.arange(GRID_COLS)
+        else:
+            dlon = dlat / np.cos(np.radians(max_abs_lat))
+            if dlon >= 180.0:
+                cell_cols = np.arange(GRID_COLS)
+            else:
+                start = int(_cell_cols(lon - dlon))
+                count = int(np.ceil(2 * dlon / CELL_DEGREES)) + 1
+                cell_cols = np.unique((start + np.arange(count)) % GRID_COLS)
+
+        rows = self._rows_in_cells(cell_rows, cell_cols)
+        distances = great_circle_distance_km(lat, lon, self.lat[rows], self.lon[rows])
+        within = distances <= radius_km
+        rows, distances = rows[within], distances[within]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return self._to_dicts(rows[order], distances[order])
+
+    def in_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float, limit: int = 500) -> List[Dict[str, Any]]:
+        """Airports inside a lon/lat box; min_lon > max_lon means the box crosses the antimeridian"""
+        cell_rows = np.arange(_cell_rows(min_lat), _cell_rows(max_lat) + 1)
+        first, last = int(_cell_cols(min_lon)), int(_cell_cols(max_lon))
+        if max_lon - min_lon >= 360.0:
+            cell_cols = np.arange(GRID_COLS)
+        elif first <= last and min_lon <= max_lon:
+            cell_cols = np.arange(first, last + 1)
+        else:
+            cell_cols = np.concatenate([np.arange(first, GRID_COLS), np.arange(0, last + 1)])
+
+        rows = self._rows_in_cells(cell_rows, cell_cols)
+        lat, lon = self.lat[rows], self.lon[rows]
+        inside = (lat >= min_lat) & (lat <= max_lat) & in_lon_range(lon, min_lon, max_lon)
+        return self._to_dicts(np.sort(rows[inside])[:limit])
+
+
+def in_lon_range(lon: np.ndarray, min_lon: float, max_lon: float) -> np.ndarray:
+    """Longitude range test that handles boxes crossing the antimeridian"""
+    if max_lon - min_lon >= 360.0:
+        return np.ones(np.shape(lon), dtype=bool)
+    lon = (np.asarray(lon) + 180.0) % 360.0 - 180.0
+    lo = (min_lon + 180.0) % 360.0 - 180.0
+    hi = (max_lon + 180.0) % 360.0 - 180.0
+    if lo <= hi:
+        return (lon >= lo) & (lon <= hi)
+    return (lon >= lo) | (lon <= hi)
+
+
+_dataset = openflights_cache.OpenFlightsDataset(
+    name="airports",
+    url=OPENFLIGHTS_AIRPORTS_URL,
+    filename="airports.dat",
+    parse=AirportTable.from_text,
+    to_cache=lambda table: table.to_cache(),
+    from_cache=AirportTable.from_arrays,
+)
+
+
+def get_airport_table() -> Optional[AirportTable]:
+    return _dataset.get()
+
+
+def loaded_airport_table() -> Optional[AirportTable]:
+    """Airports if already loaded, without touching disk or network"""
+    return _dataset.loaded
+
+
+def start_background_refresh():
+    _dataset.start_background_refresh()
+
+
+def get_airport(code: str) -> Optional[Dict[str, Any]]:
+    """Local coordinates for an IATA code, or None"""
+    table = get_airport_table()
+    return table.airport(code) if table is not None else None
+
+
+def nearby_airports(code: str, radius_km: float = 150.0, limit: int = 10) -> List[Dict[str, Any]]:
+    """Other airports within radius_km of an airport, nearest first"""
+    table = get_airport_table()
+    if table is None:
+        return []
+    center = table.airport(code)
+    if center is None:
+        return []
+    found = table.nearest(center["lat"], center["lon"], radius_km, limit + 1)
+    return [a for a in found if a["code"] != code][:limit]
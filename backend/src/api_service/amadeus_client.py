@@ -1,13 +1,39 @@
+import json
 import logging
-from typing import Optional, Dict, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator, Set, Tuple, Union
 import httpx
 from datetime import datetime, timedelta
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from .config import settings
+from .circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+# One breaker per upstream endpoint so an outage of e.g. schedules
+# doesn't block flight offer searches
+AMADEUS_ENDPOINTS = (
+    "auth",
+    "flight_offers",
+    "flight_status",
+    "airlines",
+    "locations",
+    "airline_destinations",
+)
+
+# Shared, bounded pool for upstream fan-out (routes and agents). Tasks submitted
+# here must never wait on other tasks in the same pool.
+UPSTREAM_POOL = ThreadPoolExecutor(
+    max_workers=settings.amadeus_max_concurrency,
+    thread_name_prefix="amadeus",
+)
+
+
+class AmadeusResponseInterrupted(Exception):
+    """A streamed Amadeus response failed after its body had started arriving"""
+
 
 class AmadeusClient:
     def __init__(self):
@@ -16,16 +42,46 @@ class AmadeusClient:
         self.client_secret = settings.amadeus_client_secret
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
-        self.http_client = httpx.Client(timeout=30.0)
-    
+        self._token_lock = threading.Lock()
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(
+                settings.amadeus_timeout_seconds,
+                connect=settings.amadeus_connect_timeout_seconds,
+            )
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(
+                f"amadeus.{name}",
+                failure_threshold=settings.amadeus_breaker_failure_threshold,
+                recovery_timeout=settings.amadeus_breaker_recovery_seconds,
+            )
+            for name in AMADEUS_ENDPOINTS
+        }
+        # Last good response per request, served while a circuit is open.
+        # Streamed responses are kept as their body text.
+        self._fallback_cache: "OrderedDict[Tuple, Union[Dict[str, Any], str]]" = OrderedDict()
+        self._fallback_lock = threading.Lock()
+
     def _get_access_token(self) -> Optional[str]:
         if not self.client_id or not self.client_secret:
             logger.warning("Amadeus credentials not configured")
             return None
-        
+
         if self.access_token and self.token_expires_at and datetime.now() < self.token_expires_at:
             return self.access_token
-        
+
+        # Concurrent fan-out calls must not all race to refresh the token
+        with self._token_lock:
+            if self.access_token and self.token_expires_at and datetime.now() < self.token_expires_at:
+                return self.access_token
+            return self._refresh_access_token()
+
+    def _refresh_access_token(self) -> Optional[str]:
+        breaker = self.breakers["auth"]
+        if not breaker.allow_request():
+            logger.warning("Amadeus auth circuit open - skipping token request")
+            return None
+
         try:
             response = self.http_client.post(
                 f"{self.base_url}/v1/security/oauth2/token",
@@ -37,187 +93,314 @@ class AmadeusClient:
                 headers={"Content-Type": "application/x-www-form-urlencoded"}
             )
             response.raise_for_status()
-            
+
             data = response.json()
             self.access_token = data["access_token"]
             expires_in = data.get("expires_in", 1799)
             self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 60)
-            
+            breaker.record_success()
+
             logger.info("Amadeus access token obtained successfully")
             return self.access_token
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"Failed to get Amadeus access token: {e}")
             return None
-    
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def search_flight_offers(
-        self,
-        origin: str,
-        destination: str,
-        departure_date: str,
-        adults: int = 1,
-        max_results: int = 5
-    ) -> Optional[Dict[str, Any]]:
+
+    def _cached_raw(self, cache_key: Tuple) -> Optional[Union[Dict[str, Any], str]]:
+        with self._fallback_lock:
+            cached = self._fallback_cache.get(cache_key)
+        if cached is not None:
+            logger.warning(f"Serving cached Amadeus {cache_key[0]} response")
+        return cached
+
+    def _cached_response(self, cache_key: Tuple) -> Optional[Dict[str, Any]]:
+        cached = self._cached_raw(cache_key)
+        return json.loads(cached) if isinstance(cached, str) else cached
+
+    def _cached_body(self, cache_key: Tuple) -> Optional[Iterator[str]]:
+        cached = self._cached_raw(cache_key)
+        if cached is None:
+            return None
+        return iter([cached if isinstance(cached, str) else json.dumps(cached)])
+
+    def _remember_response(self, cache_key: Tuple, data: Union[Dict[str, Any], str]):
+        with self._fallback_lock:
+            self._fallback_cache[cache_key] = data
+            self._fallback_cache.move_to_end(cache_key)
+            while len(self._fallback_cache) > settings.amadeus_fallback_cache_size:
+                self._fallback_cache.popitem(last=False)
+
+    def _get(self, endpoint: str, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        GET an Amadeus endpoint through its circuit breaker.
+        Timeouts, 5xx and 429 count as upstream failures; while the circuit is open
+        the call fails fast and returns the last good response for the same request, if any.
+        """
+        cache_key = (endpoint, path, tuple(sorted(params.items())))
+
         token = self._get_access_token()
         if not token:
-            return None
-        
+            return self._cached_response(cache_key)
+
+        breaker = self.breakers[endpoint]
+        if not breaker.allow_request():
+            logger.warning(f"Amadeus {endpoint} circuit open - failing fast")
+            return self._cached_response(cache_key)
+
         try:
             response = self.http_client.get(
-                f"{self.base_url}/v2/shopping/flight-offers",
-                params={
-                    "originLocationCode": origin,
-                    "destinationLocationCode": destination,
-                    "departureDate": departure_date,
-                    "adults": adults,
-                    "max": max_results,
-                    "currencyCode": "USD"
-                },
+                f"{self.base_url}{path}",
+                params=params,
                 headers={"Authorization": f"Bearer {token}"}
             )
-            response.raise_for_status()
-            
-            logger.info(f"Successfully fetched flight offers: {origin} -> {destination}")
-            return response.json()
         except Exception as e:
-            logger.error(f"Failed to search flight offers: {e}")
-            return None
-    
-    def get_flight_status(self, flight_number: str, scheduled_date: str) -> Optional[Dict[str, Any]]:
-        token = self._get_access_token()
-        if not token:
+            # Any failure must be recorded, or a half-open probe would never be released
+            breaker.record_failure()
+            logger.error(f"Amadeus {endpoint} request failed: {e}")
+            return self._cached_response(cache_key)
+
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+            logger.error(f"Amadeus {endpoint} returned {response.status_code}")
+            return self._cached_response(cache_key)
+
+        # 4xx means the upstream is healthy but rejected this particular query
+        breaker.record_success()
+        if response.is_error:
+            logger.warning(f"Amadeus {endpoint} rejected request ({response.status_code}): {params}")
             return None
-        
+
         try:
-            carrier_code = flight_number[:2]
-            flight_num = flight_number[2:]
-            
-            response = self.http_client.get(
-                f"{self.base_url}/v2/schedule/flights",
-                params={
-                    "carrierCode": carrier_code,
-                    "flightNumber": flight_num,
-                    "scheduledDepartureDate": scheduled_date
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            
-            logger.info(f"Successfully fetched flight status for {flight_number}")
-            return response.json()
-        except Exception as e:
-            logger.error(f"Failed to get flight status: {e}")
+            data = response.json()
+        except ValueError as e:
+            logger.error(f"Amadeus {endpoint} returned invalid JSON: {e}")
             return None
-    
-    def get_airline_codes(self) -> Optional[Dict[str, Any]]:
+
+        self._remember_response(cache_key, data)
+        return data
+
+    def _stream(self, endpoint: str, path: str, params: Dict[str, Any]) -> Optional[Iterator[str]]:
+        """
+        Like _get, but returns the response body as an iterator of text chunks for
+        incremental parsing. Status is checked (and the breaker updated) before this
+        returns; a read error mid-body counts as a failure and makes the iterator raise
+        AmadeusResponseInterrupted, so callers can discard what they parsed and fall back.
+        """
+        cache_key = (endpoint, path, tuple(sorted(params.items())))
+
         token = self._get_access_token()
         if not token:
-            return None
-        
+            return self._cached_body(cache_key)
+
+        breaker = self.breakers[endpoint]
+        if not breaker.allow_request():
+            logger.warning(f"Amadeus {endpoint} circuit open - failing fast")
+            return self._cached_body(cache_key)
+
+        request = self.http_client.build_request(
+            "GET",
+            f"{self.base_url}{path}",
+            params=params,
+            headers={"Authorization": f"Bearer {token}"}
+        )
         try:
-            response = self.http_client.get(
-                f"{self.base_url}/v1/reference-data/airlines",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            
-            logger.info("Successfully fetched airline codes from Amadeus")
-            return response.json()
+            response = self.http_client.send(request, stream=True)
         except Exception as e:
-            logger.error(f"Failed to get airline codes: {e}")
-            return None
-    
-    def get_airport_by_code(self, airport_code: str) -> Optional[Dict[str, Any]]:
-        """Fetch airport information including coordinates by IATA code"""
-        token = self._get_access_token()
-        if not token:
+            # Any failure must be recorded, or a half-open probe would never be released
+            breaker.record_failure()
+            logger.error(f"Amadeus {endpoint} request failed: {e}")
+            return self._cached_body(cache_key)
+
+        if response.status_code >= 500 or response.status_code == 429:
+            response.close()
+            breaker.record_failure()
+            logger.error(f"Amadeus {endpoint} returned {response.status_code}")
+            return self._cached_body(cache_key)
+
+        breaker.record_success()
+        if response.is_error:
+            response.close()
+            logger.warning(f"Amadeus {endpoint} rejected request ({response.status_code}): {params}")
             return None
-        
+
+        return self._iter_body(endpoint, cache_key, response)
+
+    def _iter_body(self, endpoint: str, cache_key: Tuple, response: httpx.Response) -> Iterator[str]:
+        chunks = []
         try:
-            response = self.http_client.get(
-                f"{self.base_url}/v1/reference-data/locations",
-                params={
-                    "subType": "AIRPORT",
-                    "keyword": airport_code,
-                    "page[limit]": 1
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("data") and len(data["data"]) > 0:
-                airport = data["data"][0]
-                logger.info(f"Successfully fetched airport data for {airport_code}")
-                return airport
-            
-            logger.warning(f"No airport data found for {airport_code}")
-            return None
+            for chunk in response.iter_text():
+                chunks.append(chunk)
+                yield chunk
         except Exception as e:
-            logger.error(f"Failed to get airport data for {airport_code}: {e}")
-            return None
-    
-    def get_airports_by_codes(self, airport_codes: list) -> Dict[str, Dict[str, Any]]:
-        """Fetch multiple airports data in batch"""
+            self.breakers[endpoint].record_failure()
+            logger.error(f"Amadeus {endpoint} response interrupted: {e}")
+            raise AmadeusResponseInterrupted(f"Amadeus {endpoint} response interrupted: {e}") from e
+        finally:
+            response.close()
+        # Body text is far smaller than its parsed tree, so that is what gets cached
+        self._remember_response(cache_key, "".join(chunks))
+
+    def breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+
+    @staticmethod
+    def _flight_offers_params(
+        origin: str, destination: str, departure_date: str, adults: int, max_results: int
+    ) -> Dict[str, Any]:
+        return {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "adults": adults,
+            "max": max_results,
+            "currencyCode": "USD"
+        }
+
+    def search_flight_offers(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        adults: int = 1,
+        max_results: int = 5
+    ) -> Optional[Dict[str, Any]]:
+        result = self._get(
+            "flight_offers",
+            "/v2/shopping/flight-offers",
+            self._flight_offers_params(origin, destination, departure_date, adults, max_results),
+        )
+
+        if result is not None:
+            logger.info(f"Successfully fetched flight offers: {origin} -> {destination}")
+        return result
+
+    def stream_flight_offers(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        adults: int = 1,
+        max_results: int = 5
+    ) -> Optional[Iterator[str]]:
+        """search_flight_offers() body as text chunks, for StreamingOffersParser"""
+        return self._stream(
+            "flight_offers",
+            "/v2/shopping/flight-offers",
+            self._flight_offers_params(origin, destination, departure_date, adults, max_results),
+        )
+
+    def cached_flight_offers(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        adults: int = 1,
+        max_results: int = 5
+    ) -> Optional[Iterator[str]]:
+        """Last good stream_flight_offers() body for the same search, without calling Amadeus"""
+        params = self._flight_offers_params(origin, destination, departure_date, adults, max_results)
+        return self._cached_body(("flight_offers", "/v2/shopping/flight-offers", tuple(sorted(params.items()))))
+
+    def get_flight_status(self, flight_number: str, scheduled_date: str) -> Optional[Dict[str, Any]]:
+        carrier_code = flight_number[:2]
+        flight_num = flight_number[2:]
+
+        result = self._get(
+            "flight_status",
+            "/v2/schedule/flights",
+            {
+                "carrierCode": carrier_code,
+                "flightNumber": flight_num,
+                "scheduledDepartureDate": scheduled_date
+            },
+        )
+
+        if result is not None:
+            logger.info(f"Successfully fetched flight status for {flight_number}")
+        return result
+
+    def get_airline_codes(self) -> Optional[Dict[str, Any]]:
+        result = self._get("airlines", "/v1/reference-data/airlines", {})
+
+        if result is not None:
+            logger.info("Successfully fetched airline codes from Amadeus")
+        return result
+
+    def _lookup_airport(self, airport_code: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(airport, answered): answered is False when Amadeus couldn't be asked or failed"""
+        data = self._get(
+            "locations",
+            "/v1/reference-data/locations",
+            {
+                "subType": "AIRPORT",
+                "keyword": airport_code,
+                "page[limit]": 1
+            },
+        )
+
+        if data and data.get("data") and len(data["data"]) > 0:
+            airport = data["data"][0]
+            logger.info(f"Successfully fetched airport data for {airport_code}")
+            return airport, True
+
+        logger.warning(f"No airport data found for {airport_code}")
+        return None, data is not None
+
+    def get_airport_by_code(self, airport_code: str) -> Optional[Dict[str, Any]]:
+        """Fetch airport information including coordinates by IATA code"""
+        return self._lookup_airport(airport_code)[0]
+
+    def get_airports_by_codes(self, airport_codes: list, unknown: Optional[Set[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch multiple airports concurrently; codes that can't be resolved are left out.
+        Codes Amadeus answered without an airport with coordinates are added to unknown.
+        """
+        codes = list(dict.fromkeys(airport_codes))
+        if not codes:
+            return {}
+
         airports = {}
-        for code in airport_codes:
-            airport_data = self.get_airport_by_code(code)
-            if airport_data:
-                geo_code = airport_data.get("geoCode", {})
+        for code, (airport_data, answered) in zip(codes, UPSTREAM_POOL.map(self._lookup_airport, codes)):
+            geo_code = (airport_data or {}).get("geoCode") or {}
+            if "latitude" in geo_code and "longitude" in geo_code:
                 airports[code] = {
-                    "lat": geo_code.get("latitude", 0),
-                    "lon": geo_code.get("longitude", 0),
+                    "lat": geo_code["latitude"],
+                    "lon": geo_code["longitude"],
                     "name": airport_data.get("name", code)
                 }
+            elif answered and unknown is not None:
+                unknown.add(code)
         return airports
-    
+
     def get_airline_routes(self, airline_code: str) -> Optional[Dict[str, Any]]:
         """Get all routes operated by a specific airline"""
-        token = self._get_access_token()
-        if not token:
-            return None
-        
-        try:
-            response = self.http_client.get(
-                f"{self.base_url}/v1/airline/destinations",
-                params={
-                    "airlineCode": airline_code
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            
+        result = self._get(
+            "airline_destinations",
+            "/v1/airline/destinations",
+            {"airlineCode": airline_code},
+        )
+
+        if result is not None:
             logger.info(f"Successfully fetched routes for airline {airline_code}")
-            return response.json()
-        except Exception as e:
-            logger.debug(f"Airline routes not available for {airline_code}: {e}")
-            return None
-    
+        return result
+
     def get_airline_schedule(self, airline_code: str, departure_date: str) -> Optional[Dict[str, Any]]:
         """Get airline's full schedule for a specific date"""
-        token = self._get_access_token()
-        if not token:
-            return None
-        
-        try:
-            # Search for scheduled flights by carrier
-            response = self.http_client.get(
-                f"{self.base_url}/v2/schedule/flights",
-                params={
-                    "carrierCode": airline_code,
-                    "scheduledDepartureDate": departure_date
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            
-            result = response.json()
+        # Search for scheduled flights by carrier
+        result = self._get(
+            "flight_status",
+            "/v2/schedule/flights",
+            {
+                "carrierCode": airline_code,
+                "scheduledDepartureDate": departure_date
+            },
+        )
+
+        if result is not None:
             logger.info(f"Successfully fetched schedule for airline {airline_code} on {departure_date} - {len(result.get('data', []))} flights")
-            return result
-        except Exception as e:
-            logger.warning(f"Schedule not available for {airline_code} on {departure_date}: {e}")
-            return None
-    
+        return result
+
     def close(self):
         self.http_client.close()
 
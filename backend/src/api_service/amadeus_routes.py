@@ -1,40 +1,106 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterable, List, Tuple
 import logging
+import re
+import threading
+from concurrent.futures import as_completed
 from datetime import datetime, timedelta
+from functools import partial
 
-from .amadeus_client import amadeus_client
+import numpy as np
+
+from .amadeus_client import UPSTREAM_POOL, amadeus_client
+from .config import settings
 from .kafka_client import kafka_producer
 from ..common.events.envelope import EventEnvelope
 from ..common.events.topics import FLIGHT_OPS_EVENTS_V1
 from . import store
+from . import flight_index
+from . import trajectory
+from . import airport_store
+from . import airports_data
 from .routes_data import get_airline_routes
+from .geo_routes import parse_bbox
 
 router = APIRouter(prefix="/amadeus", tags=["Amadeus"])
 logger = logging.getLogger(__name__)
 
-AIRPORT_COORDS_CACHE: Dict[str, Dict[str, Any]] = {}
 AIRLINES_CACHE: Optional[Dict[str, Any]] = None
 AIRLINES_CACHE_EXPIRY: Optional[datetime] = None
 
+# scheduled date -> flight number -> (expires at, status response)
+FLIGHT_STATUS_CACHE: Dict[str, Dict[str, Tuple[datetime, Optional[Dict[str, Any]]]]] = {}
+_FLIGHT_STATUS_LOCK = threading.Lock()
+
+# airline -> (expires at, discovered flights before crisis cancellations)
+ALL_FLIGHTS_CACHE: Dict[str, Tuple[datetime, List[Dict[str, Any]]]] = {}
+_ALL_FLIGHTS_LOCK = threading.Lock()
+# airline -> lock held while its discovery runs, so concurrent misses probe once
+_ALL_FLIGHTS_INFLIGHT: Dict[str, threading.Lock] = {}
+ALL_FLIGHTS_QUOTA = 20
+SAMPLE_ROUTES = [
+    ("JFK", "LHR"), ("LHR", "JFK"),
+    ("LAX", "NRT"), ("NRT", "LAX"),
+]
+
+# Synthetic schedule used for map trajectories: departure 12h ago, arrival in 12h
+TRAJECTORY_WINDOW_HOURS = 24
+MAX_BATCH_TRAJECTORIES = 500
+MAX_BULK_AIRPORTS = 500
+# Track resolution for map paths; thinned by zoom level
+MAP_TRACK_POINTS = 65
+# Block time estimate for flights without an Amadeus duration
+MAP_CRUISE_KMH = 800.0
+MAP_TAXI_HOURS = 0.5
+
+def resolve_airports(airport_codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Coordinates for many airports: persistent store, then OpenFlights airports.dat,
+    then concurrent Amadeus lookups for whatever is left. Amadeus results are persisted;
+    codes Amadeus doesn't know are negative-cached so they aren't asked for again.
+    """
+    codes = list(dict.fromkeys(code.upper() for code in airport_codes))
+    resolved = airport_store.known(codes)
+    
+    for code in codes:
+        if code not in resolved:
+            local = airports_data.get_airport(code)
+            if local:
+                resolved[code] = local
+    
+    unresolved = [code for code in codes if code not in resolved]
+    known_missing = airport_store.recently_missing(unresolved)
+    misses = [code for code in unresolved if code not in known_missing]
+    if misses:
+        unknown = set()
+        fetched = amadeus_client.get_airports_by_codes(misses, unknown=unknown)
+        airport_store.put_many(fetched)
+        airport_store.remember_missing(unknown)
+        resolved.update(fetched)
+        for code in misses:
+            if code not in fetched:
+                logger.warning(f"Could not fetch coordinates for airport {code}")
+    
+    return resolved
+
 def get_airport_coords(airport_code: str) -> Optional[Dict[str, Any]]:
-    """Get airport coordinates from cache or fetch from Amadeus API"""
-    if airport_code in AIRPORT_COORDS_CACHE:
-        return AIRPORT_COORDS_CACHE[airport_code]
-    
-    airport_data = amadeus_client.get_airport_by_code(airport_code)
-    if airport_data:
-        geo_code = airport_data.get("geoCode", {})
-        coords = {
-            "lat": geo_code.get("latitude", 0),
-            "lon": geo_code.get("longitude", 0),
-            "name": airport_data.get("name", airport_code)
-        }
-        AIRPORT_COORDS_CACHE[airport_code] = coords
-        return coords
+    """Get airport coordinates from the local stores or fetch from Amadeus API"""
+    return resolve_airports([airport_code]).get(airport_code.upper())
+
+@router.get("/airports")
+def get_airports(
+    codes: str = Query(..., description="Comma-separated IATA airport codes")
+):
+    """Coordinates for many airports in one call; unknown codes are listed in missing"""
+    airport_codes = list(dict.fromkeys(c.strip().upper() for c in codes.split(",") if c.strip()))
+    if len(airport_codes) > MAX_BULK_AIRPORTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_AIRPORTS} airports per request")
     
-    logger.warning(f"Could not fetch coordinates for airport {airport_code}")
-    return None
+    resolved = resolve_airports(airport_codes)
+    return {
+        "airports": {code: resolved[code] for code in airport_codes if code in resolved},
+        "missing": [code for code in airport_codes if code not in resolved],
+    }
 
 @router.get("/airports/{airport_code}")
 def get_airport_info(airport_code: str):
@@ -87,6 +153,52 @@ def get_airlines():
     return response_data
 
 
+def get_flight_status_cached(flight_number: str, scheduled_date: str) -> Optional[Dict[str, Any]]:
+    """Flight status lookup cached per scheduled date; misses are cached for a shorter time"""
+    now = datetime.now()
+    with _FLIGHT_STATUS_LOCK:
+        date_cache = FLIGHT_STATUS_CACHE.get(scheduled_date, {})
+        cached = date_cache.get(flight_number)
+        if cached and now < cached[0]:
+            return cached[1]
+    
+    status_data = amadeus_client.get_flight_status(flight_number, scheduled_date)
+    
+    ttl = settings.flight_status_cache_ttl_seconds
+    if not status_data or not status_data.get("data"):
+        ttl = min(ttl, 120)
+    
+    with _FLIGHT_STATUS_LOCK:
+        # Drop whole dates that are already in the past
+        today = now.strftime("%Y-%m-%d")
+        for stale_date in [d for d in FLIGHT_STATUS_CACHE if d < today]:
+            del FLIGHT_STATUS_CACHE[stale_date]
+        FLIGHT_STATUS_CACHE.setdefault(scheduled_date, {})[flight_number] = (
+            now + timedelta(seconds=ttl),
+            status_data,
+        )
+    
+    return status_data
+
+
+def fetch_flight_statuses(queries: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[Dict[str, Any]]]:
+    """Resolve a deduplicated set of (flight number, date) queries concurrently"""
+    unique_queries = list(dict.fromkeys(queries))
+    futures = {
+        query: UPSTREAM_POOL.submit(get_flight_status_cached, *query)
+        for query in unique_queries
+    }
+    
+    results = {}
+    for query, future in futures.items():
+        try:
+            results[query] = future.result()
+        except Exception as e:
+            logger.debug(f"No status for {query[0]} on {query[1]}: {e}")
+            results[query] = None
+    return results
+
+
 @router.get("/flights/next24h")
 def get_next_24h_flights(
     airline: str = Query(..., description="Airline IATA code"),
@@ -96,33 +208,41 @@ def get_next_24h_flights(
     now = datetime.now()
     flights = []
     
-    for hours_ahead in [0, 6, 12, 18]:
-        check_date = (now + timedelta(hours=hours_ahead)).strftime("%Y-%m-%d")
-        
-        for flight_num in range(1, 25):
-            full_flight_num = f"{airline}{flight_num:03d}"
-            status_data = amadeus_client.get_flight_status(full_flight_num, check_date)
-            
-            if status_data and "data" in status_data:
-                for flight in status_data["data"]:
-                    if "flightDesignator" in flight:
-                        departure = flight.get("flightPoints", [])[0] if flight.get("flightPoints") else {}
-                        arrival = flight.get("flightPoints", [])[1] if len(flight.get("flightPoints", [])) > 1 else {}
-                        
-                        flights.append({
-                            "flightNumber": full_flight_num,
-                            "airline": airline,
-                            "origin": departure.get("iataCode", origin),
-                            "destination": arrival.get("iataCode", "N/A"),
-                            "scheduledDeparture": departure.get("departure", {}).get("timings", [{}])[0].get("value", now.isoformat()),
-                            "status": flight.get("flightStatus", "SCHEDULED"),
-                            "delayMinutes": 0,
-                        })
+    # The 0/6/12/18h lookahead spans at most two calendar dates
+    check_dates = sorted({
+        (now + timedelta(hours=hours_ahead)).strftime("%Y-%m-%d")
+        for hours_ahead in [0, 6, 12, 18]
+    })
+    queries = [
+        (f"{airline}{flight_num:03d}", check_date)
+        for check_date in check_dates
+        for flight_num in range(1, 25)
+    ]
+    statuses = fetch_flight_statuses(queries)
+    
+    for (full_flight_num, check_date), status_data in statuses.items():
+        if status_data and "data" in status_data:
+            for flight in status_data["data"]:
+                if "flightDesignator" in flight:
+                    departure = flight.get("flightPoints", [])[0] if flight.get("flightPoints") else {}
+                    arrival = flight.get("flightPoints", [])[1] if len(flight.get("flightPoints", [])) > 1 else {}
+                    
+                    flights.append({
+                        "flightNumber": full_flight_num,
+                        "airline": airline,
+                        "origin": departure.get("iataCode", origin),
+                        "destination": arrival.get("iataCode", "N/A"),
+                        "scheduledDeparture": departure.get("departure", {}).get("timings", [{}])[0].get("value", now.isoformat()),
+                        "status": flight.get("flightStatus", "SCHEDULED"),
+                        "delayMinutes": 0,
+                    })
     
     if not flights:
         logger.warning(f"No flight data found for {airline} from {origin}")
         return {"flights": [], "count": 0}
     
+    flight_index.record_flights(flights)
+    
     return {"flights": flights, "count": len(flights)}
 
 
@@ -173,130 +293,326 @@ def search_flight_offers(
     }
 
 
-@router.get("/all-flights")
-def get_all_flights(
-    airline: str = Query(..., description="Airline IATA code (required)")
-):
-    """Discover airline routes from OpenFlights, then search for flights"""
+def _departure_status(full_flight_num: str, dep_time_str: str, now: datetime) -> Optional[str]:
+    """Status for a departure, or None when it falls outside the -3h..+12h map window"""
+    if not dep_time_str:
+        return "SCHEDULED"
+    
+    dep_time = datetime.fromisoformat(dep_time_str.replace("Z", "+00:00"))
+    hours_until = (dep_time.replace(tzinfo=None) - now).total_seconds() / 3600
+    
+    if hours_until < -3 or hours_until > 12:
+        return None
+    
+    if hours_until < -2:
+        return "DEPARTED"
+    elif hours_until < 0:
+        return "BOARDING"
+    elif hours_until < 2:
+        return "DELAYED" if (hash(full_flight_num) % 5 == 0) else "ON_TIME"
+    return "ON_TIME"
+
+
+def _probe_route_offers(airline: str, origin: str, destination: str, departure_date: str, now: datetime) -> List[Dict[str, Any]]:
+    """Flights of the selected airline found in offers on one OpenFlights route"""
+    flights = []
+    offers = amadeus_client.search_flight_offers(
+        origin=origin,
+        destination=destination,
+        departure_date=departure_date,
+        adults=1,
+        max_results=3
+    )
+    
+    if offers and "data" in offers:
+        for offer in offers["data"]:
+            for itinerary in offer.get("itineraries", []):
+                for segment in itinerary.get("segments", []):
+                    carrier_code = segment.get("carrierCode", "")
+                    full_flight_num = f"{carrier_code}{segment.get('number', '')}"
+                    
+                    # Only flights from selected airline
+                    if carrier_code != airline:
+                        continue
+                    
+                    dep_time_str = segment.get("departure", {}).get("at", "")
+                    status = _departure_status(full_flight_num, dep_time_str, now)
+                    if status is None:
+                        continue
+                    
+                    flights.append({
+                        "flightNumber": full_flight_num,
+                        "airline": carrier_code,
+                        "origin": segment.get("departure", {}).get("iataCode", origin),
+                        "destination": segment.get("arrival", {}).get("iataCode", destination),
+                        "scheduledDeparture": dep_time_str or departure_date,
+                        "status": status,
+                        "delayMinutes": 0,
+                    })
+    return flights
+
+
+def _probe_flight_number(airline: str, full_flight_num: str, departure_date: str, now: datetime) -> List[Dict[str, Any]]:
+    """International departures for one flight number from the flight status API"""
+    flights = []
+    status_data = get_flight_status_cached(full_flight_num, departure_date)
     
+    if status_data and "data" in status_data:
+        for flight in status_data["data"]:
+            if "flightDesignator" not in flight:
+                continue
+            
+            flight_points = flight.get("flightPoints", [])
+            if len(flight_points) < 2:
+                continue
+            
+            departure = flight_points[0]
+            arrival = flight_points[1]
+            
+            origin = departure.get("iataCode", "")
+            destination = arrival.get("iataCode", "")
+            
+            if not origin or not destination:
+                continue
+            
+            # International flights only
+            if origin[0] == destination[0]:
+                continue
+            
+            dep_timing = departure.get("departure", {}).get("timings", [{}])[0]
+            dep_time_str = dep_timing.get("value", "")
+            status = _departure_status(full_flight_num, dep_time_str, now)
+            if status is None:
+                continue
+            
+            flights.append({
+                "flightNumber": full_flight_num,
+                "airline": airline,
+                "origin": origin,
+                "destination": destination,
+                "scheduledDeparture": dep_time_str or departure_date,
+                "status": status,
+                "delayMinutes": 0,
+            })
+    return flights
+
+
+def _probe_sample_route(origin: str, destination: str, departure_date: str, now: datetime) -> List[Dict[str, Any]]:
+    """First-segment flights of any airline on a well-known route"""
+    flights = []
+    offers = amadeus_client.search_flight_offers(
+        origin=origin,
+        destination=destination,
+        departure_date=departure_date,
+        adults=1,
+        max_results=5
+    )
+    
+    if offers and "data" in offers:
+        for offer in offers["data"]:
+            itinerary = offer.get("itineraries", [{}])[0]
+            segment = itinerary.get("segments", [{}])[0]
+            
+            # In final fallback, accept ANY airline
+            # (OpenFlights routes and flight status APIs already tried)
+            carrier_code = segment.get("carrierCode", "XX")
+            full_flight_num = f"{carrier_code}{segment.get('number', '0000')}"
+            
+            departure_info = segment.get("departure", {})
+            arrival_info = segment.get("arrival", {})
+            
+            dep_time_str = departure_info.get("at", "")
+            status = _departure_status(full_flight_num, dep_time_str, now)
+            if status is None:
+                continue
+            
+            flights.append({
+                "flightNumber": full_flight_num,
+                "airline": carrier_code,
+                "origin": departure_info.get("iataCode", origin),
+                "destination": arrival_info.get("iataCode", destination),
+                "scheduledDeparture": dep_time_str or departure_date,
+                "status": status,
+                "duration": itinerary.get("duration", "N/A"),
+                "price": offer.get("price", {}).get("total", "N/A"),
+            })
+    return flights
+
+
+def _collect_flights(probes: List[Callable[[], List[Dict[str, Any]]]], quota: int) -> List[Dict[str, Any]]:
+    """
+    Run probes concurrently on the upstream pool and return unique flights in completion order.
+    Outstanding probes are cancelled as soon as the quota is met.
+    """
+    flights: List[Dict[str, Any]] = []
+    seen = set()
+    futures = [UPSTREAM_POOL.submit(probe) for probe in probes]
+    
+    try:
+        for future in as_completed(futures):
+            try:
+                found = future.result()
+            except Exception as e:
+                logger.debug(f"Flight probe failed: {e}")
+                continue
+            
+            for flight in found:
+                if flight["flightNumber"] not in seen:
+                    seen.add(flight["flightNumber"])
+                    flights.append(flight)
+            
+            if len(flights) >= quota:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    
+    return flights[:quota]
+
+
+def _discover_flights(airline: str) -> List[Dict[str, Any]]:
     now = datetime.now()
-    all_flights = []
+    departure_date = now.strftime("%Y-%m-%d")
     
-    # Step 1: Get airline's actual routes from OpenFlights database
+    # Step 1: Get airline's actual routes from OpenFlights database,
+    # then search for flights on each discovered route
     logger.info(f"Fetching routes for airline {airline} from OpenFlights.org")
     discovered_routes = get_airline_routes(airline, max_routes=20)
+    logger.info(f"Found {len(discovered_routes)} routes for {airline}")
     
-    if len(discovered_routes) == 0:
-        logger.warning(f"No routes found for airline {airline} in OpenFlights database")
-        return {"flights": []}
+    flights = _collect_flights(
+        [
+            partial(_probe_route_offers, airline, origin, destination, departure_date, now)
+            for origin, destination in discovered_routes
+        ],
+        ALL_FLIGHTS_QUOTA,
+    )
     
-    logger.info(f"Found {len(discovered_routes)} routes for {airline}")
+    # Step 2: Flight status API with common flight numbers 1-30
+    if not flights:
+        logger.info(f"Trying flight status API for airline {airline}")
+        flights = _collect_flights(
+            [
+                partial(_probe_flight_number, airline, f"{airline}{flight_num:03d}", departure_date, now)
+                for flight_num in range(1, 31)
+            ],
+            ALL_FLIGHTS_QUOTA,
+        )
     
-    # Step 2: Search for actual flights on each discovered route
-    departure_date = now.strftime("%Y-%m-%d")
+    # Last fallback: route sampling if still no flights
+    if not flights:
+        logger.info(f"Trying route sampling for airline {airline}")
+        flights = _collect_flights(
+            [
+                partial(_probe_sample_route, origin, destination, departure_date, now)
+                for origin, destination in SAMPLE_ROUTES
+            ],
+            ALL_FLIGHTS_QUOTA,
+        )
     
-    for origin, destination in discovered_routes:
-        if len(all_flights) >= 20:
-            break
-        
-        try:
-            offers = amadeus_client.search_flight_offers(
-                origin=origin,
-                destination=destination,
-                departure_date=departure_date,
-                adults=1,
-                max_results=3
-            )
-            
-            if offers and "data" in offers:
-                for offer in offers["data"]:
-                    for itinerary in offer.get("itineraries", []):
-                        for segment in itinerary.get("segments", []):
-                            carrier_code = segment.get("carrierCode", "")
-                            flight_num = segment.get("number", "")
-                            full_flight_num = f"{carrier_code}{flight_num}"
-                            
-                            # Only flights from selected airline
-                            if carrier_code != airline:
-                                continue
-                            
-                            dep_time_str = segment.get("departure", {}).get("at", "")
-                            if dep_time_str:
-                                dep_time = datetime.fromisoformat(dep_time_str.replace("Z", "+00:00"))
-                                hours_until = (dep_time.replace(tzinfo=None) - now).total_seconds() / 3600
-                                
-                                # 15hr window filter (-3 to +12)
-                                if hours_until < -3 or hours_until > 12:
-                                    continue
-                                
-                                if hours_until < -2:
-                                    status = "DEPARTED"
-                                elif hours_until < 0:
-                                    status = "BOARDING"
-                                elif hours_until < 2:
-                                    status = "DELAYED" if (hash(full_flight_num) % 5 == 0) else "ON_TIME"
-                                else:
-                                    status = "ON_TIME"
-                            else:
-                                status = "SCHEDULED"
-                            
-                            is_cancelled = store.is_flight_cancelled(full_flight_num)
-                            if is_cancelled:
-                                status = "CANCELLED"
-                            
-                            all_flights.append({
-                                "flightNumber": full_flight_num,
-                                "airline": carrier_code,
-                                "origin": segment.get("departure", {}).get("iataCode", origin),
-                                "destination": segment.get("arrival", {}).get("iataCode", destination),
-                                "scheduledDeparture": dep_time_str or departure_date,
-                                "status": status,
-                                "delayMinutes": 0,
-                            })
-                            
-                            if len(all_flights) >= 20:
-                                break
-                        if len(all_flights) >= 20:
-                            break
-        except Exception as e:
-            logger.debug(f"No flights on {origin}->{destination}: {e}")
-            continue
+    return flights
+
+
+@router.get("/all-flights")
+def get_all_flights(
+    airline: str = Query(..., description="Airline IATA code (required)")
+):
+    """Discover airline routes from OpenFlights, then search for flights"""
+    all_flights = _with_crisis_status(_airline_flights(airline))
     
-    logger.info(f"Found {len(all_flights)} flights from {airline} on discovered routes")
-    return {"flights": all_flights}
+    logger.info(f"Found {len(all_flights)} unique flights from Amadeus API")
+    return {"flights": all_flights, "count": len(all_flights)}
+
+
+def _cached_airline_flights(airline: str) -> Optional[List[Dict[str, Any]]]:
+    with _ALL_FLIGHTS_LOCK:
+        cached = ALL_FLIGHTS_CACHE.get(airline)
+    if cached and datetime.now() < cached[0]:
+        return cached[1]
+    return None
+
+
+def _airline_flights(airline: str) -> List[Dict[str, Any]]:
+    """
+    Discovered flights for an airline, cached for ALL_FLIGHTS_CACHE_TTL_SECONDS.
+    Concurrent misses for the same airline wait for one discovery instead of each probing.
+    """
+    cached = _cached_airline_flights(airline)
+    if cached is not None:
+        logger.info(f"Using cached flights for {airline} ({len(cached)} flights)")
+        return cached
+    
+    with _ALL_FLIGHTS_LOCK:
+        key_lock = _ALL_FLIGHTS_INFLIGHT.setdefault(airline, threading.Lock())
+    with key_lock:
+        cached = _cached_airline_flights(airline)
+        if cached is not None:
+            return cached
+        try:
+            discovered = _discover_flights(airline)
+            flight_index.record_flights(discovered)
+            # Stored before the in-flight lock goes away, so late arrivals hit the cache
+            with _ALL_FLIGHTS_LOCK:
+                ALL_FLIGHTS_CACHE[airline] = (
+                    datetime.now() + timedelta(seconds=settings.all_flights_cache_ttl_seconds),
+                    discovered,
+                )
+        finally:
+            with _ALL_FLIGHTS_LOCK:
+                _ALL_FLIGHTS_INFLIGHT.pop(airline, None)
+    return discovered
+
+
+def _with_crisis_status(flights: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of flights with crisis cancellations applied; they change between polls, so apply on every read"""
+    result = []
+    for flight in flights:
+        flight = dict(flight)
+        if store.is_flight_cancelled(flight["flightNumber"]):
+            flight["status"] = "CANCELLED"
+        result.append(flight)
+    return result
+
+
+def _resolve_flight(flight_number: str) -> Optional[Dict[str, Any]]:
+    """Look up a flight missing from the index with a single flight status call and index it"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    status_data = get_flight_status_cached(flight_number, today)
+    
+    if status_data and "data" in status_data and len(status_data["data"]) > 0:
+        flight_data = status_data["data"][0]
+        flight_points = flight_data.get("flightPoints", [])
+        if len(flight_points) >= 2 and flight_points[0].get("iataCode") and flight_points[1].get("iataCode"):
+            dep_timing = flight_points[0].get("departure", {}).get("timings", [{}])[0]
+            flight_info = {
+                "flightNumber": flight_number,
+                "airline": flight_number[:2],
+                "origin": flight_points[0]["iataCode"],
+                "destination": flight_points[1]["iataCode"],
+                "scheduledDeparture": dep_timing.get("value", today),
+            }
+            flight_index.record_flight(flight_info)
+            return flight_info
+    return None
 
 
 @router.get("/flight-trajectory/{flight_number}")
-def get_flight_trajectory(flight_number: str):
-    """Get flight trajectory using actual flight route from Amadeus API"""
-    
-    # Extract airline code from flight number
-    airline_code = flight_number[:2]
+def get_flight_trajectory(
+    flight_number: str,
+    points: int = Query(25, ge=2, le=1000, description="Number of positions along the great-circle path"),
+):
+    """Get flight trajectory for a flight from the flight index, falling back to the Amadeus flight status API"""
+    flight_number = flight_number.upper().strip()
     
-    all_flights_data = get_all_flights(airline=airline_code)
-    flight_info = next((f for f in all_flights_data["flights"] if f["flightNumber"] == flight_number), None)
+    # Warm path: the flight was seen by a discovery endpoint, no upstream calls needed
+    flight_info = flight_index.lookup_flight(flight_number) or _resolve_flight(flight_number)
     
     if flight_info:
         origin = flight_info["origin"]
         destination = flight_info["destination"]
     else:
-        carrier_code = flight_number[:2]
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        status_data = amadeus_client.get_flight_status(flight_number, today)
-        
-        if status_data and "data" in status_data and len(status_data["data"]) > 0:
-            flight_data = status_data["data"][0]
-            flight_points = flight_data.get("flightPoints", [])
-            if len(flight_points) >= 2:
-                origin = flight_points[0].get("iataCode", "JFK")
-                destination = flight_points[1].get("iataCode", "LAX")
-            else:
-                origin = "JFK"
-                destination = "LAX"
-        else:
-            origin = "JFK"
-            destination = "LAX"
+        origin = "JFK"
+        destination = "LAX"
     
     origin_data = get_airport_coords(origin)
     dest_data = get_airport_coords(destination)
@@ -310,33 +626,31 @@ def get_flight_trajectory(flight_number: str):
     airline_code = flight_number[:2]
     
     now = datetime.now()
-    departure_time = now - timedelta(hours=12)
-    arrival_time = now + timedelta(hours=12)
-    
-    positions = []
+    departure_time = now - timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)
+    arrival_time = now + timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)
+    
+    progress = np.linspace(0.0, 1.0, points)
+    lats, lons = trajectory.great_circle_tracks(
+        [origin_data["lat"]], [origin_data["lon"]],
+        [dest_data["lat"]], [dest_data["lon"]],
+        progress,
+    )
+    altitudes, speeds = trajectory.flight_profile(progress)
+    hour_offsets = (progress - 0.5) * TRAJECTORY_WINDOW_HOURS
     
-    for hour_offset in range(-12, 13):
-        timestamp = now + timedelta(hours=hour_offset)
-        
-        progress = (hour_offset + 12) / 24.0
-        
-        lat = origin_data["lat"] + (dest_data["lat"] - origin_data["lat"]) * progress
-        lon = origin_data["lon"] + (dest_data["lon"] - origin_data["lon"]) * progress
-        
-        altitude = 0
-        if progress > 0.05 and progress < 0.95:
-            altitude = 35000 + (5000 * (0.5 - abs(progress - 0.5)))
-        
-        speed = 0 if progress < 0.02 or progress > 0.98 else 450 + (50 * (0.5 - abs(progress - 0.5)))
-        
-        positions.append({
-            "timestamp": timestamp.isoformat(),
+    positions = [
+        {
+            "timestamp": (now + timedelta(hours=hour_offset)).isoformat(),
             "latitude": lat,
             "longitude": lon,
-            "altitude": int(altitude),
-            "speed": int(speed),
-            "hourOffset": hour_offset
-        })
+            "altitude": altitude,
+            "speed": speed,
+            "hourOffset": round(hour_offset, 2)
+        }
+        for lat, lon, altitude, speed, hour_offset in zip(
+            lats[0].tolist(), trajectory.wrap_longitudes(lons[0]).tolist(), altitudes.tolist(), speeds.tolist(), hour_offsets.tolist()
+        )
+    ]
     
     return {
         "flightNumber": flight_number,
@@ -356,317 +670,194 @@ def get_flight_trajectory(flight_number: str):
         "departureTime": departure_time.isoformat(),
         "arrivalTime": arrival_time.isoformat(),
         "positions": positions,
-        "currentPosition": positions[12]
+        "currentPosition": positions[int(np.argmin(np.abs(hour_offsets)))]
     }
 
 
-@router.get("/flight-trajectory/{flight_number}")
-def get_flight_trajectory(flight_number: str):
-    """Get flight trajectory using actual flight route from Amadeus API"""
-    
-    # Extract airline code from flight number
-    airline_code = flight_number[:2]
-    
-    all_flights_data = get_all_flights(airline=airline_code)
-    flight_info = next((f for f in all_flights_data["flights"] if f["flightNumber"] == flight_number), None)
-    
-    if flight_info:
-                        continue
-                    
-                    if hours_until < -2:
-                        status = "DEPARTED"
-                    elif hours_until < 0:
-                        status = "BOARDING"
-                    elif hours_until < 2:
-                        status = "DELAYED" if (hash(full_flight_num) % 5 == 0) else "ON_TIME"
-                    else:
-                        status = "ON_TIME"
-                else:
-                    status = "SCHEDULED"
-                
-                is_cancelled = store.is_flight_cancelled(full_flight_num)
-                if is_cancelled:
-                    status = "CANCELLED"
-                
-                all_flights.append({
-                    "flightNumber": full_flight_num,
-                    "airline": carrier_code,
-                    "origin": origin,
-                    "destination": destination,
-                    "scheduledDeparture": dep_time_str or now.isoformat(),
-                    "status": status,
-                    "delayMinutes": 0,
-                })
-                
-                if len(all_flights) >= 20:
-                    break
-    else:
-        logger.warning(f"No schedule data returned for airline {airline}")
-    
-    # If no flights found in schedule, use flight status API with common flight numbers
-    if len(all_flights) == 0:
-        logger.info(f"Trying flight status API for airline {airline}")
-        departure_date = now.strftime("%Y-%m-%d")
-        
-        # Try flight numbers 1-30 for this airline
-        for flight_num in range(1, 31):
-            if len(all_flights) >= 20:
-                break
-                
-            full_flight_num = f"{airline}{flight_num:03d}"
-            
-            try:
-                status_data = amadeus_client.get_flight_status(full_flight_num, departure_date)
-                
-                if status_data and "data" in status_data:
-                    for flight in status_data["data"]:
-                        if "flightDesignator" not in flight:
-                            continue
-                            
-                        flight_points = flight.get("flightPoints", [])
-                        if len(flight_points) < 2:
-                            continue
-                        
-                        departure = flight_points[0]
-                        arrival = flight_points[1]
-                        
-                        origin = departure.get("iataCode", "")
-                        destination = arrival.get("iataCode", "")
-                        
-                        if not origin or not destination:
-                            continue
-                        
-                        # International flights only
-                        if origin[0] == destination[0]:
-                            continue
-                        
-                        dep_timing = departure.get("departure", {}).get("timings", [{}])[0]
-                        dep_time_str = dep_timing.get("value", "")
-                        
-                        if dep_time_str:
-                            dep_time = datetime.fromisoformat(dep_time_str.replace("Z", "+00:00"))
-                            hours_until = (dep_time.replace(tzinfo=None) - now).total_seconds() / 3600
-                            
-                            if hours_until < -3 or hours_until > 12:
-                                continue
-                            
-                            if hours_until < -2:
-                                status = "DEPARTED"
-                            elif hours_until < 0:
-                                status = "BOARDING"
-                            elif hours_until < 2:
-                                status = "DELAYED" if (hash(full_flight_num) % 5 == 0) else "ON_TIME"
-                            else:
-                                status = "ON_TIME"
-                        else:
-                            status = "SCHEDULED"
-                        
-                        is_cancelled = store.is_flight_cancelled(full_flight_num)
-                        if is_cancelled:
-                            status = "CANCELLED"
-                        
-                        all_flights.append({
-                            "flightNumber": full_flight_num,
-                            "airline": airline,
-                            "origin": origin,
-                            "destination": destination,
-                            "scheduledDeparture": dep_time_str or departure_date,
-                            "status": status,
-                            "delayMinutes": 0,
-                        })
-                        
-                        if len(all_flights) >= 20:
-                            break
-                            
-            except Exception as e:
-                logger.debug(f"No status for {full_flight_num}: {e}")
-                continue
-    
-    # Last fallback: route sampling if still no flights
-    if len(all_flights) == 0:
-        logger.info(f"Trying route sampling for airline {airline}")
-        routes = [
-            ("JFK", "LHR"), ("LHR", "JFK"),
-            ("LAX", "NRT"), ("NRT", "LAX"),
-        ]
-        
-        departure_date = now.strftime("%Y-%m-%d")
-        departure_date = now.strftime("%Y-%m-%d")
-        
-        for origin, destination in routes:
-            if len(all_flights) >= 20:
-                break
-                
-            try:
-                offers = amadeus_client.search_flight_offers(
-                    origin=origin,
-                    destination=destination,
-                    departure_date=departure_date,
-                    adults=1,
-                    max_results=5
-                )
-                
-                if offers and "data" in offers:
-                    for offer in offers["data"]:
-                        itinerary = offer.get("itineraries", [{}])[0]
-                        segment = itinerary.get("segments", [{}])[0]
-                        
-                        carrier_code = segment.get("carrierCode", "XX")
-                        
-                        # In final fallback, accept ANY airline
-                        # (schedule and flight status APIs already tried)
-                        
-                        flight_number = segment.get("number", "0000")
-                        full_flight_num = f"{carrier_code}{flight_number}"
-                        
-                        departure_info = segment.get("departure", {})
-                        arrival_info = segment.get("arrival", {})
-                        
-                        dep_time_str = departure_info.get("at", "")
-                        if dep_time_str:
-                            dep_time = datetime.fromisoformat(dep_time_str.replace("Z", "+00:00"))
-                            hours_until = (dep_time.replace(tzinfo=None) - now).total_seconds() / 3600
-                            
-                            # Only include flights within 15hr window (-3 to +12)
-                            if hours_until < -3 or hours_until > 12:
-                                continue
-                            
-                            if hours_until < -2:
-                                status = "DEPARTED"
-                            elif hours_until < 0:
-                                status = "BOARDING"
-                            elif hours_until < 2:
-                                status = "DELAYED" if (hash(full_flight_num) % 5 == 0) else "ON_TIME"
-                            else:
-                                status = "ON_TIME"
-                        else:
-                            status = "SCHEDULED"
-                        
-                        is_cancelled = store.is_flight_cancelled(full_flight_num)
-                        if is_cancelled:
-                            status = "CANCELLED"
-                        
-                        all_flights.append({
-                            "flightNumber": full_flight_num,
-                            "airline": carrier_code,
-                            "origin": departure_info.get("iataCode", origin),
-                            "destination": arrival_info.get("iataCode", destination),
-                            "scheduledDeparture": dep_time_str or departure_date,
-                            "status": status,
-                            "duration": itinerary.get("duration", "N/A"),
-                            "price": offer.get("price", {}).get("total", "N/A"),
-                        })
-                        
-                        if len(all_flights) >= 20:
-                            break
-                            
-            except Exception as e:
-                logger.debug(f"Could not fetch offers for {origin}->{destination} on {departure_date}: {e}")
-                continue
+@router.get("/flight-trajectories")
+def get_flight_trajectories(
+    flights: str = Query(..., description="Comma-separated flight numbers"),
+    points: int = Query(25, ge=2, le=1000, description="Number of positions along each great-circle path"),
+    encoding: str = Query("polyline", pattern="^(polyline|float32)$", description="polyline (precision 5) or base64 float32 lat/lon pairs"),
+):
+    """Great-circle trajectories for many flights in one compact response"""
+    flight_numbers = list(dict.fromkeys(f.strip().upper() for f in flights.split(",") if f.strip()))
+    if len(flight_numbers) > MAX_BATCH_TRAJECTORIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TRAJECTORIES} flights per request")
+    
+    # Resolve index misses concurrently; warm flights cost no upstream calls
+    flight_infos = {fn: flight_index.lookup_flight(fn) for fn in flight_numbers}
+    misses = [fn for fn, info in flight_infos.items() if info is None]
+    for fn, info in zip(misses, UPSTREAM_POOL.map(_resolve_flight, misses)):
+        flight_infos[fn] = info
+    
+    airport_codes = {
+        code
+        for info in flight_infos.values() if info
+        for code in (info["origin"], info["destination"])
+    }
+    airport_coords = resolve_airports(airport_codes)
+    
+    resolved = []
+    missing = []
+    for fn in flight_numbers:
+        info = flight_infos[fn]
+        if info and airport_coords.get(info["origin"]) and airport_coords.get(info["destination"]):
+            resolved.append(info)
+        else:
+            missing.append(fn)
     
-    seen = set()
-    unique_flights = []
-    for flight in all_flights:
-        if flight["flightNumber"] not in seen:
-            seen.add(flight["flightNumber"])
-            unique_flights.append(flight)
+    now = datetime.now()
+    response = {
+        "points": points,
+        "encoding": encoding,
+        "departureTime": (now - timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)).isoformat(),
+        "arrivalTime": (now + timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)).isoformat(),
+        "flights": [],
+        "missing": missing,
+    }
+    if not resolved:
+        return response
+    
+    origins = [airport_coords[info["origin"]] for info in resolved]
+    destinations = [airport_coords[info["destination"]] for info in resolved]
+    progress = np.linspace(0.0, 1.0, points)
+    lats, lons = trajectory.great_circle_tracks(
+        [o["lat"] for o in origins], [o["lon"] for o in origins],
+        [d["lat"] for d in destinations], [d["lon"] for d in destinations],
+        progress,
+    )
+    current = int(np.argmin(np.abs(progress - 0.5)))
+    encode = trajectory.encode_polyline if encoding == "polyline" else trajectory.encode_float32
+    
+    for i, info in enumerate(resolved):
+        response["flights"].append({
+            "flightNumber": info["flightNumber"],
+            "origin": info["origin"],
+            "destination": info["destination"],
+            "path": encode(lats[i], lons[i]),
+            "current": [round(float(lats[i, current]), 5), round(float(trajectory.wrap_longitudes(lons[i, current])), 5)],
+        })
     
-    logger.info(f"Found {len(unique_flights)} unique flights from Amadeus API")
-    return {"flights": unique_flights, "count": len(unique_flights)}
+    return response
 
 
-@router.get("/flight-trajectory/{flight_number}")
-def get_flight_trajectory(flight_number: str):
-    """Get flight trajectory using actual flight route from Amadeus API"""
-    
-    # Extract airline code from flight number
-    airline_code = flight_number[:2]
-    
-    all_flights_data = get_all_flights(airline=airline_code)
-    flight_info = next((f for f in all_flights_data["flights"] if f["flightNumber"] == flight_number), None)
-    
-    if flight_info:
-        origin = flight_info["origin"]
-        destination = flight_info["destination"]
-    else:
-        carrier_code = flight_number[:2]
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        status_data = amadeus_client.get_flight_status(flight_number, today)
+def _flight_progress(flights: List[Dict[str, Any]], distances_km: np.ndarray, now: datetime) -> np.ndarray:
+    """
+    Fraction of each flight's block time elapsed at now, in [0, 1].
+    Block time is the offer duration when known, else estimated from the distance.
+    Flights without a departure time follow the synthetic schedule (halfway now).
+    """
+    progress = np.full(len(flights), 0.5)
+    for i, flight in enumerate(flights):
+        scheduled = str(flight.get("scheduledDeparture") or "")
+        if "T" not in scheduled:
+            continue
+        try:
+            departure = datetime.fromisoformat(scheduled.replace("Z", "+00:00"))
+        except ValueError:
+            continue
         
-        if status_data and "data" in status_data and len(status_data["data"]) > 0:
-            flight_data = status_data["data"][0]
-            flight_points = flight_data.get("flightPoints", [])
-            if len(flight_points) >= 2:
-                origin = flight_points[0].get("iataCode", "JFK")
-                destination = flight_points[1].get("iataCode", "LAX")
-            else:
-                origin = "JFK"
-                destination = "LAX"
+        match = re.fullmatch(r"PT(?:(\d+)H)?(?:(\d+)M)?", str(flight.get("duration", "")))
+        if match and any(match.groups()):
+            block_hours = int(match.group(1) or 0) + int(match.group(2) or 0) / 60
         else:
-            origin = "JFK"
-            destination = "LAX"
-    
-    origin_data = get_airport_coords(origin)
-    dest_data = get_airport_coords(destination)
-    
-    if not origin_data or not dest_data:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Could not fetch coordinates for {origin} or {destination} from Amadeus API"
-        )
-    
-    airline_code = flight_number[:2]
-    
+            block_hours = distances_km[i] / MAP_CRUISE_KMH + MAP_TAXI_HOURS
+        
+        elapsed_hours = (now - departure.replace(tzinfo=None)).total_seconds() / 3600
+        progress[i] = elapsed_hours / max(block_hours, 1 / 60)
+    return np.clip(progress, 0.0, 1.0)
+
+
+def _path_stride(zoom: int) -> int:
+    """Keep every stride-th point of the dense track: 9 points at world zoom, all 65 from zoom 7"""
+    return max(1, (MAP_TRACK_POINTS - 1) // 8 >> max(0, (zoom - 1) // 2))
+
+
+@router.get("/map-flights")
+def get_map_flights(
+    airline: str = Query(..., description="Airline IATA code(s), comma-separated"),
+    bbox: str = Query(..., description="Viewport as minLon,minLat,maxLon,maxLat"),
+    zoom: int = Query(3, ge=0, le=22, description="Map zoom level; controls path detail"),
+    encoding: str = Query("polyline", pattern="^(polyline|float32)$", description="polyline (precision 5) or base64 float32 lat/lon pairs"),
+):
+    """
+    Flights whose great-circle track crosses the viewport, in one columnar response.
+    Replaces all-flights + one flight-trajectory call per flight for the map.
+    """
+    min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+    airlines = list(dict.fromkeys(a.strip().upper() for a in airline.split(",") if a.strip()))
+    
+    flights = _with_crisis_status(
+        flight
+        for code in airlines
+        for flight in _airline_flights(code)
+        if flight.get("destination") not in (None, "N/A")
+    )
+    airport_coords = resolve_airports(
+        {code for flight in flights for code in (flight["origin"], flight["destination"])}
+    )
+    flights = [
+        f for f in flights
+        if f["origin"] in airport_coords and f["destination"] in airport_coords
+    ]
+    
+    columns: Dict[str, List[Any]] = {
+        "flightNumber": [], "airline": [], "origin": [], "destination": [],
+        "status": [], "lat": [], "lon": [], "path": [],
+    }
     now = datetime.now()
-    departure_time = now - timedelta(hours=12)
-    arrival_time = now + timedelta(hours=12)
+    response = {
+        "zoom": zoom,
+        "encoding": encoding,
+        "departureTime": (now - timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)).isoformat(),
+        "arrivalTime": (now + timedelta(hours=TRAJECTORY_WINDOW_HOURS / 2)).isoformat(),
+        "count": 0,
+        "columns": columns,
+    }
+    if not flights:
+        return response
+    
+    origins = [airport_coords[f["origin"]] for f in flights]
+    destinations = [airport_coords[f["destination"]] for f in flights]
+    progress = np.linspace(0.0, 1.0, MAP_TRACK_POINTS)
+    lats, lons = trajectory.great_circle_tracks(
+        [o["lat"] for o in origins], [o["lon"] for o in origins],
+        [d["lat"] for d in destinations], [d["lon"] for d in destinations],
+        progress,
+    )
     
-    positions = []
+    # Every segment of the track is clipped against the viewport, so small viewports
+    # still catch flights passing between two track points
+    inside = trajectory.tracks_cross_bbox(lats, lons, min_lon, min_lat, max_lon, max_lat)
     
-    for hour_offset in range(-12, 13):
-        timestamp = now + timedelta(hours=hour_offset)
-        
-        progress = (hour_offset + 12) / 24.0
-        
-        lat = origin_data["lat"] + (dest_data["lat"] - origin_data["lat"]) * progress
-        lon = origin_data["lon"] + (dest_data["lon"] - origin_data["lon"]) * progress
-        
-        altitude = 0
-        if progress > 0.05 and progress < 0.95:
-            altitude = 35000 + (5000 * (0.5 - abs(progress - 0.5)))
-        
-        speed = 0 if progress < 0.02 or progress > 0.98 else 450 + (50 * (0.5 - abs(progress - 0.5)))
-        
-        positions.append({
-            "timestamp": timestamp.isoformat(),
-            "latitude": lat,
-            "longitude": lon,
-            "altitude": int(altitude),
-            "speed": int(speed),
-            "hourOffset": hour_offset
-        })
+    # Current position along the great circle from the time elapsed since departure
+    distances = trajectory.great_circle_distance_km(
+        [o["lat"] for o in origins], [o["lon"] for o in origins],
+        [d["lat"] for d in destinations], [d["lon"] for d in destinations],
+    )
+    current_lats, current_lons = trajectory.great_circle_tracks(
+        [o["lat"] for o in origins], [o["lon"] for o in origins],
+        [d["lat"] for d in destinations], [d["lon"] for d in destinations],
+        _flight_progress(flights, distances, now)[:, None],
+    )
     
-    return {
-        "flightNumber": flight_number,
-        "airline": airline_code,
-        "origin": {
-            "code": origin,
-            "name": origin_data["name"],
-            "lat": origin_data["lat"],
-            "lon": origin_data["lon"]
-        },
-        "destination": {
-            "code": destination,
-            "name": dest_data["name"],
-            "lat": dest_data["lat"],
-            "lon": dest_data["lon"]
-        },
-        "departureTime": departure_time.isoformat(),
-        "arrivalTime": arrival_time.isoformat(),
-        "positions": positions,
-        "currentPosition": positions[12]
-    }
+    stride = _path_stride(zoom)
+    encode = trajectory.encode_polyline if encoding == "polyline" else trajectory.encode_float32
+    
+    for i in np.flatnonzero(inside).tolist():
+        flight = flights[i]
+        columns["flightNumber"].append(flight["flightNumber"])
+        columns["airline"].append(flight.get("airline", flight["flightNumber"][:2]))
+        columns["origin"].append(flight["origin"])
+        columns["destination"].append(flight["destination"])
+        columns["status"].append(flight.get("status", "SCHEDULED"))
+        columns["lat"].append(round(float(current_lats[i, 0]), 5))
+        columns["lon"].append(round(float(trajectory.wrap_longitudes(current_lons[i, 0])), 5))
+        columns["path"].append(encode(lats[i, ::stride], lons[i, ::stride]))
+    
+    response["count"] = len(columns["flightNumber"])
+    return response
 
 
 @router.get("/flight-status/{flight_number}")
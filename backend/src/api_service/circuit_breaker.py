@@ -0,0 +1,94 @@
+"""
+Circuit breaker for upstream API calls
+Fails fast while an upstream is down instead of tying up worker threads on timeouts
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    CLOSED: requests flow, consecutive failures are counted
+    OPEN: requests are rejected until recovery_timeout has elapsed
+    HALF_OPEN: a single probe request is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._total_failures = 0
+        self._total_rejected = 0
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self._total_rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open - probing upstream")
+
+            # HALF_OPEN: only one probe at a time, everyone else fails fast
+            if self._probe_in_flight:
+                self._total_rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit {self.name} closed - upstream recovered")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        f"Circuit {self.name} opened after {self._consecutive_failures} consecutive failures"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self._state == OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "total_failures": self._total_failures,
+                "total_rejected": self._total_rejected,
+                "retry_in_seconds": round(retry_in, 1),
+            }
@@ -1,6 +1,10 @@
+from pathlib import Path
+
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -28,6 +32,30 @@ class Settings(BaseSettings):
         default="https://test.api.amadeus.com",
         validation_alias=AliasChoices("AMADEUS_API_BASE_URL", "AMADEUS_HOST"),
     )
+    amadeus_timeout_seconds: float = Field(default=10.0, validation_alias="AMADEUS_TIMEOUT_SECONDS")
+    amadeus_connect_timeout_seconds: float = Field(default=3.0, validation_alias="AMADEUS_CONNECT_TIMEOUT_SECONDS")
+    amadeus_breaker_failure_threshold: int = Field(default=5, validation_alias="AMADEUS_BREAKER_FAILURE_THRESHOLD")
+    amadeus_breaker_recovery_seconds: float = Field(default=30.0, validation_alias="AMADEUS_BREAKER_RECOVERY_SECONDS")
+    amadeus_fallback_cache_size: int = Field(default=1024, validation_alias="AMADEUS_FALLBACK_CACHE_SIZE")
+    amadeus_max_concurrency: int = Field(default=8, validation_alias="AMADEUS_MAX_CONCURRENCY")
+    flight_status_cache_ttl_seconds: int = Field(default=900, validation_alias="FLIGHT_STATUS_CACHE_TTL_SECONDS")
+    all_flights_cache_ttl_seconds: int = Field(default=60, validation_alias="ALL_FLIGHTS_CACHE_TTL_SECONDS")
+    
+    openflights_cache_dir: str = Field(
+        default=str(BACKEND_DIR / ".cache" / "openflights"),
+        validation_alias="OPENFLIGHTS_CACHE_DIR",
+    )
+    openflights_bundled_dir: str = Field(
+        default=str(BACKEND_DIR / "data" / "openflights"),
+        validation_alias="OPENFLIGHTS_BUNDLED_DIR",
+    )
+    openflights_offline: bool = Field(default=False, validation_alias="OPENFLIGHTS_OFFLINE")
+    openflights_refresh_hours: float = Field(default=24.0, validation_alias="OPENFLIGHTS_REFRESH_HOURS")
+    airport_store_path: str = Field(
+        default=str(BACKEND_DIR / ".cache" / "airports.json"),
+        validation_alias="AIRPORT_STORE_PATH",
+    )
+    airport_miss_ttl_seconds: float = Field(default=3600.0, validation_alias="AIRPORT_MISS_TTL_SECONDS")
 
 
 settings = Settings()
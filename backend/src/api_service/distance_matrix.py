@@ -0,0 +1,185 @@
+"""
+Precomputed great-circle distances between all OpenFlights route airports
+A float32 N x N matrix indexed by RouteTable airport id, persisted next to the
+OpenFlights cache and memory-mapped, so detour checks are array lookups.
+"""
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import openflights_cache
+from .airports_data import AirportTable, get_airport_table, loaded_airport_table
+from .routes_data import RouteTable, get_route_table, loaded_route_table
+from .trajectory import great_circle_distance_km
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "distances"
+BLOCK_ROWS = 512
+
+
+def _fingerprint(codes: List[str], lat: np.ndarray, lon: np.ndarray) -> str:
+    digest = hashlib.sha1("\n".join(codes).encode("utf-8"))
+    digest.update(np.ascontiguousarray(lat).tobytes())
+    digest.update(np.ascontiguousarray(lon).tobytes())
+    return digest.hexdigest()
+
+
+class DistanceMatrix:
+    """Distances in km; NaN where an airport has no known coordinates"""
+
+    def __init__(self, codes: List[str], km: np.ndarray):
+        self.codes = codes
+        self.ids: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+        self.km = km
+
+    @classmethod
+    def build(cls, codes: List[str], lat: np.ndarray, lon: np.ndarray) -> "DistanceMatrix":
+        n = len(codes)
+        km = np.empty((n, n), dtype=np.float32)
+        # Row blocks keep the float64 temporaries small
+        for start in range(0, n, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n)
+            km[start:stop] = great_circle_distance_km(lat[start:stop, None], lon[start:stop, None], lat[None, :], lon[None, :])
+        return cls(codes, km)
+
+    def distance(self, origin: str, destination: str) -> Optional[float]:
+        i, j = self.ids.get(origin), self.ids.get(destination)
+        if i is None or j is None or np.isnan(self.km[i, j]):
+            return None
+        return float(self.km[i, j])
+
+    def path_ids(self, paths: Sequence[Sequence[str]]) -> np.ndarray:
+        """(P, L) airport ids, right-padded with -1; unknown airports are -1 too"""
+        width = max((len(p) for p in paths), default=0)
+        ids = np.full((len(paths), width), -1, dtype=np.int64)
+        for row, path in enumerate(paths):
+            ids[row, :len(path)] = [self.ids.get(code, -1) for code in path]
+        return ids
+
+    def detour_ratio_ids(self, ids: np.ndarray, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Flown distance over direct distance for each row of a (P, L) id array.
+        lengths gives the number of airports per row (default: all L).
+        Rows with unknown airports or zero direct distance get 1.0 (no detour information).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.ndim != 2 or ids.shape[1] < 2:
+            return np.ones(len(ids), dtype=np.float32)
+        if lengths is None:
+            lengths = np.full(len(ids), ids.shape[1], dtype=np.int64)
+
+        safe = np.where(ids >= 0, ids, 0)
+        leg_valid = np.arange(ids.shape[1] - 1)[None, :] < (lengths[:, None] - 1)
+        legs = self.km[safe[:, :-1], safe[:, 1:]]
+        flown = np.where(leg_valid, legs, 0.0).sum(axis=1)
+
+        last = safe[np.arange(len(ids)), np.clip(lengths - 1, 0, None)]
+        direct = self.km[safe[:, 0], last]
+
+        in_path = np.arange(ids.shape[1])[None, :] < lengths[:, None]
+        known = ~np.any(in_path & (ids < 0), axis=1) & (lengths >= 2) & (direct > 0) & np.isfinite(flown)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(known, flown / np.where(known, direct, 1.0), 1.0)
+        return ratios.astype(np.float32)
+
+    def detour_ratios(self, paths: Sequence[Sequence[str]]) -> np.ndarray:
+        """Detour ratio per route given as airport codes, e.g. ["SFO", "DEN", "ORD"]"""
+        if not paths:
+            return np.ones(0, dtype=np.float32)
+        lengths = np.array([len(p) for p in paths], dtype=np.int64)
+        return self.detour_ratio_ids(self.path_ids(paths), lengths)
+
+
+def _coordinates(routes: RouteTable, airports: AirportTable):
+    n = len(routes.airport_codes)
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    for i, code in enumerate(routes.airport_codes):
+        j = airports.ids.get(code)
+        if j is not None:
+            lat[i] = airports.lat[j]
+            lon[i] = airports.lon[j]
+    return lat, lon
+
+
+def _load_or_build(routes: RouteTable, airports: AirportTable) -> DistanceMatrix:
+    codes = routes.airport_codes
+    lat, lon = _coordinates(routes, airports)
+    fingerprint = _fingerprint(codes, lat, lon)
+
+    cached = openflights_cache.load_dataset(CACHE_NAME)
+    if cached is not None and cached[1].get("fingerprint") == fingerprint:
+        logger.info(f"Loaded {len(codes)}x{len(codes)} airport distance matrix from disk cache (memory-mapped)")
+        return DistanceMatrix(codes, cached[0]["km"])
+
+    matrix = DistanceMatrix.build(codes, lat, lon)
+    try:
+        openflights_cache.save_dataset(CACHE_NAME, {"km": matrix.km}, {"fingerprint": fingerprint})
+    except OSError as e:
+        logger.warning(f"Could not persist airport distance matrix: {e}")
+    logger.info(f"Built {len(codes)}x{len(codes)} airport distance matrix ({matrix.km.nbytes / 2**20:.1f} MiB)")
+    return matrix
+
+
+_matrix: Optional[DistanceMatrix] = None
+_matrix_sources = (None, None)
+_lock = threading.Lock()
+_warm_thread: Optional[threading.Thread] = None
+_warm_lock = threading.Lock()
+
+
+def get_distance_matrix() -> Optional[DistanceMatrix]:
+    """Matrix over the current RouteTable airports, rebuilt when routes or airports are refreshed"""
+    global _matrix, _matrix_sources
+
+    routes = get_route_table()
+    airports = get_airport_table()
+    if routes is None or airports is None:
+        return None
+
+    with _lock:
+        if _matrix is None or _matrix_sources[0] is not routes or _matrix_sources[1] is not airports:
+            _matrix = _load_or_build(routes, airports)
+            _matrix_sources = (routes, airports)
+        return _matrix
+
+
+def start_background_warm():
+    """Load or build the matrix in a daemon thread (no-op while one is already running)"""
+    global _warm_thread
+
+    def warm():
+        try:
+            get_distance_matrix()
+        except Exception as e:
+            logger.error(f"Airport distance matrix warm-up failed: {e}")
+
+    with _warm_lock:
+        if _warm_thread is not None and _warm_thread.is_alive():
+            return
+        _warm_thread = threading.Thread(target=warm, name="distance-matrix-warm", daemon=True)
+        _warm_thread.start()
+
+
+def ready_distance_matrix() -> Optional[DistanceMatrix]:
+    """
+    The matrix without blocking the caller: None until the first build finishes.
+    When the OpenFlights tables are missing or have been refreshed, a (re)build
+    starts in the background and the previous matrix keeps serving meanwhile.
+    """
+    sources = (loaded_route_table(), loaded_airport_table())
+    if _matrix is None or None in sources or _matrix_sources[0] is not sources[0] or _matrix_sources[1] is not sources[1]:
+        start_background_warm()
+    return _matrix
+
+
+def detour_ratios(paths: Sequence[Sequence[str]]) -> np.ndarray:
+    """Detour ratio per route; all 1.0 until the matrix is ready or when OpenFlights data is unavailable"""
+    matrix = ready_distance_matrix()
+    if matrix is None:
+        return np.ones(len(paths), dtype=np.float32)
+    return matrix.detour_ratios(paths)
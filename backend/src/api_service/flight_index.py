@@ -0,0 +1,81 @@
+"""
+In-memory index of discovered flights
+Maps flight number -> origin, destination and schedule so lookups need no upstream calls.
+Entries are bucketed by departure date and expire with it.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+# departure date (YYYY-MM-DD) -> flight number -> entry
+_INDEX: Dict[str, Dict[str, Dict[str, Any]]] = {}
+_LOCK = threading.Lock()
+
+# Flights that departed yesterday can still be in the air today
+RETENTION_DAYS = 1
+
+
+def _departure_date(scheduled_departure: Optional[str]) -> str:
+    if scheduled_departure and len(scheduled_departure) >= 10:
+        return scheduled_departure[:10]
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _purge_expired():
+    cutoff = (datetime.now() - timedelta(days=RETENTION_DAYS)).strftime("%Y-%m-%d")
+    for date in [d for d in _INDEX if d < cutoff]:
+        del _INDEX[date]
+
+
+def record_flight(flight: Dict[str, Any]):
+    """Index a flight dict as returned by the flight discovery endpoints"""
+    flight_number = flight.get("flightNumber")
+    origin = flight.get("origin")
+    destination = flight.get("destination")
+    if not flight_number or not origin or not destination or destination == "N/A":
+        return
+
+    entry = {
+        "flightNumber": flight_number,
+        "airline": flight.get("airline", flight_number[:2]),
+        "origin": origin,
+        "destination": destination,
+        "scheduledDeparture": flight.get("scheduledDeparture"),
+    }
+
+    with _LOCK:
+        _purge_expired()
+        _INDEX.setdefault(_departure_date(entry["scheduledDeparture"]), {})[flight_number] = entry
+
+
+def record_flights(flights: Iterable[Dict[str, Any]]):
+    for flight in flights:
+        record_flight(flight)
+
+
+def lookup_flight(flight_number: str) -> Optional[Dict[str, Any]]:
+    """Most recent indexed departure of a flight number, or None"""
+    with _LOCK:
+        _purge_expired()
+        for date in sorted(_INDEX, reverse=True):
+            entry = _INDEX[date].get(flight_number)
+            if entry:
+                return entry
+    return None
+
+
+def flights_for_airline(airline: str) -> Dict[str, Dict[str, Any]]:
+    """Latest indexed entry per flight number for one airline"""
+    result: Dict[str, Dict[str, Any]] = {}
+    with _LOCK:
+        _purge_expired()
+        for date in sorted(_INDEX):
+            for flight_number, entry in _INDEX[date].items():
+                if entry["airline"] == airline:
+                    result[flight_number] = entry
+    return result
+
+
+def index_size() -> int:
+    with _LOCK:
+        return sum(len(flights) for flights in _INDEX.values())
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional, Tuple
+import logging
+
+from . import airports_data
+
+router = APIRouter(prefix="/geo", tags=["Geo"])
+logger = logging.getLogger(__name__)
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """'minLon,minLat,maxLon,maxLat' -> floats; minLon > maxLon crosses the antimeridian"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox latitudes must satisfy -90 <= minLat <= maxLat <= 90")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _airport_table():
+    table = airports_data.get_airport_table()
+    if table is None:
+        raise HTTPException(status_code=503, detail="Airport dataset unavailable")
+    return table
+
+
+@router.get("/airports/nearby")
+def get_nearby_airports(
+    code: Optional[str] = Query(None, description="Airport IATA code to search around"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(150.0, gt=0, le=2000),
+    limit: int = Query(10, ge=1, le=200),
+):
+    """Airports within radius_km of an airport or a point, nearest first"""
+    table = _airport_table()
+    
+    if code:
+        code = code.upper()
+        if table.airport(code) is None:
+            raise HTTPException(status_code=404, detail=f"Airport {code} not found")
+        return {"code": code, "radiusKm": radius_km, "airports": airports_data.nearby_airports(code, radius_km, limit)}
+    
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="Either code or lat and lon are required")
+    
+    return {"lat": lat, "lon": lon, "radiusKm": radius_km, "airports": table.nearest(lat, lon, radius_km, limit)}
+
+
+@router.get("/airports/bbox")
+def get_airports_in_bbox(
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
+    limit: int = Query(500, ge=1, le=10000),
+):
+    """Airports inside a map viewport"""
+    min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+    airports = _airport_table().in_bbox(min_lon, min_lat, max_lon, max_lat, limit)
+    return {"airports": airports, "count": len(airports)}
@@ -1,19 +1,39 @@
 from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
+import json
 import logging
 import sys
 from datetime import datetime, timezone
 
-from ..schemas.recommendation import RecommendationRequest, RecommendationResponse
-from ..agents.orchestrator import run_recommendation_pipeline
+from ..schemas.recommendation import (
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    RecommendationRequest,
+    RecommendationResponse,
+)
+from ..agents.orchestrator import (
+    run_batch_recommendation_pipeline,
+    run_recommendation_pipeline,
+    stream_recommendation_pipeline,
+)
+from ..agents.triage_agent import triage_stats
 
 from .routes import router
 from . import simulator
 from .amadeus_routes import router as amadeus_router
+from .geo_routes import router as geo_router
+from .amadeus_client import amadeus_client
+from . import routes_data
+from . import airports_data
+from . import distance_matrix
+from . import airport_store
 from .kafka_client import kafka_producer
+from ..common.llm_cache import llm_cache
 from .config import settings
+from ..tools.offer_store import offer_store
 
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +55,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Map and trajectory payloads are large and highly compressible
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 @app.exception_handler(RequestValidationError)
@@ -66,32 +88,50 @@ async def log_requests(request: Request, call_next):
 app.include_router(router)
 app.include_router(simulator.router)
 app.include_router(amadeus_router)
+app.include_router(geo_router)
 
 
 @app.get("/health")
 def health():
     kafka_configured = bool(settings.confluent_bootstrap_servers and settings.confluent_api_key)
     amadeus_configured = bool(settings.amadeus_client_id and settings.amadeus_client_secret)
+    amadeus_circuits = amadeus_client.breaker_states()
+    amadeus_degraded = any(c["state"] != "closed" for c in amadeus_circuits.values())
 
     return {
-        "status": "ok",
+        "status": "degraded" if amadeus_degraded else "ok",
         "service": "api-service",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "integrations": {
             "kafka": "configured" if kafka_configured else "not_configured",
             "amadeus": "configured" if amadeus_configured else "not_configured"
-        }
+        },
+        "circuits": {
+            "amadeus": amadeus_circuits
+        },
+        "llm_cache": llm_cache.stats(),
+        "offer_store": offer_store.stats(),
+        "triage": triage_stats()
     }
 
 
+@app.on_event("startup")
+def startup_event():
+    # Memory-map cached OpenFlights data now and keep it fresh in the background
+    routes_data.start_background_refresh()
+    airports_data.start_background_refresh()
+    # Detour scoring uses the distance matrix once it's ready, never builds it on a request
+    distance_matrix.start_background_warm()
+    airport_store.load()
+
+
 @app.on_event("shutdown")
 def shutdown_event():
     kafka_producer.flush()
     logger.info("Application shutdown complete")
 
 
-@app.post("/agents/recommendation", response_model=RecommendationResponse)
-def agents_recommendation(req: RecommendationRequest):
+def _require_search(req: RecommendationRequest):
     origin = req.search.get("origin")
     destination = req.search.get("destination")
     departure_date = req.search.get("departure_date") or req.search.get("date")
@@ -102,4 +142,51 @@ def agents_recommendation(req: RecommendationRequest):
             detail="search.origin, search.destination, and search.departure_date (or search.date) are required",
         )
 
-    return run_recommendation_pipeline(req)
+
+@app.post("/agents/recommendation", response_model=RecommendationResponse)
+async def agents_recommendation(req: RecommendationRequest):
+    _require_search(req)
+    return await run_recommendation_pipeline(req)
+
+
+@app.post("/agents/recommendation/stream")
+async def agents_recommendation_stream(req: RecommendationRequest):
+    """
+    NDJSON stream: a "preliminary" rule-based ranking once offers arrive,
+    then the "final" LLM-refined recommendation (or an "error" event)
+    """
+    _require_search(req)
+
+    async def events():
+        async for event in stream_recommendation_pipeline(req):
+            yield json.dumps(event, default=str) + "\n"
+
+    # identity encoding keeps GZipMiddleware from buffering the preliminary event
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": "identity", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/agents/offers/{raw_ref}")
+def agents_offer_raw(raw_ref: str):
+    """Raw Amadeus payload of a recommended offer (raw_ref from a ref-mode response)"""
+    raw = offer_store.get(raw_ref)
+    if raw is None:
+        raise HTTPException(status_code=404, detail=f"Offer payload {raw_ref} not found or expired")
+    return raw
+
+
+MAX_BATCH_RECOMMENDATIONS = 500
+
+
+@app.post("/agents/recommendation/batch", response_model=BatchRecommendationResponse)
+async def agents_recommendation_batch(req: BatchRecommendationRequest):
+    """Recommendations for a cohort of passengers; shared searches and triage run once"""
+    if not req.items:
+        raise HTTPException(status_code=400, detail="items must contain at least one passenger")
+    if len(req.items) > MAX_BATCH_RECOMMENDATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RECOMMENDATIONS} items per batch")
+
+    return await run_batch_recommendation_pipeline(req)
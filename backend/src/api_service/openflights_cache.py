@@ -0,0 +1,310 @@
+"""
+Disk-persisted cache for parsed OpenFlights datasets
+Each saved version of a dataset is a directory of .npy column files plus meta.json;
+a CURRENT file in the dataset directory names the live version. Columns are
+memory-mapped on load, so startup doesn't re-download or re-parse anything.
+The upstream file is refreshed with conditional requests (ETag / If-Modified-Since).
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"
+REFRESH_RETRY_SECONDS = 900
+# Staging directories older than this are leftovers of a crashed save
+STALE_STAGING_SECONDS = 3600
+
+_save_lock = threading.Lock()
+
+
+def dataset_dir(name: str) -> Path:
+    return Path(settings.openflights_cache_dir) / name
+
+
+def _current_version(name: str) -> Optional[Path]:
+    try:
+        version = (dataset_dir(name) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return dataset_dir(name) / version if version else None
+
+
+def _write_atomic(path: Path, text: str):
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _prune_versions(name: str, keep: str):
+    for path in dataset_dir(name).iterdir():
+        if not path.is_dir():
+            # Columns and meta.json of the old unversioned layout
+            if path.suffix == ".npy" or path.name == META_FILE:
+                path.unlink(missing_ok=True)
+            continue
+        if path.name == keep:
+            continue
+        if path.name.endswith(".tmp") and time.time() - path.stat().st_mtime < STALE_STAGING_SECONDS:
+            continue
+        # Readers that still have old columns mapped keep their inodes on POSIX;
+        # where mapped files can't be deleted (Windows) this retries on the next save
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def save_dataset(name: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """
+    Write a complete new version (columns + meta.json) into its own directory, then
+    switch CURRENT to it with an atomic rename. A crash at any point leaves CURRENT
+    naming the previous, intact version.
+    """
+    directory = dataset_dir(name)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with _save_lock:
+        version = f"v{time.time_ns()}"
+        staging = directory / f"{version}.tmp"
+        staging.mkdir()
+        for column, array in arrays.items():
+            with open(staging / f"{column}.npy", "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+        (staging / META_FILE).write_text(json.dumps({**meta, "columns": list(arrays)}), encoding="utf-8")
+        os.replace(staging, directory / version)
+
+        _write_atomic(directory / CURRENT_FILE, version)
+        _prune_versions(name, keep=version)
+
+
+def load_meta(name: str) -> Optional[Dict[str, Any]]:
+    version_dir = _current_version(name)
+    if version_dir is None:
+        return None
+    meta_path = version_dir / META_FILE
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable OpenFlights cache metadata {meta_path}: {e}")
+        return None
+
+
+def load_dataset(name: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """Memory-map the current version of a dataset; returns (columns, meta) or None if there is no usable cache"""
+    version_dir = _current_version(name)
+    meta = load_meta(name)
+    if version_dir is None or meta is None:
+        return None
+
+    try:
+        arrays = {
+            column: np.load(version_dir / f"{column}.npy", mmap_mode="r")
+            for column in meta["columns"]
+        }
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable OpenFlights cache {version_dir}: {e}")
+        return None
+
+    return arrays, meta
+
+
+def touch_meta(name: str, **updates: Any):
+    """Update metadata of the current version without rewriting columns (e.g. after a 304 Not Modified)"""
+    version_dir = _current_version(name)
+    meta = load_meta(name)
+    if version_dir is None or meta is None:
+        return
+    meta.update(updates)
+    _write_atomic(version_dir / META_FILE, json.dumps(meta))
+
+
+def conditional_fetch(url: str, meta: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """
+    GET url, revalidating against the cached ETag / Last-Modified.
+    Returns (text, validators); text is None when the upstream answered 304 Not Modified.
+    Raises on network or HTTP errors.
+    """
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    with httpx.Client(timeout=30.0) as client:
+        response = client.get(url, headers=headers)
+
+    validators = {
+        "etag": response.headers.get("ETag") or (meta or {}).get("etag"),
+        "last_modified": response.headers.get("Last-Modified") or (meta or {}).get("last_modified"),
+    }
+    if response.status_code == 304:
+        return None, validators
+
+    response.raise_for_status()
+    return response.text, validators
+
+
+class OpenFlightsDataset:
+    """
+    One OpenFlights file (routes.dat, airports.dat, ...) kept as a parsed table.
+    Load order: memory, then the disk cache (memory-mapped), then a download from
+    OpenFlights, then the bundled copy. In offline mode only the bundled copy is used.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        filename: str,
+        parse: Callable[[str], Any],
+        to_cache: Callable[[Any], Tuple[Dict[str, np.ndarray], Dict[str, Any]]],
+        from_cache: Callable[[Dict[str, np.ndarray], Dict[str, Any]], Any],
+    ):
+        self.name = name
+        self.url = url
+        self.filename = filename
+        self._parse = parse
+        self._to_cache = to_cache
+        self._from_cache = from_cache
+        self._table: Any = None
+        self._load_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> Any:
+        """The table already in memory, or None; never loads or downloads"""
+        return self._table
+
+    @property
+    def bundled_path(self) -> Path:
+        return Path(settings.openflights_bundled_dir) / self.filename
+
+    def _bundled_mtime(self) -> Optional[float]:
+        try:
+            return self.bundled_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def _load_cached(self) -> Any:
+        cached = load_dataset(self.name)
+        if cached is None:
+            return None
+
+        arrays, meta = cached
+        bundled_mtime = self._bundled_mtime()
+        if bundled_mtime is not None:
+            # Offline mode prefers the bundled snapshot, and a replaced bundled file wins over its old cache
+            if settings.openflights_offline and meta.get("source") != "bundled":
+                return None
+            if meta.get("source") == "bundled" and meta.get("bundled_mtime") != bundled_mtime:
+                return None
+
+        table = self._from_cache(arrays, meta)
+        logger.info(f"Loaded OpenFlights {self.name} from disk cache (memory-mapped)")
+        return table
+
+    def _store(self, table: Any, **meta: Any):
+        arrays, table_meta = self._to_cache(table)
+        now = time.time()
+        save_dataset(self.name, arrays, {**table_meta, **meta, "fetched_at": now, "checked_at": now})
+
+    def _load_bundled(self) -> Any:
+        path = self.bundled_path
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Bundled OpenFlights {self.name} not available at {path}: {e}")
+            return None
+
+        table = self._parse(text)
+        self._store(table, source="bundled", bundled_mtime=self._bundled_mtime())
+        logger.info(f"Loaded OpenFlights {self.name} from bundled file {path}")
+        return table
+
+    def refresh(self) -> bool:
+        """
+        Revalidate against OpenFlights and swap in a new table if the file changed.
+        Returns True when a new table was loaded. Raises on network errors.
+        """
+        meta = load_meta(self.name)
+        if meta and meta.get("source") != "openflights":
+            meta = None
+        text, validators = conditional_fetch(self.url, meta)
+
+        if text is None:
+            touch_meta(self.name, checked_at=time.time())
+            logger.info(f"OpenFlights {self.name} not modified")
+            return False
+
+        table = self._parse(text)
+        self._store(table, source="openflights", **validators)
+        self._table = table
+        logger.info(f"Successfully cached OpenFlights {self.name} from {self.url}")
+        return True
+
+    def get(self) -> Any:
+        if self._table is not None:
+            return self._table
+
+        with self._load_lock:
+            if self._table is not None:
+                return self._table
+
+            table = self._load_cached()
+
+            if table is None and not settings.openflights_offline:
+                logger.info(f"Fetching fresh OpenFlights {self.name} data")
+                try:
+                    self.refresh()
+                    table = self._table
+                except Exception as e:
+                    logger.error(f"Failed to fetch OpenFlights {self.name}: {e}")
+
+            if table is None:
+                table = self._load_bundled()
+
+            self._table = table
+            return table
+
+    def _refresh_loop(self):
+        interval = settings.openflights_refresh_hours * 3600
+        while True:
+            self.get()
+
+            meta = load_meta(self.name) or {}
+            last_checked = meta.get("checked_at", 0) if meta.get("source") == "openflights" else 0
+            time.sleep(max(0.0, last_checked + interval - time.time()))
+
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the cached table and try again later
+                logger.warning(f"OpenFlights {self.name} refresh failed, keeping cached data: {e}")
+                time.sleep(min(interval, REFRESH_RETRY_SECONDS))
+
+    def start_background_refresh(self):
+        """Load the cached table and keep it fresh from a daemon thread (no refresh in offline mode)"""
+        if settings.openflights_offline:
+            self.get()
+            return
+
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, name=f"openflights-{self.name}-refresh", daemon=True
+        )
+        self._refresh_thread.start()
@@ -1,68 +1,200 @@
 """
 Fetch airline route data from OpenFlights.org
 Free, comprehensive database of airline routes worldwide
+
+Routes are held in a column-oriented RouteTable: airline and airport codes are
+interned into small integer ids, columns are NumPy arrays, and CSR-style indexes
+by airline and by source airport make lookups O(result size).
+
+The parsed table is persisted to a disk cache and memory-mapped at startup; a
+background thread revalidates it against OpenFlights. With OPENFLIGHTS_OFFLINE
+set, routes come only from the bundled routes.dat.
 """
-import httpx
 import logging
-from typing import List, Tuple, Set, Optional
-from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple, Set, Optional
+
+import numpy as np
+
+from . import openflights_cache
 
 logger = logging.getLogger(__name__)
 
-# Cache routes data
-_routes_cache: Optional[List[dict]] = None
-_cache_expiry: Optional[datetime] = None
+OPENFLIGHTS_ROUTES_URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data/routes.dat"
+MISSING = "\\N"
+
+
+def _build_index(keys: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row ids grouped by key: rows for key k are order[offsets[k]:offsets[k + 1]]"""
+    order = np.argsort(keys, kind="stable").astype(np.uint32)
+    offsets = np.zeros(size + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return order, offsets
+
+
+ROUTE_COLUMNS = ("airline", "source", "dest", "stops", "codeshare")
+
+
+class RouteTable:
+    def __init__(
+        self,
+        airline_codes: List[str],
+        airport_codes: List[str],
+        airline: np.ndarray,
+        source: np.ndarray,
+        dest: np.ndarray,
+        stops: np.ndarray,
+        codeshare: np.ndarray,
+    ):
+        self.airline_codes = airline_codes
+        self.airport_codes = airport_codes
+        self.airline_ids: Dict[str, int] = {code: i for i, code in enumerate(airline_codes)}
+        self.airport_ids: Dict[str, int] = {code: i for i, code in enumerate(airport_codes)}
+
+        self.airline = airline
+        self.source = source
+        self.dest = dest
+        self.stops = stops
+        self.codeshare = codeshare
+
+        # Per-airport attributes used by the international-route heuristic
+        self._airport_is_iata = np.array([len(code) == 3 for code in airport_codes], dtype=bool)
+        self._airport_region = np.array([ord(code[0]) if code else 0 for code in airport_codes], dtype=np.uint8)
+
+        self._by_airline = _build_index(airline, len(airline_codes))
+        self._by_source = _build_index(source, len(airport_codes))
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "RouteTable":
+        """
+        Parse OpenFlights routes.dat lines
+        Format: Airline,Airline ID,Source,Source ID,Dest,Dest ID,Codeshare,Stops,Equipment
+        """
+        airline_ids: Dict[str, int] = {}
+        airport_ids: Dict[str, int] = {}
+        airline, source, dest, stops, codeshare = [], [], [], [], []
+
+        for line in lines:
+            parts = line.split(',')
+            if len(parts) < 7:
+                continue
+
+            origin = parts[2]
+            destination = parts[4]
+            # Rows without both airports can never be returned by a lookup
+            if not origin or not destination or origin == MISSING or destination == MISSING:
+                continue
+
+            airline.append(airline_ids.setdefault(parts[0], len(airline_ids)))
+            source.append(airport_ids.setdefault(origin, len(airport_ids)))
+            dest.append(airport_ids.setdefault(destination, len(airport_ids)))
+            stops_str = parts[7] if len(parts) > 7 else '0'
+            stops.append(int(stops_str) if stops_str.isdigit() else 0)
+            codeshare.append(parts[6] == 'Y')
+
+        id_dtype = np.uint16 if max(len(airline_ids), len(airport_ids)) < 2 ** 16 else np.uint32
+        return cls(
+            airline_codes=list(airline_ids),
+            airport_codes=list(airport_ids),
+            airline=np.array(airline, dtype=id_dtype),
+            source=np.array(source, dtype=id_dtype),
+            dest=np.array(dest, dtype=id_dtype),
+            stops=np.array(stops, dtype=np.uint8),
+            codeshare=np.array(codeshare, dtype=bool),
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], codes: Dict[str, Any]) -> "RouteTable":
+        return cls(
+            airline_codes=list(codes["airline_codes"]),
+            airport_codes=list(codes["airport_codes"]),
+            **{column: arrays[column] for column in ROUTE_COLUMNS},
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {column: getattr(self, column) for column in ROUTE_COLUMNS}
+
+    def codes(self) -> Dict[str, List[str]]:
+        return {"airline_codes": self.airline_codes, "airport_codes": self.airport_codes}
+
+    def __len__(self) -> int:
+        return len(self.airline)
 
-def fetch_openflights_routes() -> List[dict]:
+    @property
+    def nbytes(self) -> int:
+        """Size of the column and index arrays"""
+        arrays = [self.airline, self.source, self.dest, self.stops, self.codeshare, *self._by_airline, *self._by_source]
+        return sum(a.nbytes for a in arrays)
+
+    def rows_for_airline(self, airline_iata: str) -> np.ndarray:
+        airline_id = self.airline_ids.get(airline_iata)
+        if airline_id is None:
+            return np.empty(0, dtype=np.uint32)
+        order, offsets = self._by_airline
+        return order[offsets[airline_id]:offsets[airline_id + 1]]
+
+    def rows_from_airport(self, airport_iata: str) -> np.ndarray:
+        airport_id = self.airport_ids.get(airport_iata)
+        if airport_id is None:
+            return np.empty(0, dtype=np.uint32)
+        order, offsets = self._by_source
+        return order[offsets[airport_id]:offsets[airport_id + 1]]
+
+    def international_direct_routes(self, airline_iata: str) -> List[Tuple[str, str]]:
+        """Direct (stops == 0) routes between 3-letter airports in different regions, in file order"""
+        rows = self.rows_for_airline(airline_iata)
+        src = self.source[rows]
+        dst = self.dest[rows]
+        mask = (
+            (self.stops[rows] == 0)
+            & self._airport_is_iata[src]
+            & self._airport_is_iata[dst]
+            # Only international routes (simple heuristic): different first letter
+            & (self._airport_region[src] != self._airport_region[dst])
+        )
+        codes = self.airport_codes
+        pairs = zip(src[mask].tolist(), dst[mask].tolist())
+        return list(dict.fromkeys((codes[s], codes[d]) for s, d in pairs))
+
+    def destinations_from(self, airport_iata: str, airline_iata: Optional[str] = None) -> Set[str]:
+        rows = self.rows_from_airport(airport_iata)
+        if airline_iata is not None:
+            airline_id = self.airline_ids.get(airline_iata)
+            if airline_id is None:
+                return set()
+            rows = rows[self.airline[rows] == airline_id]
+        codes = self.airport_codes
+        return {codes[d] for d in np.unique(self.dest[rows]).tolist()}
+
+
+_dataset = openflights_cache.OpenFlightsDataset(
+    name="routes",
+    url=OPENFLIGHTS_ROUTES_URL,
+    filename="routes.dat",
+    parse=lambda text: RouteTable.from_lines(text.strip().split('\n')),
+    to_cache=lambda table: (table.to_arrays(), table.codes()),
+    from_cache=RouteTable.from_arrays,
+)
+
+
+def get_route_table() -> Optional[RouteTable]:
     """
-    Fetch routes from OpenFlights.org database
-    Format: Airline,Airline ID,Source,Source ID,Dest,Dest ID,Codeshare,Stops,Equipment
+    Routes from memory, else the disk cache, else OpenFlights.org (or the bundled file when offline)
     """
-    global _routes_cache, _cache_expiry
-    
-    # Return cached data if still valid (cache for 24 hours)
-    if _routes_cache and _cache_expiry and datetime.now() < _cache_expiry:
-        logger.info(f"Using cached routes data ({len(_routes_cache)} routes)")
-        return _routes_cache
-    
-    logger.info("Fetching fresh routes data from OpenFlights.org")
-    
-    try:
-        url = "https://raw.githubusercontent.com/jpatokal/openflights/master/data/routes.dat"
-        
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(url)
-            response.raise_for_status()
-            
-            routes = []
-            lines = response.text.strip().split('\n')
-            
-            for line in lines:
-                parts = line.split(',')
-                if len(parts) >= 7:
-                    routes.append({
-                        'airline': parts[0],      # IATA code
-                        'source': parts[2],       # Origin airport IATA
-                        'dest': parts[4],         # Destination airport IATA
-                        'codeshare': parts[6],    # Y if codeshare
-                        'stops': parts[7] if len(parts) > 7 else '0'
-                    })
-            
-            _routes_cache = routes
-            _cache_expiry = datetime.now() + timedelta(hours=24)
-            
-            logger.info(f"Successfully cached {len(routes)} routes from OpenFlights")
-            return routes
-            
-    except Exception as e:
-        logger.error(f"Failed to fetch OpenFlights routes: {e}")
-        
-        # Return stale cache if available
-        if _routes_cache:
-            logger.warning("Using stale routes cache")
-            return _routes_cache
-        
-        return []
+    return _dataset.get()
+
+
+def loaded_route_table() -> Optional[RouteTable]:
+    """Routes if already loaded, without touching disk or network"""
+    return _dataset.loaded
+
+
+def refresh_routes() -> bool:
+    """Revalidate routes.dat against OpenFlights; True when a new table was loaded"""
+    return _dataset.refresh()
+
+
+def start_background_refresh():
+    _dataset.start_background_refresh()
 
 
 def get_airline_routes(airline_iata: str, max_routes: int = 50) -> Set[Tuple[str, str]]:
@@ -70,32 +202,19 @@ def get_airline_routes(airline_iata: str, max_routes: int = 50) -> Set[Tuple[str
     Get all routes for a specific airline
     Returns set of (origin, destination) tuples
     """
-    all_routes = fetch_openflights_routes()
-    
-    if not all_routes:
+    table = get_route_table()
+
+    if table is None:
         logger.warning(f"No routes data available for {airline_iata}")
         return set()
-    
-    # Filter routes for this airline
-    airline_routes = set()
-    
-    for route in all_routes:
-        if route['airline'] == airline_iata:
-            origin = route['source']
-            dest = route['dest']
-            
-            # Skip routes with missing data or not direct (stops > 0)
-            if origin and dest and origin != '\\N' and dest != '\\N':
-                if route.get('stops', '0') == '0':  # Direct flights only
-                    # Only international routes (simple heuristic)
-                    if len(origin) == 3 and len(dest) == 3:
-                        if origin[0] != dest[0]:  # Different region
-                            airline_routes.add((origin, dest))
-    
+
+    # Direct flights only, international routes only
+    airline_routes = table.international_direct_routes(airline_iata)
+
     logger.info(f"Found {len(airline_routes)} routes for airline {airline_iata}")
-    
+
     # Return limited set to avoid too many API calls
-    return set(list(airline_routes)[:max_routes])
+    return set(airline_routes[:max_routes])
 
 
 def get_routes_from_airport(airport_iata: str, airline_iata: Optional[str] = None) -> Set[str]:
@@ -103,15 +222,9 @@ def get_routes_from_airport(airport_iata: str, airline_iata: Optional[str] = Non
     Get all destinations from a specific airport
     Optionally filter by airline
     """
-    all_routes = fetch_openflights_routes()
-    
-    destinations = set()
-    
-    for route in all_routes:
-        if route['source'] == airport_iata:
-            if airline_iata is None or route['airline'] == airline_iata:
-                dest = route['dest']
-                if dest and dest != '\\N':
-                    destinations.add(dest)
-    
-    return destinations
+    table = get_route_table()
+
+    if table is None:
+        return set()
+
+    return table.destinations_from(airport_iata, airline_iata)
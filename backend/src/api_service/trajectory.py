@@ -0,0 +1,126 @@
+"""
+Great-circle trajectory engine
+Vectorized with NumPy so a whole map's worth of flights is interpolated in one call
+"""
+import base64
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    lat_r = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_r = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_r)
+    return np.stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)], axis=-1)
+
+
+def great_circle_distance_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine distance, broadcasting over any array shapes"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def great_circle_tracks(origin_lat, origin_lon, dest_lat, dest_lon, fractions) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Interpolate F flights along their great circles.
+    origin/dest arrays have shape (F,), fractions has shape (N,) or (F, N) with values in [0, 1].
+    Returns (lats, lons) of shape (F, N). Longitudes are unwrapped along each track so
+    paths crossing the antimeridian stay continuous (e.g. 179 -> 181 instead of 179 -> -179).
+    """
+    p1 = _unit_vectors(origin_lat, origin_lon).reshape(-1, 3)
+    p2 = _unit_vectors(dest_lat, dest_lon).reshape(-1, 3)
+    t = np.broadcast_to(np.asarray(fractions, dtype=np.float64), (p1.shape[0], np.shape(fractions)[-1]))
+
+    cos_omega = np.clip(np.einsum("ij,ij->i", p1, p2), -1.0, 1.0)
+    omega = np.arccos(cos_omega)[:, None]
+    # Unit direction from p1 towards p2 along the great circle. For coincident or antipodal
+    # endpoints it is undefined (any great circle through antipodes is shortest), so the
+    # meridian direction is used instead (the equator's for polar endpoints).
+    perp = p2 - cos_omega[:, None] * p1
+    # Projected twice: near-antipodal endpoints leave a cancellation error along p1
+    perp -= np.einsum("ij,ij->i", perp, p1)[:, None] * p1
+    perp_norm = np.linalg.norm(perp, axis=1, keepdims=True)
+    axis = np.where(np.abs(p1[:, 2:3]) < 1.0 - 1e-12, np.array([0.0, 0.0, 1.0]), np.array([1.0, 0.0, 0.0]))
+    fallback = axis - np.einsum("ij,ij->i", axis, p1)[:, None] * p1
+    fallback /= np.linalg.norm(fallback, axis=1, keepdims=True)
+    direction = np.where(perp_norm < 1e-12, fallback, perp / np.where(perp_norm < 1e-12, 1.0, perp_norm))
+
+    angle = (t * omega)[..., None]
+    points = np.cos(angle) * p1[:, None, :] + np.sin(angle) * direction[:, None, :]
+    x, y, z = points[..., 0], points[..., 1], points[..., 2]
+    lats = np.degrees(np.arctan2(z, np.hypot(x, y)))
+    lons = np.degrees(np.unwrap(np.arctan2(y, x), axis=-1))
+    return lats, lons
+
+
+def wrap_longitudes(lons) -> np.ndarray:
+    """Unwrapped longitudes back into [-180, 180)"""
+    return (np.asarray(lons, dtype=np.float64) + 180.0) % 360.0 - 180.0
+
+
+def tracks_cross_bbox(lats, lons, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+    """
+    Which of F tracks (shape (F, N), longitudes unwrapped) have any segment between
+    consecutive points that intersects the box, not just a point inside it.
+    Segment/box clipping is Liang-Barsky in the lon/lat plane; the box is also tested
+    shifted by whole turns so unwrapped tracks and antimeridian boxes line up.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if max_lon - min_lon >= 360.0:
+        return (lats.max(axis=1) >= min_lat) & (lats.min(axis=1) <= max_lat)
+    if max_lon < min_lon:
+        max_lon += 360.0
+
+    x0, y0 = lons[:, :-1], lats[:, :-1]
+    dx, dy = np.diff(lons, axis=1), np.diff(lats, axis=1)
+    hit = np.zeros(lats.shape[0], dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for shift in (-720.0, -360.0, 0.0, 360.0, 720.0):
+            lo, hi = min_lon + shift, max_lon + shift
+            t0 = np.zeros_like(x0)
+            t1 = np.ones_like(x0)
+            ok = np.ones_like(x0, dtype=bool)
+            for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - min_lat), (dy, max_lat - y0)):
+                parallel = p == 0
+                ok &= ~(parallel & (q < 0))
+                r = np.where(parallel, 0.0, q / np.where(parallel, 1.0, p))
+                t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+                t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+            hit |= (ok & (t0 <= t1)).any(axis=1)
+    return hit
+
+
+def flight_profile(progress) -> Tuple[np.ndarray, np.ndarray]:
+    """Simple altitude (ft) and ground speed (kt) profile for flight progress in [0, 1]"""
+    progress = np.asarray(progress, dtype=np.float64)
+    from_middle = 0.5 - np.abs(progress - 0.5)
+    altitude = np.where((progress > 0.05) & (progress < 0.95), 35000 + 5000 * from_middle, 0)
+    speed = np.where((progress < 0.02) | (progress > 0.98), 0, 450 + 50 * from_middle)
+    return altitude.astype(np.int64), speed.astype(np.int64)
+
+
+def encode_polyline(lats, lons, precision: int = 5) -> str:
+    """Google encoded polyline algorithm format"""
+    factor = 10 ** precision
+    coords = np.round(np.column_stack([lats, lons]) * factor).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
+
+
+def encode_float32(lats, lons) -> str:
+    """Base64 of interleaved little-endian float32 [lat0, lon0, lat1, lon1, ...] for a JS Float32Array"""
+    interleaved = np.column_stack([lats, lons]).astype("<f4")
+    return base64.b64encode(interleaved.tobytes()).decode("ascii")
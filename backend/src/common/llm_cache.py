@@ -0,0 +1,188 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# SQLite file for the optional disk tier; empty keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def cache_key(*, model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+    """Hash of the model settings and the prompt with whitespace runs collapsed"""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "prompt": _WHITESPACE.sub(" ", prompt).strip(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU + TTL cache of parsed LLM JSON responses, with an optional SQLite tier
+    shared across restarts. Concurrent misses on the same key make one LLM call.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        disk_path: str = LLM_CACHE_PATH,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, temperature REAL, created_at REAL, value TEXT)"
+            )
+            self._db.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT created_at, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] + self.ttl_seconds <= time.time():
+            return None
+        return row[0] + self.ttl_seconds, json.loads(row[1])
+
+    def _put_disk(self, key: str, value: Dict[str, Any], model: str, temperature: float):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, temperature, created_at, value) VALUES (?, ?, ?, ?, ?)",
+                (key, model, temperature, time.time(), json.dumps(value)),
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        stored = self._get_disk(key)
+        if stored is not None:
+            expires_at, value = stored
+            self._put_memory(key, value, expires_at)
+            self._count("disk_hits")
+            return value
+        return None
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Dict[str, Any]],
+        *,
+        model: str,
+        temperature: float,
+    ) -> Dict[str, Any]:
+        """Cached value for key, else compute() once (other callers for the same key wait for it)"""
+        if not self.enabled:
+            return compute()
+
+        value = self._lookup(key)
+        if value is None:
+            with self._lock:
+                key_lock = self._inflight.setdefault(key, threading.Lock())
+            with key_lock:
+                value = self._lookup(key)
+                if value is None:
+                    self._count("misses")
+                    try:
+                        value = compute()
+                        # Stored before the in-flight lock goes away, so late arrivals hit the cache
+                        self._put_memory(key, value, time.time() + self.ttl_seconds)
+                        self._put_disk(key, value, model, temperature)
+                    finally:
+                        with self._lock:
+                            self._inflight.pop(key, None)
+
+        # Callers may mutate what they get back (e.g. triage constraints)
+        return copy.deepcopy(value)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached value for key without computing it on a miss"""
+        if not self.enabled:
+            return None
+        value = self._lookup(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def put(self, key: str, value: Dict[str, Any], *, model: str, temperature: float):
+        """Store a value computed elsewhere (e.g. one item of a batched prompt)"""
+        if not self.enabled:
+            return
+        self._put_memory(key, copy.deepcopy(value), time.time() + self.ttl_seconds)
+        self._put_disk(key, value, model, temperature)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["disk_tier"] = self._db is not None
+        return stats
+
+
+llm_cache = LLMResponseCache()
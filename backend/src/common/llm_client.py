@@ -1,46 +1,47 @@
 import os
 import json
-from typing import Any, Dict
-from pathlib import Path
+import asyncio
+import threading
+from typing import Any, Dict, Optional
 
 import google.generativeai as genai
-from dotenv import load_dotenv
+
+from .llm_cache import LLMResponseCache, cache_key, llm_cache
 
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Per-request timeout and the number of Gemini calls allowed in flight per process
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
 
 
 class ClaudeClient:
     """Renamed to ClaudeClient for backward compatibility, but now uses Gemini"""
-    def __init__(self) -> None:
-        # Load backend/.env so local runs don't require manual exports.
-        # Go up from common/ -> src/ -> backend/ -> .env
-        env_path = Path(__file__).resolve().parents[2] / ".env"
-        load_dotenv(env_path, override=False)
+    def __init__(
+        self,
+        *,
+        timeout_seconds: float = GEMINI_TIMEOUT_SECONDS,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        cache: Optional[LLMResponseCache] = llm_cache,
+    ) -> None:
+        # backend/.env is loaded when the src package is imported
         api_key = os.getenv("GEMINI_API_KEY", "")
         if not api_key:
             raise RuntimeError("Gemini API key not set. Set GEMINI_API_KEY in .env or env vars. Get free key at https://aistudio.google.com/app/apikey")
 
         # Configure Gemini
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name=GEMINI_MODEL,
-            generation_config={
-                "temperature": 0.2,
-                "max_output_tokens": 2048,
-            }
-        )
+        self.model_name = GEMINI_MODEL
+        self.model = genai.GenerativeModel(model_name=GEMINI_MODEL)
+        self.timeout_seconds = timeout_seconds
+        # Shared by sync and async callers, so the limit holds across both
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Identical prompts (e.g. one cancelled flight for hundreds of passengers) are answered from here
+        self.cache = cache
 
-    def json_response(
-        self,
-        *,
-        system: str,
-        user: str,
-        schema_hint: str,
-        temperature: float = 0.2,
-        max_tokens: int = 1024,
-    ) -> Dict[str, Any]:
+    @staticmethod
+    def _build_prompt(system: str, user: str, schema_hint: str) -> str:
         # Gemini doesn't have separate system/user, combine them
-        prompt = f"""System Instructions: {system}
+        return f"""System Instructions: {system}
 
 User Request: {user}
 
@@ -49,10 +50,11 @@ Just raw JSON matching this exact schema:
 {schema_hint}
 
 Return the JSON now:"""
-        
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
-        
+
+    @staticmethod
+    def _parse_json(text: str) -> Dict[str, Any]:
+        text = text.strip()
+
         # Aggressively clean markdown formatting
         if text.startswith('```'):
             # Remove code block markers
@@ -64,13 +66,13 @@ Return the JSON now:"""
             if lines and lines[-1].strip() == '```':
                 lines = lines[:-1]
             text = '\n'.join(lines).strip()
-        
+
         # Try to extract JSON if wrapped in other text
         if not text.startswith('{') and '{' in text:
             start = text.index('{')
             end = text.rindex('}') + 1
             text = text[start:end]
-            
+
         try:
             return json.loads(text)
         except json.JSONDecodeError as e:
@@ -78,3 +80,100 @@ Return the JSON now:"""
             print(f"JSON Parse Error: {e}")
             print(f"Problematic text: {text[:500]}")
             raise RuntimeError(f"Failed to parse LLM JSON response: {e}") from e
+
+    def json_response(
+        self,
+        *,
+        system: str,
+        user: str,
+        schema_hint: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> Dict[str, Any]:
+        prompt = self._build_prompt(system, user, schema_hint)
+
+        def generate() -> Dict[str, Any]:
+            with self._slots:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config={
+                        "temperature": temperature,
+                        "max_output_tokens": max_tokens,
+                    },
+                    request_options={"timeout": self.timeout_seconds},
+                )
+            return self._parse_json(response.text)
+
+        if self.cache is None:
+            return generate()
+
+        key = self._cache_key(prompt, temperature, max_tokens)
+        return self.cache.get_or_compute(key, generate, model=self.model_name, temperature=temperature)
+
+    def _cache_key(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        return cache_key(model=self.model_name, temperature=temperature, max_tokens=max_tokens, prompt=prompt)
+
+    def cached_json_response(
+        self,
+        *,
+        system: str,
+        user: str,
+        schema_hint: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> Optional[Dict[str, Any]]:
+        """What json_response would return from the cache, or None (the model is not called)"""
+        if self.cache is None:
+            return None
+        prompt = self._build_prompt(system, user, schema_hint)
+        return self.cache.get(self._cache_key(prompt, temperature, max_tokens))
+
+    def store_json_response(
+        self,
+        value: Dict[str, Any],
+        *,
+        system: str,
+        user: str,
+        schema_hint: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> None:
+        """Cache value as the response to this prompt, e.g. when it was answered as part of a batch"""
+        if self.cache is None:
+            return
+        prompt = self._build_prompt(system, user, schema_hint)
+        self.cache.put(self._cache_key(prompt, temperature, max_tokens), value, model=self.model_name, temperature=temperature)
+
+    async def json_response_async(
+        self,
+        *,
+        system: str,
+        user: str,
+        schema_hint: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> Dict[str, Any]:
+        """json_response without blocking the event loop"""
+        return await asyncio.to_thread(
+            self.json_response,
+            system=system,
+            user=user,
+            schema_hint=schema_hint,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+
+_client: Optional[ClaudeClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> ClaudeClient:
+    """Process-wide client, created on first use"""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ClaudeClient()
+    return _client
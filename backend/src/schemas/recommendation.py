@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 class DisruptionEvent(BaseModel):
@@ -16,8 +16,16 @@ class DisruptionEvent(BaseModel):
     raw: Dict[str, Any] = Field(default_factory=dict)
 
 
+# How raw Amadeus payloads appear in responses:
+#   full - raw payloads inline (default)
+#   ref  - offers carry raw_ref only; fetch the payload from /agents/offers/{raw_ref}
+#   lean - no raw data and no reference
+ResponseMode = Literal["ref", "full", "lean"]
+
+
 class RecommendationRequest(BaseModel):
     disruption: DisruptionEvent = Field(default_factory=DisruptionEvent)
+    response_mode: ResponseMode = "full"
 
     passenger: Dict[str, Any] = Field(default_factory=dict)  # e.g., {"adults": 1}
 
@@ -34,7 +42,11 @@ class NormalizedOffer(BaseModel):
     stops: int
     route: List[str]  # e.g., ["SFO","SEA","ORD"]
     carriers: List[str] = Field(default_factory=list)  # e.g., ["AS"]
-    raw: Dict[str, Any] = Field(default_factory=dict)
+    carrier_names: Dict[str, str] = Field(default_factory=dict)  # from the response dictionaries, e.g., {"AS": "ALASKA AIRLINES"}
+    raw: Dict[str, Any] = Field(default_factory=dict)  # empty for lean offers, see raw_ref
+    raw_ref: Optional[str] = None  # key of the raw payload in tools.offer_store
+    provenance: List[str] = Field(default_factory=list)  # "<search>:<offer_id>" of each merged duplicate, see tools.offer_index
+    fingerprint: Optional[str] = Field(default=None, exclude=True)  # segment identity for deduplication, set when normalized
 
 
 class RecommendedOffer(BaseModel):
@@ -49,3 +61,33 @@ class RecommendationResponse(BaseModel):
     recommended_offers: List[RecommendedOffer] = Field(default_factory=list)
     reasoning: List[str] = Field(default_factory=list)
     confidence: float
+    timings_ms: Dict[str, float] = Field(default_factory=dict)  # per pipeline stage, plus "total"
+
+
+class BatchRecommendationItem(BaseModel):
+    passenger_id: Optional[str] = None
+    passenger: Dict[str, Any] = Field(default_factory=dict)
+    search: Dict[str, Any] = Field(default_factory=dict)  # merged over the batch-level search
+    disruption: Optional[DisruptionEvent] = None  # defaults to the batch-level disruption
+
+
+class BatchRecommendationRequest(BaseModel):
+    disruption: DisruptionEvent = Field(default_factory=DisruptionEvent)
+    response_mode: ResponseMode = "full"
+    search: Dict[str, Any] = Field(default_factory=dict)  # shared defaults, e.g. {"origin":"SFO","destination":"ORD","date":"2025-12-31"}
+    items: List[BatchRecommendationItem] = Field(default_factory=list)
+
+
+class BatchRecommendationResult(BaseModel):
+    passenger_id: Optional[str] = None
+    recommendation: Optional[RecommendationResponse] = None
+    error: Optional[str] = None
+
+
+class BatchRecommendationResponse(BaseModel):
+    trace_id: str
+    results: List[BatchRecommendationResult] = Field(default_factory=list)
+    unique_triages: int = 0
+    unique_searches: int = 0
+    unique_decisions: int = 0
+    timings_ms: Dict[str, float] = Field(default_factory=dict)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+_WHITESPACE = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+
+# Compact the buffer once this many characters have been consumed
+_COMPACT_AT = 1 << 16
+
+
+class StreamingOffersParser:
+    """
+    Incremental parser for Amadeus flight-offers responses.
+
+    Walks the top-level object of a body that arrives as text chunks and yields each
+    element of its "data" (or "offers") array as (offer dict, offer JSON text) as soon
+    as the element is complete, so the whole response is never materialized as one
+    object tree. "dictionaries" is kept; other top-level members (meta, warnings)
+    are parsed and dropped.
+    """
+
+    OFFER_KEYS = ("data", "offers")
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.dictionaries: Dict[str, Any] = {}
+
+    def _more(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                if self._pos >= _COMPACT_AT:
+                    self._buf = self._buf[self._pos:]
+                    self._pos = 0
+                self._buf += chunk
+                return True
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                raise ValueError("Unexpected end of Amadeus response")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of Amadeus response, got {found!r}")
+        self._pos += 1
+
+    def _value(self) -> Tuple[Any, int, int]:
+        """Next complete JSON value, with its start and end offsets in the buffer"""
+        self._peek()
+        while True:
+            start = self._pos
+            try:
+                value, end = _decoder.raw_decode(self._buf, start)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buf) and self._more():
+                continue
+            self._pos = end
+            return value, start, end
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, Any], str]]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._end()
+            return
+        while True:
+            key, _, _ = self._value()
+            self._expect(":")
+
+            if key in self.OFFER_KEYS and self._peek() == "[":
+                yield from self._array()
+            else:
+                value, _, _ = self._value()
+                if key == "dictionaries" and isinstance(value, dict):
+                    self.dictionaries = value
+
+            if self._peek() == "}":
+                self._end()
+                return
+            self._expect(",")
+
+    def _end(self) -> None:
+        # Drain the source so the body is fully read (and the connection released)
+        self._pos += 1
+        while self._more():
+            pass
+        if self._buf[self._pos:].strip():
+            raise ValueError(f"Unexpected data after Amadeus response at offset {self._pos}")
+
+    def _array(self) -> Iterator[Tuple[Dict[str, Any], str]]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            value, start, end = self._value()
+            if isinstance(value, dict):
+                yield value, self._buf[start:end]
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            self._expect(",")
+
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from ..api_service.amadeus_client import AmadeusClient
+from ..api_service.amadeus_client import AmadeusResponseInterrupted, amadeus_client
 from ..schemas.recommendation import NormalizedOffer
+from .amadeus_stream import StreamingOffersParser
+from .offer_index import segments_fingerprint
+from .offer_store import offer_store
+
+logger = logging.getLogger(__name__)
 
 
 def _count_stops(itinerary: Dict[str, Any]) -> int:
@@ -44,56 +50,98 @@ def _carriers(itinerary: Dict[str, Any]) -> List[str]:
     return carriers
 
 
+def _carrier_names(carriers: List[str], dictionaries: Dict[str, Any]) -> Dict[str, str]:
+    names = dictionaries.get("carriers") or {}
+    return {code: names[code] for code in carriers if code in names}
+
+
+def _normalize_offer(
+    off: Dict[str, Any],
+    *,
+    raw: Optional[Dict[str, Any]] = None,
+    raw_ref: Optional[str] = None,
+    dictionaries: Optional[Dict[str, Any]] = None,
+) -> NormalizedOffer:
+    price = off.get("price", {}) or {}
+    total_str = price.get("grandTotal") or price.get("total") or "0"
+
+    try:
+        total_price = float(total_str)
+    except Exception:
+        total_price = 0.0
+
+    itineraries = off.get("itineraries") or []
+    if itineraries:
+        it0 = itineraries[0]
+        total_duration = it0.get("duration") or ""
+        stops = _count_stops(it0)
+        route = _route(it0)
+        carriers = _carriers(it0)
+    else:
+        total_duration = ""
+        stops = 0
+        route = []
+        carriers = []
+
+    return NormalizedOffer(
+        offer_id=str(off.get("id", "")),
+        total_price=total_price,
+        currency=price.get("currency") or "USD",
+        total_duration=total_duration,
+        stops=stops,
+        route=route,
+        carriers=carriers,
+        carrier_names=_carrier_names(carriers, dictionaries or {}),
+        raw=raw or {},
+        raw_ref=raw_ref,
+        fingerprint=segments_fingerprint(off),
+    )
+
+
 class AmadeusTool:
     """
     Tool wrapper:
-    - calls AmadeusClient.search_flight_offers(...)
-    - normalizes response into NormalizedOffer objects
+    - streams AmadeusClient.stream_flight_offers(...) through StreamingOffersParser
+    - normalizes each offer into a NormalizedOffer as soon as it is parsed
     """
 
-    def normalize_offers(self, amadeus_json: Dict[str, Any]) -> List[NormalizedOffer]:
+    def normalize_offers(self, amadeus_json: Dict[str, Any], keep_raw: bool = False) -> List[NormalizedOffer]:
+        """
+        Raw offers go to the offer store and are referenced by raw_ref;
+        keep_raw=True embeds them in NormalizedOffer.raw instead.
+        """
         offers = amadeus_json.get("offers") or amadeus_json.get("data") or []
-        normalized: List[NormalizedOffer] = []
-
-        for off in offers:
-            offer_id = str(off.get("id", ""))
-
-            price = off.get("price", {}) or {}
-            total_str = price.get("grandTotal") or price.get("total") or "0"
-            currency = price.get("currency") or "USD"
-
-            try:
-                total_price = float(total_str)
-            except Exception:
-                total_price = 0.0
-
-            itineraries = off.get("itineraries") or []
-            if itineraries:
-                it0 = itineraries[0]
-                total_duration = it0.get("duration") or ""
-                stops = _count_stops(it0)
-                route = _route(it0)
-                carriers = _carriers(it0)
-            else:
-                total_duration = ""
-                stops = 0
-                route = []
-                carriers = []
-
-            normalized.append(
-                NormalizedOffer(
-                    offer_id=offer_id,
-                    total_price=total_price,
-                    currency=currency,
-                    total_duration=total_duration,
-                    stops=stops,
-                    route=route,
-                    carriers=carriers,
-                    raw=off,
-                )
+        dictionaries = amadeus_json.get("dictionaries") or {}
+        return [
+            _normalize_offer(
+                off,
+                raw=off if keep_raw else None,
+                raw_ref=None if keep_raw else offer_store.put(off),
+                dictionaries=dictionaries,
             )
-
-        return normalized
+            for off in offers
+        ]
+
+    def iter_normalized_offers(self, chunks: Iterable[str]) -> Iterator[NormalizedOffer]:
+        """
+        Yield offers from a response body arriving as text chunks, without building the
+        whole response tree. Each raw offer is stored as its JSON text.
+
+        Amadeus sends "dictionaries" after "data", so carrier names are filled in on
+        already-yielded offers once it arrives.
+        """
+        parser = StreamingOffersParser(chunks)
+        unresolved: List[NormalizedOffer] = []
+        try:
+            for off, text in parser:
+                offer = _normalize_offer(off, raw_ref=offer_store.put(text), dictionaries=parser.dictionaries)
+                if not parser.dictionaries:
+                    unresolved.append(offer)
+                yield offer
+        finally:
+            # Also when the body turns out malformed after the dictionaries arrived
+            for offer in unresolved:
+                offer.carrier_names = _carrier_names(offer.carriers, parser.dictionaries)
 
     def search_offers(
         self,
@@ -103,14 +151,43 @@ class AmadeusTool:
         adults: int = 1,
         max_results: int = 5,
     ) -> List[NormalizedOffer]:
-        client = AmadeusClient()
-
-        data = client.search_flight_offers(
+        # Shared client so circuit breaker state and the fallback cache are process-wide
+        body = amadeus_client.stream_flight_offers(
             origin=origin,
             destination=destination,
             departure_date=departure_date,
             adults=adults,
             max_results=max_results,
         )
+        if body is None:
+            return []
+
+        offers, error = self._collect(body)
+        if error is None:
+            return offers
 
-        return self.normalize_offers(data)
+        # A broken body is not a result: serve the last good response for this search
+        logger.error(f"Amadeus flight offers response failed after {len(offers)} offers: {error}")
+        cached = amadeus_client.cached_flight_offers(
+            origin=origin,
+            destination=destination,
+            departure_date=departure_date,
+            adults=adults,
+            max_results=max_results,
+        )
+        if cached is not None:
+            fallback, fallback_error = self._collect(cached)
+            if fallback_error is None:
+                return fallback
+        logger.warning(f"No cached Amadeus response for {origin}-{destination} on {departure_date}; returning {len(offers)} partial offers")
+        return offers
+
+    def _collect(self, body: Iterable[str]) -> Tuple[List[NormalizedOffer], Optional[Exception]]:
+        """Offers parsed from body, and the error that cut the body short, if any"""
+        offers: List[NormalizedOffer] = []
+        try:
+            for offer in self.iter_normalized_offers(body):
+                offers.append(offer)
+        except (AmadeusResponseInterrupted, ValueError) as e:
+            return offers, e
+        return offers, None
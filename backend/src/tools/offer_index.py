@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..schemas.recommendation import NormalizedOffer
+
+
+def _raw_segments(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Offers combined from separately priced legs store {"legs": [raw, raw]}
+    if "legs" in raw:
+        return [seg for leg in raw["legs"] for seg in _raw_segments(leg or {})]
+    return [seg for it in raw.get("itineraries") or [] for seg in it.get("segments") or []]
+
+
+def segments_fingerprint(raw: Dict[str, Any]) -> Optional[str]:
+    """
+    Identity of the flights a raw offer books: carrier, flight number, airports and times
+    of every segment. None when the payload has no segments.
+    """
+    segments = _raw_segments(raw)
+    if not segments:
+        return None
+    return "|".join(
+        f"{seg.get('carrierCode')}{seg.get('number')} "
+        f"{(seg.get('departure') or {}).get('iataCode')} {(seg.get('departure') or {}).get('at')} "
+        f"{(seg.get('arrival') or {}).get('iataCode')} {(seg.get('arrival') or {}).get('at')}"
+        for seg in segments
+    )
+
+
+def itinerary_fingerprint(offer: NormalizedOffer) -> Optional[str]:
+    """
+    The fingerprint computed when the offer was normalized, else from an inline raw
+    payload. Stored payloads are not decoded for this; None means unknown.
+    """
+    if offer.fingerprint:
+        return offer.fingerprint
+    return segments_fingerprint(offer.raw) if offer.raw else None
+
+
+class OfferIndex:
+    """
+    Offers from several searches (dates, airports, route-graph legs) merged by
+    itinerary_fingerprint. Each itinerary keeps its cheapest offer, and its
+    provenance lists every "<source>:<offer_id>" it was returned as. Offers without
+    a fingerprint are never merged, since their summary fields can't tell flights apart.
+
+    Amadeus numbers offers from "1" in every search, so merged offers are identified
+    by the "<source>:<offer_id>" of the offer that was kept.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Hashable, Tuple[NormalizedOffer, str, List[str]]] = {}
+        self.added = 0
+
+    def add(self, offers: Iterable[NormalizedOffer], source: str) -> None:
+        for offer in offers:
+            self.added += 1
+            seen = f"{source}:{offer.offer_id}"
+            key: Hashable = itinerary_fingerprint(offer) or ("unmatched", self.added)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = (offer, seen, [seen])
+                continue
+            best, _, provenance = entry
+            provenance.append(seen)
+            if offer.total_price < best.total_price:
+                self._entries[key] = (offer, seen, provenance)
+
+    def offers(self) -> List[NormalizedOffer]:
+        """One offer per itinerary, in first-seen order, with offer_id unique across sources"""
+        return [
+            best.model_copy(update={"offer_id": offer_id, "provenance": provenance})
+            for best, offer_id, provenance in self._entries.values()
+        ]
+
+    @property
+    def duplicates(self) -> int:
+        return self.added - len(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
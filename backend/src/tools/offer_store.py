@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+from uuid import uuid4
+
+from ..schemas.recommendation import NormalizedOffer
+
+logger = logging.getLogger(__name__)
+
+# Raw Amadeus offers kept for lazy access; offers go stale quickly, so entries expire
+OFFER_STORE_MAX_ENTRIES = int(os.getenv("OFFER_STORE_MAX_ENTRIES", "5000"))
+OFFER_STORE_TTL_SECONDS = float(os.getenv("OFFER_STORE_TTL_SECONDS", "1800"))
+
+
+class OfferStore:
+    """
+    Bounded LRU + TTL side store of raw offer payloads, referenced by NormalizedOffer.raw_ref.
+    Payloads may be stored as the JSON text they arrived in; they are decoded on access.
+    """
+
+    def __init__(self, max_entries: int = OFFER_STORE_MAX_ENTRIES, ttl_seconds: float = OFFER_STORE_TTL_SECONDS) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Union[Dict[str, Any], str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def put(self, raw: Union[Dict[str, Any], str]) -> str:
+        ref = uuid4().hex
+        with self._lock:
+            self._entries[ref] = (time.time() + self.ttl_seconds, raw)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(ref)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[ref]
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._entries.move_to_end(ref)
+            raw = entry[1]
+        return json.loads(raw) if isinstance(raw, str) else raw
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+offer_store = OfferStore()
+
+
+def raw_of(offer: NormalizedOffer) -> Dict[str, Any]:
+    """The offer's raw Amadeus payload, inline or from the side store ({} once expired)"""
+    if offer.raw:
+        return offer.raw
+    if offer.raw_ref:
+        raw = offer_store.get(offer.raw_ref)
+        if raw is None:
+            logger.warning(f"Raw payload {offer.raw_ref} of offer {offer.offer_id} was evicted or expired")
+            return {}
+        return raw
+    return {}
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..api_service.distance_matrix import ready_distance_matrix
+from ..api_service.routes_data import RouteTable, get_route_table
+
+
+@dataclass
+class RouteCandidate:
+    path: List[str]                                           # e.g. ["SFO", "DEN", "ORD"]
+    leg_carriers: List[List[str]] = field(default_factory=list)  # carriers serving each leg
+
+    @property
+    def stops(self) -> int:
+        return len(self.path) - 2
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return values[order], offsets
+
+
+class RouteGraph:
+    """
+    Directed airport graph over the OpenFlights network.
+    Nodes are RouteTable airport ids; each unique nonstop (source, dest) pair is one edge,
+    with the set of airlines operating it kept alongside for carrier constraints.
+    """
+
+    def __init__(self, table: RouteTable):
+        self.table = table
+        n = len(table.airport_codes)
+
+        direct = np.flatnonzero(np.asarray(table.stops) == 0)
+        src = np.asarray(table.source)[direct].astype(np.int64)
+        dst = np.asarray(table.dest)[direct].astype(np.int64)
+        edge_keys, row_edge = np.unique(src * n + dst, return_inverse=True)
+
+        self.edge_src = edge_keys // n
+        self.edge_dst = edge_keys % n
+        edge_ids = np.arange(len(edge_keys))
+
+        # Edges are sorted by (src, dst), so outgoing edges are contiguous per source
+        self._out_edges, self._out_offsets = _csr(self.edge_src, edge_ids, n)
+        self._in_edges, self._in_offsets = _csr(self.edge_dst, edge_ids, n)
+
+        # Airlines per edge
+        self._edge_airlines, self._edge_airline_offsets = _csr(
+            row_edge, np.asarray(table.airline)[direct].astype(np.int64), len(edge_keys)
+        )
+        # Edge id of every route row, used to turn carrier filters into edge masks
+        self._row_edge = np.full(len(table), -1, dtype=np.int64)
+        self._row_edge[direct] = row_edge
+
+        self.out_degree = np.diff(self._out_offsets)
+
+    def _allowed_edges(self, carriers: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if not carriers:
+            return None
+        mask = np.zeros(len(self.edge_src), dtype=bool)
+        for carrier in carriers:
+            edges = self._row_edge[self.table.rows_for_airline(carrier)]
+            mask[edges[edges >= 0]] = True
+        return mask
+
+    def _neighbors(self, node: int, outgoing: bool, allowed: Optional[np.ndarray]) -> np.ndarray:
+        if outgoing:
+            edges = self._out_edges[self._out_offsets[node]:self._out_offsets[node + 1]]
+            ends = self.edge_dst
+        else:
+            edges = self._in_edges[self._in_offsets[node]:self._in_offsets[node + 1]]
+            ends = self.edge_src
+        if allowed is not None:
+            edges = edges[allowed[edges]]
+        return ends[edges]
+
+    def _edge_id(self, a: int, b: int) -> int:
+        edges = self._out_edges[self._out_offsets[a]:self._out_offsets[a + 1]]
+        i = int(np.searchsorted(self.edge_dst[edges], b))
+        if i < len(edges) and self.edge_dst[edges[i]] == b:
+            return int(edges[i])
+        return -1
+
+    def _leg_carriers(self, a: int, b: int, carriers: Optional[Iterable[str]]) -> List[str]:
+        edge = self._edge_id(a, b)
+        if edge < 0:
+            return []
+        ids = self._edge_airlines[self._edge_airline_offsets[edge]:self._edge_airline_offsets[edge + 1]]
+        codes = sorted({self.table.airline_codes[i] for i in ids.tolist()})
+        if carriers:
+            wanted = set(carriers)
+            codes = [c for c in codes if c in wanted]
+        return codes
+
+    def _gather_out(self, nodes: np.ndarray, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """All outgoing edges of many nodes at once: returns (start node, end node) arrays"""
+        starts = self._out_offsets[nodes]
+        lengths = self._out_offsets[nodes + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        edges = self._out_edges[positions]
+        from_nodes = np.repeat(nodes, lengths)
+        if allowed is not None:
+            keep = allowed[edges]
+            edges, from_nodes = edges[keep], from_nodes[keep]
+        return from_nodes, self.edge_dst[edges]
+
+    def _best(self, paths: np.ndarray, count: int) -> np.ndarray:
+        """Top rows of a (P, stops + 2) path array: smallest detour first, then the best-connected hubs"""
+        if len(paths) == 0 or count <= 0:
+            return paths[:0]
+        hub_degree = self.out_degree[paths[:, 1:-1]].min(axis=1)
+        matrix = ready_distance_matrix()
+        if matrix is not None and matrix.codes is self.table.airport_codes:
+            # Matrix ids are RouteTable airport ids, so paths index it directly
+            detour = np.round(matrix.detour_ratio_ids(paths), 2)
+            order = np.lexsort((-hub_degree, detour))
+        else:
+            order = np.argsort(-hub_degree, kind="stable")
+        return paths[order[:count]]
+
+    def candidate_paths(
+        self,
+        origin: str,
+        destination: str,
+        *,
+        max_stops: int = 1,
+        carriers: Optional[Iterable[str]] = None,
+        limit: int = 10,
+    ) -> List[RouteCandidate]:
+        """
+        Nonstop, one-stop and (max_stops >= 2) two-stop paths from origin to destination,
+        fewest stops first. carriers restricts every leg to edges operated by one of those airlines.
+        Deeper searches are skipped once limit paths have been found.
+        """
+        o = self.table.airport_ids.get(origin)
+        d = self.table.airport_ids.get(destination)
+        if o is None or d is None or o == d:
+            return []
+
+        allowed = self._allowed_edges(carriers)
+        out_o = self._neighbors(o, True, allowed)
+        in_d = self._neighbors(d, False, allowed)
+        found: List[List[int]] = []
+
+        if np.any(out_o == d):
+            found.append([o, d])
+
+        if max_stops >= 1 and len(found) < limit:
+            hubs = np.intersect1d(out_o, in_d)
+            hubs = hubs[(hubs != o) & (hubs != d)]
+            one_stop = np.column_stack([np.full(len(hubs), o), hubs, np.full(len(hubs), d)])
+            found.extend(self._best(one_stop, limit - len(found)).tolist())
+
+        if max_stops >= 2 and len(found) < limit:
+            into_d = np.zeros(len(self.table.airport_codes), dtype=bool)
+            into_d[in_d] = True
+            into_d[[o, d]] = False
+            first_hubs = out_o[out_o != d]
+            h1, h2 = self._gather_out(first_hubs, allowed)
+            keep = into_d[h2] & (h1 != h2)
+            h1, h2 = h1[keep], h2[keep]
+            two_stop = np.column_stack([np.full(len(h1), o), h1, h2, np.full(len(h1), d)])
+            found.extend(self._best(two_stop, limit - len(found)).tolist())
+
+        codes = self.table.airport_codes
+        return [
+            RouteCandidate(
+                path=[codes[n] for n in nodes],
+                leg_carriers=[self._leg_carriers(a, b, carriers) for a, b in zip(nodes, nodes[1:])],
+            )
+            for nodes in found
+        ]
+
+
+_graph: Optional[RouteGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_route_graph() -> Optional[RouteGraph]:
+    """Graph over the current RouteTable, rebuilt when the routes dataset is refreshed"""
+    global _graph
+
+    table = get_route_table()
+    if table is None:
+        return None
+    graph = _graph
+    if graph is not None and graph.table is table:
+        return graph
+    # Concurrent first requests wait for one build instead of each building the graph
+    with _graph_lock:
+        if _graph is None or _graph.table is not table:
+            _graph = RouteGraph(table)
+        return _graph
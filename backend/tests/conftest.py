@@ -0,0 +1,47 @@
+"""Shared builders for Amadeus payloads and clients; tests import these directly"""
+import httpx
+
+from src.api_service.amadeus_client import AmadeusClient
+from src.tools.amadeus_tool import AmadeusTool
+
+
+def raw_offer(
+    offer_id,
+    price=100,
+    *,
+    origin="SFO",
+    destination="JFK",
+    departure="2026-10-20T08:00:00",
+    arrival="2026-10-20T16:00:00",
+    duration="PT5H",
+    carrier="UA",
+    number=None,
+):
+    """A one-segment Amadeus flight offer; the flight number defaults to the offer id"""
+    return {
+        "id": offer_id,
+        "price": {"grandTotal": str(price)},
+        "itineraries": [{
+            "duration": duration,
+            "segments": [{
+                "carrierCode": carrier,
+                "number": offer_id if number is None else number,
+                "departure": {"iataCode": origin, "at": departure},
+                "arrival": {"iataCode": destination, "at": arrival},
+            }],
+        }],
+    }
+
+
+def normalized_offer(offer_id, price=100, *, keep_raw=True, **fields):
+    """raw_offer() run through AmadeusTool.normalize_offers()"""
+    raw = raw_offer(offer_id, price, **fields)
+    return AmadeusTool().normalize_offers({"data": [raw]}, keep_raw=keep_raw)[0]
+
+
+def amadeus_client(handler) -> AmadeusClient:
+    """An AmadeusClient whose requests go to handler(request) instead of the network"""
+    client = AmadeusClient()
+    client._get_access_token = lambda: "token"
+    client.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
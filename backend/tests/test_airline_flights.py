@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+from src.api_service import amadeus_routes
+
+
+@pytest.fixture
+def discovery(monkeypatch):
+    calls = []
+
+    def discover(airline):
+        calls.append(airline)
+        time.sleep(0.05)
+        return [{"flightNumber": f"{airline}{len(calls)}"}]
+
+    monkeypatch.setattr(amadeus_routes, "_discover_flights", discover)
+    monkeypatch.setattr(amadeus_routes.flight_index, "record_flights", lambda flights: None)
+    monkeypatch.setattr(amadeus_routes, "ALL_FLIGHTS_CACHE", {})
+    return calls
+
+
+def test_concurrent_misses_discover_once(discovery):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(amadeus_routes._airline_flights("UA")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert discovery == ["UA"]
+    assert results == [[{"flightNumber": "UA1"}]] * 8
+
+
+def test_expired_entry_is_rediscovered(discovery, monkeypatch):
+    monkeypatch.setattr(amadeus_routes.settings, "all_flights_cache_ttl_seconds", 0)
+    amadeus_routes._airline_flights("UA")
+    amadeus_routes._airline_flights("UA")
+    amadeus_routes._airline_flights("AA")
+    assert discovery == ["UA", "UA", "AA"]
+
+
+def test_failed_discovery_releases_the_airline(discovery, monkeypatch):
+    def boom(airline):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(amadeus_routes, "_discover_flights", boom)
+    with pytest.raises(RuntimeError):
+        amadeus_routes._airline_flights("UA")
+    assert amadeus_routes._ALL_FLIGHTS_INFLIGHT == {}
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.api_service.airports_data import AirportTable
+from src.api_service.trajectory import great_circle_distance_km
+
+
+@pytest.fixture(scope="module")
+def table():
+    rng = np.random.default_rng(7)
+    n = 400
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))  # uniform over the sphere
+    lon = rng.uniform(-180, 180, n)
+    # Clusters at the antimeridian and near a pole
+    lat[:40], lon[:40] = rng.uniform(-20, 20, 40), rng.choice([-1, 1], 40) * rng.uniform(178, 180, 40)
+    lat[40:60], lon[40:60] = rng.uniform(88, 90, 20), rng.uniform(-180, 180, 20)
+    codes = [f"A{i:03d}" for i in range(n)]
+    return AirportTable(codes, codes, lat, lon)
+
+
+def brute_nearest(table, lat, lon, radius_km, limit):
+    d = great_circle_distance_km(lat, lon, table.lat, table.lon)
+    rows = np.flatnonzero(d <= radius_km)
+    rows = rows[np.argsort(d[rows], kind="stable")][:limit]
+    return [table.codes[i] for i in rows]
+
+
+def brute_bbox(table, min_lon, min_lat, max_lon, max_lat):
+    in_lat = (table.lat >= min_lat) & (table.lat <= max_lat)
+    if min_lon <= max_lon:
+        in_lon = (table.lon >= min_lon) & (table.lon <= max_lon)
+    else:
+        in_lon = (table.lon >= min_lon) | (table.lon <= max_lon)
+    return [table.codes[i] for i in np.flatnonzero(in_lat & in_lon)]
+
+
+def test_nearest_matches_brute_force(table):
+    rng = np.random.default_rng(11)
+    queries = [(lat, lon) for lat, lon in zip(rng.uniform(-90, 90, 150), rng.uniform(-180, 180, 150))]
+    queries += [(0.0, 179.9), (0.0, -179.9), (89.5, 0.0), (-89.9, 45.0)]
+    for lat, lon in queries:
+        for radius in (150.0, 800.0, 3000.0):
+            got = [a["code"] for a in table.nearest(lat, lon, radius_km=radius, limit=1000)]
+            assert sorted(got) == sorted(brute_nearest(table, lat, lon, radius, 1000)), (lat, lon, radius)
+
+
+def test_nearest_is_sorted_and_limited(table):
+    result = table.nearest(0.0, 179.5, radius_km=2000.0, limit=5)
+    assert [a["code"] for a in result] == brute_nearest(table, 0.0, 179.5, 2000.0, 5)
+    assert [a["distanceKm"] for a in result] == sorted(a["distanceKm"] for a in result)
+
+
+def test_bbox_matches_brute_force(table):
+    rng = np.random.default_rng(13)
+    for _ in range(200):
+        lats = np.sort(rng.uniform(-90, 90, 2))
+        min_lon, max_lon = rng.uniform(-180, 180, 2)  # min_lon > max_lon crosses the antimeridian
+        got = [a["code"] for a in table.in_bbox(min_lon, lats[0], max_lon, lats[1], limit=1000)]
+        assert got == brute_bbox(table, min_lon, lats[0], max_lon, lats[1])
+
+
+def test_antimeridian_bbox(table):
+    got = {a["code"] for a in table.in_bbox(175.0, -25.0, -175.0, 25.0, limit=1000)}
+    assert got == set(brute_bbox(table, 175.0, -25.0, -175.0, 25.0))
+    assert got >= {table.codes[i] for i in range(40)}
+    assert not got & {a["code"] for a in table.in_bbox(-170.0, -25.0, 170.0, 25.0, limit=1000)}
@@ -0,0 +1,122 @@
+import json
+
+import httpx
+import pytest
+from conftest import amadeus_client, raw_offer
+
+from src.api_service.amadeus_client import AmadeusResponseInterrupted
+from src.tools import amadeus_tool
+from src.tools.amadeus_stream import StreamingOffersParser
+from src.tools.amadeus_tool import AmadeusTool
+
+
+DICTIONARIES = {"carriers": {"UA": "UNITED AIRLINES"}}
+
+
+def body(dictionaries_first=False, offers=3):
+    data = [raw_offer(str(i), "123.45") for i in range(1, offers + 1)]
+    doc = {"meta": {"count": offers, "links": {"self": "x"}}}
+    if dictionaries_first:
+        doc["dictionaries"] = DICTIONARIES
+    doc["data"] = data
+    if not dictionaries_first:
+        doc["dictionaries"] = DICTIONARIES
+    return json.dumps(doc, indent=1)
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1 << 20])
+@pytest.mark.parametrize("dictionaries_first", [True, False])
+def test_parser_yields_offers_and_their_text(size, dictionaries_first):
+    text = body(dictionaries_first)
+    parser = StreamingOffersParser(chunked(text, size))
+    offers = list(parser)
+
+    assert [o["id"] for o, _ in offers] == ["1", "2", "3"]
+    assert all(json.loads(t) == o for o, t in offers)
+    assert parser.dictionaries == DICTIONARIES
+
+
+def test_parser_handles_empty_results():
+    assert list(StreamingOffersParser(['{"data": [], "meta": {"count": 0}}'])) == []
+    assert list(StreamingOffersParser(["{", "}"])) == []
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "[]",
+    '{"data": [{"id": "1"}, ',
+    '{"data": [{"id": "1"}] "meta": {}}',
+    '{"data": [{"id": "1"}]} trailing',
+])
+def test_parser_rejects_malformed_bodies(text):
+    with pytest.raises(ValueError):
+        list(StreamingOffersParser(chunked(text, 3) if text else []))
+
+
+def test_streamed_offers_get_carrier_names_from_trailing_dictionaries():
+    offers = list(AmadeusTool().iter_normalized_offers(chunked(body(), 5)))
+    assert [o.offer_id for o in offers] == ["1", "2", "3"]
+    assert all(o.carrier_names == {"UA": "UNITED AIRLINES"} for o in offers)
+
+
+def test_carrier_names_filled_when_body_fails_after_dictionaries():
+    offers = []
+    with pytest.raises(ValueError):
+        for offer in AmadeusTool().iter_normalized_offers([body(), " junk"]):
+            offers.append(offer)
+    assert len(offers) == 3
+    assert all(o.carrier_names == {"UA": "UNITED AIRLINES"} for o in offers)
+
+
+class BrokenStream(httpx.SyncByteStream):
+    def __init__(self, text):
+        self.text = text
+
+    def __iter__(self):
+        yield self.text[: len(self.text) // 2].encode()
+        raise httpx.ReadError("connection reset")
+
+
+SEARCH = {"origin": "SFO", "destination": "JFK", "departure_date": "2026-10-20"}
+
+
+def test_interrupted_body_raises_and_counts_as_failure():
+    client = amadeus_client(lambda request: httpx.Response(200, stream=BrokenStream(body())))
+    chunks = client.stream_flight_offers(**SEARCH)
+
+    with pytest.raises(AmadeusResponseInterrupted):
+        list(chunks)
+    assert client.breakers["flight_offers"].snapshot()["consecutive_failures"] == 1
+    assert client.cached_flight_offers(**SEARCH) is None
+
+
+def test_search_falls_back_to_last_good_response(monkeypatch):
+    responses = iter([
+        httpx.Response(200, text=body(offers=3)),
+        httpx.Response(200, stream=BrokenStream(body(offers=50))),
+    ])
+    client = amadeus_client(lambda request: next(responses))
+    monkeypatch.setattr(amadeus_tool, "amadeus_client", client)
+    tool = AmadeusTool()
+
+    assert len(tool.search_offers(**SEARCH)) == 3
+    # The second body breaks mid-way: the previous complete response is served instead
+    assert [o.offer_id for o in tool.search_offers(**SEARCH)] == ["1", "2", "3"]
+
+
+def test_send_error_releases_half_open_probe():
+    def boom(request):
+        raise RuntimeError("unexpected")
+
+    client = amadeus_client(boom)
+    breaker = client.breakers["flight_offers"]
+    breaker.recovery_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    assert client.stream_flight_offers(**SEARCH) is None
+    assert breaker.allow_request()
@@ -0,0 +1,69 @@
+import httpx
+from conftest import amadeus_client
+
+from src.api_service.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, recovery_timeout=0)
+    for _ in range(5):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_unexpected_error_releases_half_open_probe():
+    def boom(request):
+        raise RuntimeError("unexpected")
+
+    client = amadeus_client(boom)
+    breaker = client.breakers["flight_status"]
+    breaker.recovery_timeout = 0
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+
+    assert client._get("flight_status", "/v2/schedule/flights", {}) is None
+    assert breaker.state == OPEN
+    # The next caller gets a new probe instead of being rejected forever
+    assert breaker.allow_request()
+
+
+def test_fallback_cache_served_while_open():
+    responses = iter([httpx.Response(200, json={"ok": 1}), httpx.Response(503)])
+    client = amadeus_client(lambda request: next(responses))
+    params = {"q": 1}
+    assert client._get("airlines", "/v1/reference-data/airlines", params) == {"ok": 1}
+    assert client._get("airlines", "/v1/reference-data/airlines", params) == {"ok": 1}
+    assert client.breakers["airlines"].snapshot()["total_failures"] == 1
@@ -0,0 +1,59 @@
+from conftest import normalized_offer
+
+from src.agents.rebook_agent import _combine_legs
+
+
+def test_duration_uses_leg_durations_across_time_zones():
+    # SFO (Pacific) -> DEN (Mountain) -> JFK (Eastern); local clock times differ by 3h end to end
+    first = normalized_offer(
+        "1", 100, origin="SFO", destination="DEN",
+        departure="2026-10-20T08:00:00", arrival="2026-10-20T11:30:00", duration="PT2H30M",
+    )
+    second = normalized_offer(
+        "2", 150, origin="DEN", destination="JFK",
+        departure="2026-10-20T12:30:00", arrival="2026-10-20T18:30:00", duration="PT4H",
+    )
+
+    combined = _combine_legs([first], [second], min_layover_minutes=45)
+
+    assert combined.total_duration == "PT7H30M"
+    assert combined.route == ["SFO", "DEN", "JFK"]
+    assert combined.stops == 1
+    assert combined.total_price == 250
+
+
+def test_cheapest_pair_respecting_min_layover():
+    first = normalized_offer(
+        "1", 100, origin="SFO", destination="DEN",
+        departure="2026-10-20T08:00:00", arrival="2026-10-20T11:30:00", duration="PT2H30M",
+    )
+    tight = normalized_offer(
+        "2", 50, origin="DEN", destination="JFK",
+        departure="2026-10-20T11:50:00", arrival="2026-10-20T17:50:00", duration="PT4H",
+    )
+    pricey = normalized_offer(
+        "3", 300, origin="DEN", destination="JFK",
+        departure="2026-10-20T13:00:00", arrival="2026-10-20T19:00:00", duration="PT4H",
+    )
+    cheap = normalized_offer(
+        "4", 200, origin="DEN", destination="JFK",
+        departure="2026-10-20T14:00:00", arrival="2026-10-20T20:00:00", duration="PT4H",
+    )
+
+    combined = _combine_legs([first], [tight, pricey, cheap], min_layover_minutes=45)
+
+    assert combined.offer_id == "1+4"
+    assert combined.total_duration == "PT9H0M"
+
+
+def test_no_valid_pair():
+    first = normalized_offer(
+        "1", 100, origin="SFO", destination="DEN",
+        departure="2026-10-20T08:00:00", arrival="2026-10-20T11:30:00", duration="PT2H30M",
+    )
+    early = normalized_offer(
+        "2", 50, origin="DEN", destination="JFK",
+        departure="2026-10-20T10:00:00", arrival="2026-10-20T16:00:00", duration="PT4H",
+    )
+    assert _combine_legs([first], [early], min_layover_minutes=45) is None
+    assert _combine_legs([], [early], min_layover_minutes=45) is None
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.agents import decision_agent
+from src.agents.decision_agent import pareto_front, select_llm_candidates, top_k_indices
+from src.schemas.recommendation import NormalizedOffer
+
+
+@pytest.fixture(autouse=True)
+def no_detours(monkeypatch):
+    monkeypatch.setattr(decision_agent, "detour_ratios", lambda routes: np.ones(len(routes)))
+
+
+def offer(offer_id, price, minutes, stops=0):
+    return NormalizedOffer(
+        offer_id=offer_id,
+        total_price=price,
+        currency="USD",
+        total_duration=f"PT{minutes // 60}H{minutes % 60}M",
+        stops=stops,
+        route=["SFO", "JFK"],
+        carriers=["UA"],
+    )
+
+
+def ids(offers):
+    return [o.offer_id for o in offers]
+
+
+def test_top_k_indices_keeps_input_order_on_ties():
+    scores = np.array([5.0, 1.0, 3.0, 1.0, 3.0])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 4, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_pareto_front_drops_dominated_offers():
+    offers = [
+        offer("cheap", 100, 600, 1),
+        offer("fast", 400, 300, 0),
+        offer("worse", 450, 320, 0),  # dominated by fast
+        offer("middle", 250, 400, 0),
+        offer("same", 100, 600, 1),  # equal is not dominated
+    ]
+    assert [offers[i].offer_id for i in pareto_front(offers)] == ["cheap", "fast", "middle", "same"]
+
+
+def test_candidates_capped_to_best_scores():
+    # Price up, duration down: every offer is on the front
+    offers = [offer(str(i), 100 + 10 * i, 600 - 20 * i) for i in range(10)]
+    chosen = select_llm_candidates(offers, max_candidates=4)
+    assert ids(chosen) == ["6", "7", "8", "9"]
+
+
+def test_single_dominating_offer_is_backfilled_to_min_candidates():
+    offers = [offer("a", 300, 400), offer("best", 100, 300), offer("b", 200, 350), offer("c", 900, 900)]
+    assert ids(select_llm_candidates(offers)) == ["best"]
+    assert ids(select_llm_candidates(offers, min_candidates=3)) == ["a", "best", "b"]
+    assert ids(select_llm_candidates(offers, min_candidates=10)) == ["a", "best", "b", "c"]
+    assert ids(select_llm_candidates(offers, max_candidates=2, min_candidates=3)) == ["best", "b"]
@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+
+from src.api_service import distance_matrix
+
+
+def test_detour_ratios_never_build_on_the_caller(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_build():
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(distance_matrix, "_matrix", None)
+    monkeypatch.setattr(distance_matrix, "_warm_thread", None)
+    monkeypatch.setattr(distance_matrix, "get_distance_matrix", slow_build)
+
+    ratios = distance_matrix.detour_ratios([["SFO", "DEN", "JFK"], ["SFO", "JFK"]])
+
+    assert ratios.tolist() == [1.0, 1.0]
+    assert started.wait(5), "warm-up should start in the background"
+    release.set()
+    distance_matrix._warm_thread.join(5)
+
+
+def test_warm_up_runs_once_at_a_time(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def build():
+        calls.append(1)
+        release.wait(5)
+
+    monkeypatch.setattr(distance_matrix, "_warm_thread", None)
+    monkeypatch.setattr(distance_matrix, "get_distance_matrix", build)
+    distance_matrix.start_background_warm()
+    distance_matrix.start_background_warm()
+    release.set()
+    distance_matrix._warm_thread.join(5)
+    assert len(calls) == 1
+
+
+def test_ready_matrix_is_used(monkeypatch):
+    lat = np.array([0.0, 0.0, 10.0])
+    lon = np.array([0.0, 10.0, 5.0])
+    matrix = distance_matrix.DistanceMatrix.build(["A", "B", "C"], lat, lon)
+    monkeypatch.setattr(distance_matrix, "ready_distance_matrix", lambda: matrix)
+
+    ratios = distance_matrix.detour_ratios([["A", "B"], ["A", "C", "B"]])
+    assert ratios[0] == 1.0
+    assert ratios[1] > 1.0
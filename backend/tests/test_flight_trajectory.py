@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from src.api_service import amadeus_routes, flight_index
+
+AIRPORTS = {
+    "SFO": {"name": "San Francisco", "lat": 37.62, "lon": -122.38},
+    "JFK": {"name": "New York JFK", "lat": 40.64, "lon": -73.78},
+    "NRT": {"name": "Tokyo Narita", "lat": 35.77, "lon": 140.39},
+    "LAX": {"name": "Los Angeles", "lat": 33.94, "lon": -118.41},
+}
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(amadeus_routes, "get_airport_coords", AIRPORTS.get)
+
+    def no_upstream(flight_number):
+        raise AssertionError(f"{flight_number} should have come from the flight index")
+
+    monkeypatch.setattr(amadeus_routes, "_resolve_flight", no_upstream)
+
+
+def test_lowercase_flight_number_hits_the_index():
+    flight_index.record_flight({"flightNumber": "UA123", "origin": "SFO", "destination": "JFK", "scheduledDeparture": datetime.now().isoformat(timespec="seconds")})
+
+    result = amadeus_routes.get_flight_trajectory(" ua123 ", points=5)
+
+    assert result["flightNumber"] == "UA123"
+    assert (result["origin"]["code"], result["destination"]["code"]) == ("SFO", "JFK")
+
+
+def test_transpacific_positions_have_wrapped_longitudes():
+    flight_index.record_flight({"flightNumber": "JL62", "origin": "NRT", "destination": "LAX", "scheduledDeparture": datetime.now().isoformat(timespec="seconds")})
+
+    result = amadeus_routes.get_flight_trajectory("JL62", points=25)
+
+    lons = [p["longitude"] for p in result["positions"]]
+    assert all(-180 <= lon < 180 for lon in lons)
+    assert lons[-1] == pytest.approx(-118.41)
+    assert -180 <= result["currentPosition"]["longitude"] < 180
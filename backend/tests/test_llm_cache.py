@@ -0,0 +1,66 @@
+import threading
+import time
+
+from src.common.llm_cache import LLMResponseCache, cache_key
+
+SETTINGS = {"model": "m", "temperature": 0.2}
+
+
+def test_cache_key_ignores_whitespace_runs():
+    a = cache_key(model="m", temperature=0.2, max_tokens=10, prompt="hello   world\n")
+    b = cache_key(model="m", temperature=0.2, max_tokens=10, prompt="hello world")
+    c = cache_key(model="m", temperature=0.3, max_tokens=10, prompt="hello world")
+    assert a == b != c
+
+
+def test_concurrent_misses_compute_once():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60, disk_path="")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"v": 1}
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("k", compute), kwargs=SETTINGS) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_caller_arriving_while_value_is_stored_hits_cache():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60, disk_path="")
+    calls = []
+    results = []
+    late = []
+    real_put = cache._put_memory
+
+    def compute():
+        calls.append(1)
+        return {"v": len(calls)}
+
+    def put_memory(key, value, expires_at):
+        # Another caller shows up right as the first one finishes computing
+        cache._put_memory = real_put
+        thread = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute, **SETTINGS)))
+        thread.start()
+        thread.join(0.1)
+        late.append(thread)
+        real_put(key, value, expires_at)
+
+    cache._put_memory = put_memory
+    assert cache.get_or_compute("k", compute, **SETTINGS) == {"v": 1}
+    late[0].join(5)
+    assert results == [{"v": 1}]
+    assert len(calls) == 1
+
+
+def test_returned_values_are_copies_and_expire():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=0.05, disk_path="")
+    first = cache.get_or_compute("k", lambda: {"v": [1]}, **SETTINGS)
+    first["v"].append(2)
+    assert cache.get_or_compute("k", lambda: {"v": [9]}, **SETTINGS) == {"v": [1]}
+    time.sleep(0.06)
+    assert cache.get_or_compute("k", lambda: {"v": [9]}, **SETTINGS) == {"v": [9]}
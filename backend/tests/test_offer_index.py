@@ -0,0 +1,48 @@
+from conftest import raw_offer
+
+from src.schemas.recommendation import NormalizedOffer
+from src.tools import offer_index
+from src.tools.amadeus_tool import AmadeusTool
+from src.tools.offer_index import OfferIndex, itinerary_fingerprint
+
+
+def normalized(*raws):
+    return AmadeusTool().normalize_offers({"data": list(raws)})
+
+
+def test_fingerprint_is_set_at_normalize_time_and_not_serialized(monkeypatch):
+    offer = normalized(raw_offer("1", 100))[0]
+    assert offer.fingerprint == "UA1 SFO 2026-10-20T08:00:00 JFK 2026-10-20T16:00:00"
+    assert "fingerprint" not in offer.model_dump()
+
+    # Stored payloads are not decoded to fingerprint an offer
+    monkeypatch.setattr(offer_index, "segments_fingerprint", None)
+    assert itinerary_fingerprint(offer) == offer.fingerprint
+
+
+def test_same_flights_merge_to_cheapest_with_provenance():
+    index = OfferIndex()
+    index.add(normalized(raw_offer("1", 300), raw_offer("2", 250, number="200")), source="SFO-JFK@2026-10-20")
+    index.add(normalized(raw_offer("1", 200)), source="SFO-JFK@2026-10-19")
+
+    offers = index.offers()
+    assert [(o.total_price, o.provenance) for o in offers] == [
+        (200, ["SFO-JFK@2026-10-20:1", "SFO-JFK@2026-10-19:1"]),
+        (250, ["SFO-JFK@2026-10-20:2"]),
+    ]
+    assert [o.offer_id for o in offers] == ["SFO-JFK@2026-10-19:1", "SFO-JFK@2026-10-20:2"]
+    assert index.duplicates == 1 and len(index) == 2
+
+
+def test_different_departures_are_kept_apart():
+    index = OfferIndex()
+    index.add(normalized(raw_offer("1", 100, number="100"), raw_offer("2", 100, number="100", departure="2026-10-20T09:00:00")), source="s")
+    assert len(index) == 2
+
+
+def test_offers_without_segments_are_never_merged():
+    bare = NormalizedOffer(offer_id="1", total_price=100, total_duration="PT5H", stops=0, route=["SFO", "JFK"])
+    index = OfferIndex()
+    index.add([bare, bare.model_copy(update={"offer_id": "2"})], source="s")
+    index.add([bare], source="t")
+    assert len(index) == 3 and index.duplicates == 0
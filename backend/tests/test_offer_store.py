@@ -0,0 +1,47 @@
+import logging
+
+from conftest import normalized_offer
+
+from src.agents.rebook_agent import _combine_legs, _with_raw
+from src.schemas.recommendation import BatchRecommendationRequest, NormalizedOffer, RecommendationRequest
+from src.tools.offer_store import OfferStore, offer_store, raw_of
+
+
+def test_default_response_mode_is_full():
+    assert RecommendationRequest().response_mode == "full"
+    assert BatchRecommendationRequest().response_mode == "full"
+
+
+def test_store_decodes_text_and_counts_misses():
+    store = OfferStore(max_entries=1, ttl_seconds=60)
+    first = store.put('{"id": "1"}')
+    second = store.put({"id": "2"})
+    assert store.get(first) is None  # evicted
+    assert store.get(second) == {"id": "2"}
+    assert store.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_raw_of_logs_missing_payload(caplog):
+    offer = NormalizedOffer(offer_id="9", total_price=1, total_duration="PT1H", stops=0, route=[], raw_ref="gone")
+    with caplog.at_level(logging.WARNING):
+        assert raw_of(offer) == {}
+    assert "gone" in caplog.text
+
+
+def test_pinned_legs_survive_store_eviction():
+    first = _with_raw([normalized_offer(
+        "1", origin="SFO", destination="DEN",
+        departure="2026-10-20T08:00:00", arrival="2026-10-20T11:00:00", keep_raw=False,
+    )])
+    second = _with_raw([normalized_offer(
+        "2", origin="DEN", destination="JFK",
+        departure="2026-10-20T12:30:00", arrival="2026-10-20T18:00:00", keep_raw=False,
+    )])
+    offer_store.clear()
+
+    combined = _combine_legs(first, second, min_layover_minutes=45)
+
+    assert combined is not None and combined.offer_id == "1+2"
+    assert [l["id"] for l in raw_of(combined)["legs"]] == ["1", "2"]
+    evicted = normalized_offer("3", keep_raw=False).model_copy(update={"raw_ref": "gone"})
+    assert _with_raw([evicted]) == []
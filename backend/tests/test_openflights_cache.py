@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.api_service import openflights_cache
+from src.api_service.config import settings
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "openflights_cache_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_save_and_load_round_trip():
+    openflights_cache.save_dataset("t", {"a": np.arange(5), "b": np.ones(3)}, {"source": "bundled"})
+    arrays, meta = openflights_cache.load_dataset("t")
+    assert arrays["a"].tolist() == [0, 1, 2, 3, 4]
+    assert meta["source"] == "bundled"
+    assert meta["columns"] == ["a", "b"]
+
+
+def test_new_version_replaces_old_one(cache_dir):
+    openflights_cache.save_dataset("t", {"a": np.arange(5)}, {"n": 1})
+    openflights_cache.save_dataset("t", {"a": np.arange(3)}, {"n": 2})
+    arrays, meta = openflights_cache.load_dataset("t")
+    assert meta["n"] == 2 and len(arrays["a"]) == 3
+    assert len([p for p in (cache_dir / "t").iterdir() if p.is_dir()]) == 1
+
+
+def test_crash_mid_save_keeps_previous_version(cache_dir, monkeypatch):
+    openflights_cache.save_dataset("t", {"a": np.arange(5), "b": np.arange(5)}, {"n": 1})
+
+    real_save = np.save
+    calls = []
+
+    def failing_save(f, array):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        real_save(f, array)
+
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        openflights_cache.save_dataset("t", {"a": np.arange(9), "b": np.arange(9)}, {"n": 2})
+
+    arrays, meta = openflights_cache.load_dataset("t")
+    assert meta["n"] == 1
+    assert len(arrays["a"]) == len(arrays["b"]) == 5
+
+
+def test_touch_meta_updates_current_version():
+    openflights_cache.save_dataset("t", {"a": np.arange(2)}, {"checked_at": 1})
+    openflights_cache.touch_meta("t", checked_at=2)
+    assert openflights_cache.load_meta("t")["checked_at"] == 2
+
+
+def test_missing_dataset():
+    assert openflights_cache.load_dataset("nothing") is None
+    assert openflights_cache.load_meta("nothing") is None
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from conftest import raw_offer
+
+from src.agents import decision_agent, rebook_agent
+from src.agents.rebook_agent import _fanout_searches, rebook
+from src.tools.amadeus_tool import AmadeusTool
+
+DAY = (date.today() + timedelta(days=30)).isoformat()
+NEARBY = {"SFO": ["OAK", "SJC"], "JFK": ["EWR", "LGA"]}
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(
+        rebook_agent.airports_data,
+        "nearby_airports",
+        lambda code, radius_km, limit: [{"code": c} for c in NEARBY.get(code, [])[:limit]],
+    )
+    monkeypatch.setattr(rebook_agent, "_search_cache", rebook_agent.OrderedDict())
+
+
+def shift(days):
+    return (date.fromisoformat(DAY) + timedelta(days=days)).isoformat()
+
+
+def test_fanout_searches_closest_first_within_budget():
+    searches = _fanout_searches("SFO", "JFK", DAY, flex_days=1, nearby=2, budget=6)
+    # One step away (a day, or the nearest alternate airport) before two steps away
+    assert set(searches[:4]) == {
+        ("SFO", "JFK", shift(-1)),
+        ("SFO", "JFK", shift(1)),
+        ("SFO", "EWR", DAY),
+        ("OAK", "JFK", DAY),
+    }
+    assert len(searches) == 6
+    assert ("SJC", "LGA", DAY) not in searches
+    assert ("SFO", "JFK", DAY) not in searches
+
+
+def test_fanout_searches_skip_past_dates_and_same_airport_pairs():
+    today = date.today().isoformat()
+    searches = _fanout_searches("SFO", "OAK", today, flex_days=1, nearby=1, budget=10)
+    assert all(day >= today for _, _, day in searches)
+    assert all(o != d for o, d, _ in searches)
+
+
+class FakeTool(AmadeusTool):
+    """Every search returns offers numbered from "1", like Amadeus"""
+
+    def __init__(self):
+        self.calls = []
+
+    def search_offers(self, origin, destination, departure_date, adults=1, max_results=5):
+        self.calls.append((origin, destination, departure_date))
+        raws = [
+            raw_offer(
+                str(n), 100 * n + len(self.calls), origin=origin, destination=destination,
+                departure=f"{departure_date}T08:00:00", arrival=f"{departure_date}T16:00:00",
+                number=f"{origin}{destination}{n}",
+            )
+            for n in (1, 2)
+        ]
+        return self.normalize_offers({"data": raws})
+
+
+def test_fanout_stops_once_enough_offers_and_ids_stay_unique():
+    tool = FakeTool()
+    result = rebook(
+        origin="SFO", destination="JFK", departure_date=DAY, adults=1, max_results=5,
+        constraints={"max_stops": 2}, tool=tool,
+        flex_days=1, nearby_airports=2, fanout_budget=8, fanout_min_offers=4,
+    )
+
+    assert len(result.offers) >= 4
+    assert len(tool.calls) < 9
+    ids = [o.offer_id for o in result.offers]
+    assert len(set(ids)) == len(ids)
+    assert ids[:2] == [f"SFO-JFK@{DAY}:1", f"SFO-JFK@{DAY}:2"]
+
+
+def test_llm_decision_maps_ids_back_to_the_right_offers(monkeypatch):
+    result = rebook(
+        origin="SFO", destination="JFK", departure_date=DAY, adults=1, max_results=5,
+        constraints={"max_stops": 2}, tool=FakeTool(),
+        flex_days=1, fanout_budget=2, fanout_min_offers=6,
+    )
+    offers = result.offers
+    wanted = [offers[3].offer_id, offers[0].offer_id]
+
+    class FakeLLM:
+        def json_response(self, **kwargs):
+            return {"recommended_offer_ids": wanted, "reasoning": [], "confidence": 0.5}
+
+    monkeypatch.setattr(decision_agent, "get_llm_client", lambda: FakeLLM())
+    monkeypatch.setattr(decision_agent, "detour_ratios", lambda routes: np.ones(len(routes)))
+    decision = decision_agent.decide_llm(offers, "notes", top_k=len(offers))
+
+    assert [r.offer for r in decision.recommended] == [offers[3], offers[0]]
+    assert len({o.offer_id for o in offers}) == len(offers) == 6
+
+
+def test_search_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(rebook_agent, "FANOUT_CACHE_MAX_ENTRIES", 2)
+    tool = FakeTool()
+    for day in (shift(1), shift(2), shift(3), shift(3)):
+        rebook_agent._cached_search(tool, origin="SFO", destination="JFK", departure_date=day)
+    assert len(rebook_agent._search_cache) == 2
+    assert len(tool.calls) == 3
+
+
+def test_empty_results_are_not_cached():
+    class FlakyTool(FakeTool):
+        def search_offers(self, *args, **kwargs):
+            offers = super().search_offers(*args, **kwargs)
+            return [] if len(self.calls) == 1 else offers
+
+    tool = FlakyTool()
+    params = {"origin": "SFO", "destination": "JFK", "departure_date": shift(1)}
+    assert rebook_agent._cached_search(tool, **params) == []
+    assert len(rebook_agent._cached_search(tool, **params)) == 2
+    assert len(tool.calls) == 2
+
+    rebook_agent._cached_search(tool, **params)
+    assert len(tool.calls) == 2
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from conftest import normalized_offer
+
+from src.agents import decision_agent, orchestrator
+from src.agents.triage_agent import triage
+from src.schemas.recommendation import BatchRecommendationRequest, RecommendationRequest
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(decision_agent, "detour_ratios", lambda routes: np.ones(len(routes)))
+    monkeypatch.setattr(orchestrator, "decide_llm", orchestrator.decide)
+
+
+def test_triage_and_search_overlap(monkeypatch):
+    search_started = threading.Event()
+    triage_started = threading.Event()
+
+    class Tool:
+        def search_offers(self, **params):
+            search_started.set()
+            # Only returns if triage is running at the same time
+            assert triage_started.wait(5)
+            return [normalized_offer("1", 300), normalized_offer("2", 200)]
+
+    async def run_triage_async(disruption):
+        triage_started.set()
+        for _ in range(500):
+            if search_started.is_set():
+                break
+            await asyncio.sleep(0.01)
+        assert search_started.is_set()
+        return triage(disruption)
+
+    monkeypatch.setattr(orchestrator, "AmadeusTool", Tool)
+    monkeypatch.setattr(orchestrator, "run_triage_async", run_triage_async)
+
+    req = RecommendationRequest(
+        disruption={"event_type": "CANCEL"},
+        search={"origin": "SFO", "destination": "JFK", "date": "2026-10-20", "graph_candidates": 0},
+    )
+    response = asyncio.run(orchestrator.run_recommendation_pipeline(req))
+
+    assert set(response.timings_ms) == {"triage", "search", "rebook", "decision", "total"}
+    assert response.timings_ms["total"] >= max(response.timings_ms["triage"], response.timings_ms["search"])
+    assert response.severity_score == 0.95
+    assert [r.offer.total_price for r in response.recommended_offers] == [200, 300]
+    # response_mode "full" inlines the raw payload
+    assert response.recommended_offers[0].offer.raw["id"] == "2"
+
+
+def test_batch_runs_each_unique_stage_once_and_keeps_input_order(monkeypatch):
+    calls = {"triage": [], "search": [], "rebook": [], "decision": []}
+    real_rebook = orchestrator.rebook
+
+    class Tool:
+        def search_offers(self, **params):
+            dest = params["destination"]
+            calls["search"].append(dest)
+            return [normalized_offer(f"{dest}{n}", price, destination=dest) for n, price in ((1, 300), (2, 200))]
+
+    async def run_triage_async(disruption):
+        calls["triage"].append(disruption["event_type"])
+        return triage(disruption)
+
+    def rebook(**kwargs):
+        calls["rebook"].append(kwargs["destination"])
+        return real_rebook(**kwargs)
+
+    def decide_llm(offers, notes, top_k=3):
+        calls["decision"].append(offers[0].raw["id"][:3])
+        return orchestrator.decide(offers, notes, top_k=top_k)
+
+    monkeypatch.setattr(orchestrator, "AmadeusTool", Tool)
+    monkeypatch.setattr(orchestrator, "run_triage_async", run_triage_async)
+    monkeypatch.setattr(orchestrator, "rebook", rebook)
+    monkeypatch.setattr(orchestrator, "decide_llm", decide_llm)
+
+    req = BatchRecommendationRequest(
+        disruption={"event_type": "CANCEL"},
+        search={"origin": "SFO", "destination": "JFK", "date": "2026-10-20", "graph_candidates": 0},
+        items=[
+            {"passenger_id": "a"},
+            {"passenger_id": "b", "search": {"destination": "BOS"}},
+            {"passenger_id": "c"},
+            {"passenger_id": "d", "search": {"origin": ""}},
+            {"passenger_id": "e", "search": {"destination": "BOS"}},
+            {"passenger_id": "f"},
+        ],
+    )
+    response = asyncio.run(orchestrator.run_batch_recommendation_pipeline(req))
+
+    assert calls["triage"] == ["CANCEL"]
+    assert sorted(calls["search"]) == sorted(calls["rebook"]) == sorted(calls["decision"]) == ["BOS", "JFK"]
+    assert (response.unique_triages, response.unique_searches, response.unique_decisions) == (1, 2, 2)
+
+    assert [r.passenger_id for r in response.results] == ["a", "b", "c", "d", "e", "f"]
+    assert response.results[3].error and response.results[3].recommendation is None
+    picked = [r.recommendation.recommended_offers[0].offer.raw["id"] for r in response.results if r.recommendation]
+    assert picked == ["JFK2", "BOS2", "JFK2", "BOS2", "JFK2"]
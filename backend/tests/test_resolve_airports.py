@@ -0,0 +1,50 @@
+import httpx
+import pytest
+from conftest import amadeus_client
+
+from src.api_service import airport_store, amadeus_routes
+
+LOCATIONS = {
+    "ABC": {"data": [{"name": "ABC Intl", "geoCode": {"latitude": 10.5, "longitude": -20.25}}]},
+    "NOG": {"data": [{"name": "No Geo"}]},
+    "ZZZ": {"data": []},
+}
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    requests = []
+
+    def handler(request):
+        code = request.url.params["keyword"]
+        requests.append(code)
+        if code not in LOCATIONS:
+            return httpx.Response(500)
+        return httpx.Response(200, json=LOCATIONS[code])
+
+    monkeypatch.setattr(amadeus_routes, "amadeus_client", amadeus_client(handler))
+    monkeypatch.setattr(amadeus_routes.airports_data, "get_airport", lambda code: None)
+    monkeypatch.setattr(airport_store.settings, "airport_store_path", str(tmp_path / "airports.json"))
+    monkeypatch.setattr(airport_store, "_AIRPORTS", {})
+    monkeypatch.setattr(airport_store, "_MISSES", {})
+    monkeypatch.setattr(airport_store, "_loaded", False)
+    return requests
+
+
+def test_unknown_codes_are_not_asked_again(upstream):
+    first = amadeus_routes.resolve_airports(["abc", "NOG", "ZZZ", "ERR"])
+    assert first == {"ABC": {"lat": 10.5, "lon": -20.25, "name": "ABC Intl"}}
+    assert sorted(upstream) == ["ABC", "ERR", "NOG", "ZZZ"]
+
+    upstream.clear()
+    second = amadeus_routes.resolve_airports(["ABC", "NOG", "ZZZ", "ERR"])
+    assert second == first
+    # Failures are retried; codes Amadeus answered for are not
+    assert upstream == ["ERR"]
+
+
+def test_missing_entries_expire(upstream, monkeypatch):
+    monkeypatch.setattr(airport_store.settings, "airport_miss_ttl_seconds", 0)
+    amadeus_routes.resolve_airports(["ZZZ"])
+    amadeus_routes.resolve_airports(["ZZZ"])
+    assert upstream == ["ZZZ", "ZZZ"]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.api_service.distance_matrix import DistanceMatrix
+from src.api_service.routes_data import RouteTable
+from src.tools import route_graph
+from src.tools.route_graph import RouteGraph
+
+COORDS = {
+    "SFO": (37.62, -122.38), "JFK": (40.64, -73.78), "DEN": (39.86, -104.67),
+    "ORD": (41.98, -87.90), "PHX": (33.43, -112.01), "LAX": (33.94, -118.41),
+    "BOS": (42.36, -71.01), "MIA": (25.79, -80.29),
+}
+ROUTES = [
+    ("AA", "SFO", "JFK"),
+    ("UA", "SFO", "DEN"), ("UA", "DEN", "JFK"),
+    ("UA", "SFO", "ORD"), ("AA", "SFO", "ORD"), ("AA", "ORD", "JFK"), ("AA", "ORD", "BOS"),
+    ("WN", "SFO", "PHX"), ("WN", "PHX", "JFK"),
+    ("UA", "SFO", "LAX"), ("UA", "LAX", "BOS"), ("UA", "BOS", "JFK"),
+    ("DL", "SFO", "MIA", 1),  # a through flight with a stop is not an edge
+]
+
+
+@pytest.fixture
+def table():
+    lines = [f"{r[0]},1,{r[1]},1,{r[2]},1,,{r[3] if len(r) > 3 else 0},320" for r in ROUTES]
+    return RouteTable.from_lines(lines)
+
+
+@pytest.fixture
+def with_matrix(monkeypatch, table):
+    lat = np.array([COORDS[c][0] for c in table.airport_codes])
+    lon = np.array([COORDS[c][1] for c in table.airport_codes])
+    matrix = DistanceMatrix.build(table.airport_codes, lat, lon)
+    monkeypatch.setattr(route_graph, "ready_distance_matrix", lambda: matrix)
+    return matrix
+
+
+@pytest.fixture
+def no_matrix(monkeypatch):
+    monkeypatch.setattr(route_graph, "ready_distance_matrix", lambda: None)
+
+
+def paths(candidates):
+    return ["-".join(c.path) for c in candidates]
+
+
+def test_fewest_stops_first_and_limit(table, no_matrix):
+    graph = RouteGraph(table)
+    found = graph.candidate_paths("SFO", "JFK", max_stops=2, limit=10)
+
+    assert paths(found)[0] == "SFO-JFK"
+    assert sorted(paths(found)[1:4]) == ["SFO-DEN-JFK", "SFO-ORD-JFK", "SFO-PHX-JFK"]
+    assert sorted(paths(found)[4:]) == ["SFO-LAX-BOS-JFK", "SFO-ORD-BOS-JFK"]
+    assert [c.stops for c in found] == [0, 1, 1, 1, 2, 2]
+    assert len(graph.candidate_paths("SFO", "JFK", max_stops=2, limit=2)) == 2
+    assert graph.candidate_paths("SFO", "MIA") == []
+    assert graph.candidate_paths("SFO", "XXX") == []
+
+
+def test_carrier_filter_applies_to_every_leg(table, no_matrix):
+    found = RouteGraph(table).candidate_paths("SFO", "JFK", max_stops=2, carriers=["UA"])
+
+    assert paths(found) == ["SFO-DEN-JFK", "SFO-LAX-BOS-JFK"]
+    assert found[0].leg_carriers == [["UA"], ["UA"]]
+
+    mixed = RouteGraph(table).candidate_paths("SFO", "JFK", carriers=["AA"])
+    assert paths(mixed) == ["SFO-JFK", "SFO-ORD-JFK"]
+    assert mixed[1].leg_carriers == [["AA"], ["AA"]]
+
+
+def test_one_stops_ranked_by_detour_then_hub_degree(table, with_matrix):
+    # DEN and ORD both round to a 1.00 detour; ORD has more departures
+    found = RouteGraph(table).candidate_paths("SFO", "JFK", max_stops=1)[1:]
+    detours = [with_matrix.detour_ratio_ids(np.array([[with_matrix.ids[c] for c in f.path]]))[0] for f in found]
+
+    assert paths(found) == ["SFO-ORD-JFK", "SFO-DEN-JFK", "SFO-PHX-JFK"]
+    assert detours == sorted(detours)
+
+
+def test_concurrent_first_requests_build_once(monkeypatch, table):
+    builds = []
+
+    class SlowGraph(RouteGraph):
+        def __init__(self, t):
+            builds.append(1)
+            time.sleep(0.05)
+            super().__init__(t)
+
+    monkeypatch.setattr(route_graph, "_graph", None)
+    monkeypatch.setattr(route_graph, "RouteGraph", SlowGraph)
+    monkeypatch.setattr(route_graph, "get_route_table", lambda: table)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(route_graph.get_route_graph())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(builds) == 1
+    assert all(g is results[0] for g in results)
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import numpy as np
+from conftest import normalized_offer
+
+from src.agents import decision_agent, orchestrator
+from src.agents.triage_agent import triage
+from src.schemas.recommendation import RecommendationRequest
+
+
+class FakeTool:
+    def search_offers(self, **params):
+        return [normalized_offer("1", 300), normalized_offer("2", 200)]
+
+
+def test_preliminary_ranking_runs_off_the_event_loop(monkeypatch):
+    threads = {}
+    real_decide = orchestrator.decide
+
+    def decide(*args, **kwargs):
+        threads["decide"] = threading.get_ident()
+        return real_decide(*args, **kwargs)
+
+    async def run_triage_async(disruption):
+        await asyncio.sleep(0.05)  # still running when the search returns
+        return triage(disruption)
+
+    # Keep ranking hermetic: no OpenFlights route-graph warm-up for detour scoring
+    monkeypatch.setattr(decision_agent, "detour_ratios", lambda routes: np.ones(len(routes)))
+    monkeypatch.setattr(orchestrator, "AmadeusTool", FakeTool)
+    monkeypatch.setattr(orchestrator, "decide", decide)
+    monkeypatch.setattr(orchestrator, "decide_llm", real_decide)
+    monkeypatch.setattr(orchestrator, "run_triage_async", run_triage_async)
+
+    req = RecommendationRequest(
+        disruption={"event_type": "CANCEL"},
+        search={"origin": "SFO", "destination": "JFK", "date": "2026-10-20", "graph_candidates": 0},
+    )
+
+    async def collect():
+        threads["loop"] = threading.get_ident()
+        return [event async for event in orchestrator.stream_recommendation_pipeline(req)]
+
+    events = asyncio.run(collect())
+
+    assert [e["event"] for e in events] == ["preliminary", "final"]
+    assert events[0]["recommended_offers"][0]["offer"]["total_price"] == 200
+    assert "preliminary" in events[0]["timings_ms"]
+    assert threads["decide"] != threads["loop"]
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.api_service import trajectory
+from src.api_service.amadeus_routes import _flight_progress
+
+
+def test_segment_crossing_small_viewport_between_points():
+    # Two points 10 degrees apart; the viewport lies between them
+    lats = np.array([[0.0, 0.0]])
+    lons = np.array([[0.0, 10.0]])
+    assert trajectory.tracks_cross_bbox(lats, lons, 4.0, -1.0, 5.0, 1.0).tolist() == [True]
+    assert trajectory.tracks_cross_bbox(lats, lons, 4.0, 1.0, 5.0, 2.0).tolist() == [False]
+
+
+def test_diagonal_segment_missing_box_corner():
+    lats = np.array([[0.0, 10.0]])
+    lons = np.array([[0.0, 10.0]])
+    # Box above the diagonal y = x
+    assert trajectory.tracks_cross_bbox(lats, lons, 0.0, 6.0, 4.0, 9.0).tolist() == [False]
+    assert trajectory.tracks_cross_bbox(lats, lons, 4.0, 3.0, 6.0, 9.0).tolist() == [True]
+
+
+def test_antimeridian_track_and_box():
+    # Unwrapped track 179 -> 181 crosses a box spanning 179.5..-179.5
+    lats = np.array([[5.0, 5.0]])
+    lons = np.array([[179.0, 181.0]])
+    assert trajectory.tracks_cross_bbox(lats, lons, 179.5, 4.0, -179.5, 6.0).tolist() == [True]
+    assert trajectory.tracks_cross_bbox(lats, lons, -10.0, 4.0, 10.0, 6.0).tolist() == [False]
+
+
+def test_progress_from_departure_and_duration():
+    now = datetime(2026, 10, 20, 12, 0)
+    flights = [
+        {"scheduledDeparture": (now - timedelta(hours=1)).isoformat(), "duration": "PT4H"},
+        {"scheduledDeparture": (now + timedelta(hours=1)).isoformat(), "duration": "PT4H"},
+        {"scheduledDeparture": (now - timedelta(hours=9)).isoformat(), "duration": "PT4H"},
+        {"scheduledDeparture": "2026-10-20"},
+        # No duration: 1600 km at 800 km/h + 30 min taxi = 2.5 h block
+        {"scheduledDeparture": (now - timedelta(hours=1.25)).isoformat()},
+    ]
+    progress = _flight_progress(flights, np.array([0.0, 0.0, 0.0, 0.0, 1600.0]), now)
+    assert np.allclose(progress, [0.25, 0.0, 1.0, 0.5, 0.5])
+
+
+def test_tracks_cross_the_antimeridian_continuously():
+    # NRT -> LAX flies east over the Pacific
+    lats, lons = trajectory.great_circle_tracks([35.77], [140.39], [33.94], [-118.41], np.linspace(0, 1, 33))
+    steps = np.diff(lons[0])
+    assert (steps > 0).all() and steps.max() < 10
+    assert lons[0, 0] == pytest.approx(140.39) and lons[0, -1] == pytest.approx(360 - 118.41)
+    assert lats[0, -1] == pytest.approx(33.94)
+    wrapped = trajectory.wrap_longitudes(lons[0])
+    assert ((wrapped >= -180) & (wrapped < 180)).all()
+    assert wrapped[-1] == pytest.approx(-118.41)
+
+
+@pytest.mark.parametrize("dest_lat, dest_lon", [(0.0, 180.0), (-40.0, -100.0), (-40.0 + 1e-9, -100.0)])
+def test_near_antipodal_midpoint_is_halfway(dest_lat, dest_lon):
+    origin_lat, origin_lon = (0.0, 0.0) if dest_lon == 180.0 else (40.0, 80.0)
+    lats, lons = trajectory.great_circle_tracks([origin_lat], [origin_lon], [dest_lat], [dest_lon], [0.0, 0.5, 1.0])
+    half = trajectory.great_circle_distance_km(origin_lat, origin_lon, dest_lat, dest_lon) / 2
+
+    assert np.isfinite(lats).all() and np.isfinite(lons).all()
+    assert trajectory.great_circle_distance_km(origin_lat, origin_lon, lats[0, 1], lons[0, 1]) == pytest.approx(half, rel=1e-6)
+    assert trajectory.great_circle_distance_km(dest_lat, dest_lon, lats[0, 2], lons[0, 2]) == pytest.approx(0, abs=1e-3)
+
+
+def test_coincident_endpoints_stay_put():
+    lats, lons = trajectory.great_circle_tracks([51.47], [-0.45], [51.47], [-0.45], [0.0, 0.5, 1.0])
+    assert np.allclose(lats, 51.47) and np.allclose(lons, -0.45)
@@ -0,0 +1,69 @@
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import triage_agent
+from src.common.llm_cache import LLMResponseCache
+from src.common.llm_client import ClaudeClient
+
+
+class FakeModel:
+    """Answers single and batched triage prompts; records every prompt it sees"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        result = {"severity_score": 0.5, "cause": "ATC", "constraints": {"max_stops": 1}, "notes": "n"}
+        if '"results"' in prompt:
+            count = len(re.findall(r"^\[\d+\] ", prompt, flags=re.M))
+            body = {"results": [{"index": i, **result} for i in range(count)]}
+        else:
+            body = result
+        return SimpleNamespace(text=json.dumps(body))
+
+
+@pytest.fixture
+def model(monkeypatch):
+    client = ClaudeClient.__new__(ClaudeClient)
+    client.model_name = "fake"
+    client.model = FakeModel()
+    client.timeout_seconds = 1
+    client._slots = threading.BoundedSemaphore(4)
+    client.cache = LLMResponseCache(max_entries=100, ttl_seconds=60, disk_path="")
+    monkeypatch.setattr(triage_agent, "get_llm_client", lambda: client)
+    return client.model
+
+
+def event(n):
+    return {"event_type": "UNKNOWN", "flight_number": f"XX{n}"}
+
+
+def test_batch_results_are_cached_per_disruption(model):
+    results = triage_agent.triage_llm_batch([event(1), event(2), event(3)])
+    assert [r.cause for r in results] == ["ATC"] * 3
+    assert len(model.prompts) == 1
+
+    # The single-event path now hits the cache entries the batch filled
+    assert triage_agent.triage_llm(event(2)).cause == "ATC"
+    assert triage_agent.cached_triage_llm(event(3)) is not None
+    assert len(model.prompts) == 1
+
+
+def test_batch_only_sends_uncached_disruptions(model):
+    triage_agent.triage_llm(event(1))
+    triage_agent.triage_llm_batch([event(1), event(2), event(3)])
+    assert len(model.prompts) == 2
+    assert "XX1" not in model.prompts[1]
+    assert "XX2" in model.prompts[1] and "XX3" in model.prompts[1]
+
+    # Everything cached: no call at all; one miss goes through the single-event prompt
+    triage_agent.triage_llm_batch([event(3), event(2), event(1)])
+    assert len(model.prompts) == 2
+    triage_agent.triage_llm_batch([event(1), event(4)])
+    assert len(model.prompts) == 3
+    assert '"results"' not in model.prompts[2]
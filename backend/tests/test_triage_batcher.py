@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from src.agents.triage_batcher import TriageBatcher
+
+
+class Recorder:
+    """Batch and single triage functions that record their calls and can be told to fail"""
+
+    def __init__(self, batch_error=None, single_error=None):
+        self.batches = []
+        self.singles = []
+        self.batch_error = batch_error
+        self.single_error = single_error
+
+    def batch(self, items):
+        self.batches.append(items)
+        if self.batch_error:
+            raise self.batch_error
+        return [f"batch:{item['id']}" for item in items]
+
+    def single(self, item):
+        self.singles.append(item)
+        if self.single_error:
+            raise self.single_error
+        return f"single:{item['id']}"
+
+
+def batcher_for(recorder, **kwargs):
+    return TriageBatcher(recorder.batch, recorder.single, **kwargs)
+
+
+def run_all(batcher, items, timeout=1.0):
+    async def run():
+        calls = (batcher.triage(item) for item in items)
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), timeout)
+
+    return asyncio.run(run())
+
+
+def test_full_batch_flushes_without_waiting_for_the_timer():
+    recorder = Recorder()
+    batcher = batcher_for(recorder, max_batch_size=2, max_wait_ms=60_000)
+    assert run_all(batcher, [{"id": 1}, {"id": 2}]) == ["batch:1", "batch:2"]
+    assert recorder.batches == [[{"id": 1}, {"id": 2}]]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_timer_flushes_a_partial_batch():
+    recorder = Recorder()
+    batcher = batcher_for(recorder, max_batch_size=16, max_wait_ms=5)
+    assert run_all(batcher, [{"id": 1}, {"id": 2}, {"id": 1}]) == ["batch:1", "batch:2", "batch:1"]
+    # Duplicates share one slot in the prompt
+    assert recorder.batches == [[{"id": 1}, {"id": 2}]]
+
+    assert run_all(batcher, [{"id": 3}]) == ["single:3"]
+    assert recorder.singles == [{"id": 3}]
+
+
+def test_failed_batch_falls_back_to_single_calls():
+    recorder = Recorder(batch_error=RuntimeError("bad json"))
+    batcher = batcher_for(recorder, max_batch_size=2)
+    assert run_all(batcher, [{"id": 1}, {"id": 2}]) == ["single:1", "single:2"]
+    assert batcher.stats()["fallbacks"] == 1
+
+
+def test_llm_outage_fails_every_caller_in_the_batch():
+    error = RuntimeError("llm down")
+    recorder = Recorder(batch_error=error, single_error=error)
+    batcher = batcher_for(recorder, max_batch_size=3)
+    results = run_all(batcher, [{"id": 1}, {"id": 2}, {"id": 2}])
+    assert results == [error, error, error]
+    assert len(recorder.singles) == 2
+
+
+def test_batcher_recovers_after_its_event_loop_closes():
+    recorder = Recorder()
+    batcher = batcher_for(recorder, max_batch_size=16, max_wait_ms=5)
+
+    # Leave a request (and its flush timer) behind on a loop that is then closed
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(batcher.triage({"id": 1}))
+    loop.run_until_complete(asyncio.sleep(0))
+    task.cancel()
+    loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+    loop.close()
+    assert batcher._timer is not None
+
+    assert run_all(batcher, [{"id": 2}]) == ["single:2"]
+    assert run_all(batcher, [{"id": 3}, {"id": 4}]) == ["batch:3", "batch:4"]
+    assert recorder.singles == [{"id": 2}]
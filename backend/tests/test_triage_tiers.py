@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from src.agents import triage_agent
+from src.agents.triage_agent import TriageResult, run_triage, run_triage_async, triage_stats
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+
+    def triage_llm(disruption):
+        calls.append(disruption)
+        return TriageResult(severity_score=0.8, cause="ATC", constraints={"max_stops": 1}, notes="llm", tier="llm")
+
+    async def batched_llm(disruption):
+        return triage_llm(disruption)
+
+    monkeypatch.setattr(triage_agent, "TRIAGE_MODE", "tiered")
+    monkeypatch.setattr(triage_agent, "_stats", triage_agent._TriageStats())
+    monkeypatch.setattr(triage_agent, "triage_llm", triage_llm)
+    monkeypatch.setattr(triage_agent, "_batched_llm", batched_llm)
+    return calls
+
+
+CONFIDENT = [
+    {"event_type": "CANCEL"},
+    {"event_type": "DELAY", "scheduled_departure": "2026-10-20T08:00:00", "estimated_departure": "2026-10-20T10:30:00"},
+    {"event_type": "WEATHER", "scheduled_departure": "2026-10-20T08:00:00", "estimated_departure": "2026-10-20T08:20:00"},
+]
+UNCERTAIN = [
+    {"event_type": "UNKNOWN"},
+    {"event_type": "BIRDSTRIKE"},
+    {"event_type": "DELAY"},  # no timestamps
+    {"event_type": "DELAY", "scheduled_departure": "2026-10-20T08:00:00", "estimated_departure": "2026-10-20T07:00:00"},
+]
+
+
+@pytest.mark.parametrize("disruption", CONFIDENT)
+def test_confident_rules_are_not_escalated(llm, disruption):
+    result = run_triage(disruption)
+    assert result.tier == "rules"
+    assert llm == []
+
+
+@pytest.mark.parametrize("disruption", UNCERTAIN)
+def test_unknown_or_low_confidence_events_escalate(llm, disruption):
+    result = run_triage(disruption)
+    assert (result.tier, result.cause) == ("llm", "ATC")
+    assert llm == [disruption]
+
+
+def test_llm_failure_falls_back_to_rules(llm, monkeypatch):
+    def boom(disruption):
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(triage_agent, "triage_llm", boom)
+    result = run_triage({"event_type": "UNKNOWN"})
+    assert (result.tier, result.cause) == ("rules_fallback", "UNKNOWN")
+
+
+def test_rules_mode_never_calls_the_llm(llm, monkeypatch):
+    monkeypatch.setattr(triage_agent, "TRIAGE_MODE", "rules")
+    assert run_triage({"event_type": "UNKNOWN"}).tier == "rules"
+    assert llm == []
+
+
+def test_async_path_escalates_the_same_way(llm):
+    async def run():
+        return await asyncio.gather(run_triage_async(CONFIDENT[0]), run_triage_async(UNCERTAIN[0]))
+
+    confident, uncertain = asyncio.run(run())
+    assert (confident.tier, uncertain.tier) == ("rules", "llm")
+    assert llm == [UNCERTAIN[0]]
+
+
+def test_stats_count_requests_escalations_and_tiers(llm):
+    for disruption in CONFIDENT + UNCERTAIN[:2]:
+        run_triage(disruption)
+
+    stats = triage_stats()
+    assert stats["mode"] == "tiered"
+    assert (stats["requests"], stats["escalations"]) == (5, 2)
+    assert stats["escalation_rate"] == 0.4
+    assert stats["tiers"]["rules"]["count"] == 5
+    assert stats["tiers"]["llm"]["count"] == 2
+    assert "batching" in stats